@@ -0,0 +1,106 @@
+"""
+Benchmark the time and peak memory of building exercise dataframes.
+
+Usage:
+    python benchmarks/bench_get_exercise.py [--years 20] [--sets 5] [--repeat 3]
+
+Generates a long-history synthetic vault, then compares the index with one that stores
+labels as strings, and `get_exercise` with a verbatim copy of the baseline
+`get_exercise` in `legacy`. The baseline parsed every practice, built a dataframe per
+metric with `pd.DataFrame.from_records` and joined them with chained outer merges, so
+`get_exercise` is also measured with a cold index, i.e. loading it first.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from legacy import get_exercise as baseline_get_exercise  # noqa: E402
+from synthetic_vault import generate_vault  # noqa: E402
+
+from exercise import get_exercise  # noqa: E402
+from index import LABEL_COLUMNS, clear_loaded_indexes, get_index  # noqa: E402
+from vault import Vault  # noqa: E402
+
+ACTIVITY = "Fitness"
+# an exercise logged with two metrics in every session of its type.
+EXERCISE = "Exercise 2"
+
+
+def _get_exercise_cold():
+    # includes loading the index, which the baseline parsed practices for.
+    clear_loaded_indexes()
+    return get_exercise(ACTIVITY, EXERCISE)
+
+
+def _measure(function: Callable[[], object], repeat: int) -> Tuple[float, float]:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--years", type=float, default=20)
+    parser.add_argument("--sessions-per-week", type=int, default=6)
+    parser.add_argument("--sets", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as vault_dir:
+        generate_vault(
+            vault_dir,
+            years=args.years,
+            sessions_per_week=args.sessions_per_week,
+            sets=args.sets,
+            metric_mix=["Reps | Weight"],
+        )
+        with Vault(vault_dir):
+            index = get_index(ACTIVITY)
+            string_index = index.astype({column: str for column in LABEL_COLUMNS})
+            string_index["Set"] = string_index["Set"].astype(int)
+
+            print(f"{len(index)} index rows")
+            print(f"{'index':<28}{'MiB':>10}")
+            for name, frame in {
+                "string labels": string_index,
+                "categorical": index,
+            }.items():
+                megabytes = frame.memory_usage(deep=True).sum() / 2**20
+                print(f"{name:<28}{megabytes:>10.1f}")
+            del string_index
+
+            builds = {
+                "baseline get_exercise": lambda: baseline_get_exercise(
+                    ACTIVITY, EXERCISE
+                ),
+                "get_exercise (cold index)": _get_exercise_cold,
+                "get_exercise": lambda: get_exercise(ACTIVITY, EXERCISE),
+                "get_exercise (float32)": lambda: get_exercise(
+                    ACTIVITY, EXERCISE, float32=True
+                ),
+            }
+            print(f"{'get_exercise':<28}{'seconds':>10}{'peak MiB':>10}{'MiB':>10}")
+            for name, build in builds.items():
+                seconds, peak = _measure(build, args.repeat)
+                megabytes = build().memory_usage(deep=True).sum() / 2**20
+                print(f"{name:<28}{seconds:>10.3f}{peak:>10.1f}{megabytes:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
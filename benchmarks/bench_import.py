@@ -0,0 +1,71 @@
+"""
+Benchmark how long it takes to import the modules behind each CLI command.
+
+Usage:
+    python benchmarks/bench_import.py [--repeat 5]
+
+Each module is imported in a fresh interpreter with `python -X importtime`. The CLI
+entrypoint must not pull in the analytics and plotting stacks, so this exits with an
+error if it does, making import-time regressions show up immediately.
+"""
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+HEAVY_MODULES = ["pandas", "numpy", "matplotlib", "seaborn", "statsmodels"]
+
+# Modules that only light commands (e.g. `activity ls`, `plan create`) need.
+LIGHT_MODULES = ["commands.cli_commands", "plan", "practice", "session", "activity"]
+# Modules that analytics commands (e.g. `report generate`) need.
+ANALYTICS_MODULES = ["exercise", "report"]
+
+
+def _import_time(module: str) -> Tuple[float, List[str]]:
+    """
+    Import a module in a fresh interpreter, returning the cumulative import time in
+    seconds and the heavy modules that were imported along with it.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SRC_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    imported: Dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        imported[name.strip()] = int(cumulative)
+    heavy = [name for name in HEAVY_MODULES if name in imported]
+    return imported[module] / 1e6, heavy
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    regressions = []
+    print(f"{'module':<24}{'seconds':>10}  heavy modules imported")
+    for module in LIGHT_MODULES + ANALYTICS_MODULES:
+        results = [_import_time(module) for _ in range(args.repeat)]
+        seconds = min(seconds for seconds, _ in results)
+        heavy = results[0][1]
+        print(f"{module:<24}{seconds:>10.3f}  {', '.join(heavy) or '-'}")
+        if module in LIGHT_MODULES and len(heavy) > 0:
+            regressions.append(module)
+
+    if len(regressions) > 0:
+        sys.exit(f"heavy modules imported by light modules: {', '.join(regressions)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Benchmark the main queries at several synthetic vault sizes.
+
+Usage:
+    python benchmarks/bench_suite.py [--years 1,3,5] [--activities 1] [--repeat 3]
+
+For every size, a vault is generated with `synthetic_vault.generate_vault`, and each
+operation is timed from a cold start (no loaded index, and no on-disk index for the
+first operation), then run once more under `tracemalloc` to measure its peak memory.
+"""
+import argparse
+import datetime
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from typing import Callable, Dict
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import matplotlib  # noqa: E402
+
+# plots are only ever measured, so never open any windows.
+matplotlib.use("Agg")
+
+from synthetic_vault import PLAN, generate_vault  # noqa: E402
+
+from dir_utils import get_index_path, get_practices_dir  # noqa: E402
+from exercise import get_exercise, get_exercises  # noqa: E402
+from index import clear_loaded_indexes, get_index  # noqa: E402
+from plan import schedule, visualize_plan  # noqa: E402
+from plotting import get_pyplot  # noqa: E402
+from report import generate_reports  # noqa: E402
+from vault import Vault  # noqa: E402
+
+ACTIVITY = "Fitness"
+EXERCISE = "Exercise 2"
+SCHEDULE_DAYS = 90
+
+
+def _build_index():
+    index_path = get_index_path(ACTIVITY)
+    if os.path.isfile(index_path):
+        os.remove(index_path)
+    get_index(ACTIVITY)
+
+
+def _schedule():
+    until = datetime.datetime.now() + datetime.timedelta(days=SCHEDULE_DAYS)
+    practices_dir = get_practices_dir(ACTIVITY)
+    before = set(os.listdir(practices_dir))
+    try:
+        schedule(until=until.strftime("%Y-%m-%d"), plan=PLAN, activity=ACTIVITY)
+    finally:
+        # leave the vault as generated for the next repeat.
+        for year in set(os.listdir(practices_dir)) - before:
+            shutil.rmtree(os.path.join(practices_dir, year))
+
+
+def _visualize_plan():
+    visualize_plan(plan=PLAN, activity=ACTIVITY)
+    get_pyplot().close("all")
+
+
+OPERATIONS: Dict[str, Callable[[], object]] = {
+    "build index (cold)": _build_index,
+    "get_exercises": lambda: get_exercises(ACTIVITY),
+    "get_exercise": lambda: get_exercise(activity=ACTIVITY, exercise=EXERCISE),
+    "generate_reports": lambda: generate_reports(ACTIVITY),
+    "visualize_plan": _visualize_plan,
+    "schedule": _schedule,
+}
+
+
+def _run(operation: Callable[[], object]):
+    clear_loaded_indexes()
+    with redirect_stdout(io.StringIO()):
+        operation()
+
+
+def _time(operation: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        _run(operation)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _peak_memory(operation: Callable[[], object]) -> float:
+    tracemalloc.start()
+    try:
+        _run(operation)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--years", default="1,3,5", help="comma-separated years of history"
+    )
+    parser.add_argument("--activities", type=int, default=1)
+    parser.add_argument("--sessions-per-week", type=int, default=3)
+    parser.add_argument("--exercises-per-session", type=int, default=4)
+    parser.add_argument("--sets", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(
+        f"{'years':>6}{'practices':>11}  "
+        f"{'operation':<22}{'seconds':>10}{'peak MiB':>10}"
+    )
+    for years in [float(years) for years in args.years.split(",")]:
+        with tempfile.TemporaryDirectory() as vault_dir:
+            generate_vault(
+                vault_dir,
+                num_activities=args.activities,
+                years=years,
+                sessions_per_week=args.sessions_per_week,
+                exercises_per_session=args.exercises_per_session,
+                sets=args.sets,
+            )
+            with Vault(vault_dir):
+                num_practices = sum(
+                    len(files) for _, _, files in os.walk(get_practices_dir(ACTIVITY))
+                )
+                for name, operation in OPERATIONS.items():
+                    seconds = _time(operation, args.repeat)
+                    peak = _peak_memory(operation)
+                    print(
+                        f"{years:>6g}{num_practices:>11}  "
+                        f"{name:<22}{seconds:>10.3f}{peak:>10.1f}"
+                    )
+            clear_loaded_indexes()
+
+
+if __name__ == "__main__":
+    main()
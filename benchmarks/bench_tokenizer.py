@@ -0,0 +1,109 @@
+"""
+Benchmark the practice tokenizer against the parsers it replaced.
+
+Usage:
+    python benchmarks/bench_tokenizer.py [--practices 2000] [--repeat 5]
+
+Reports lines/sec for tokenizing practices, for building index rows of every
+exercise from them, and for verbatim copies of the baseline parsers in `legacy`, which
+re-read every file with `readlines()` once per exercise and made several list passes
+over the lines.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Callable, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from legacy import (  # noqa: E402
+    _get_exercise_results_from_file,
+    _get_exercises_from_file,
+)
+
+from index import _parse_practice_file  # noqa: E402
+from tokenizer import tokenize_practice  # noqa: E402
+
+EXERCISES = [
+    ("Weighted Pullups", "Reps | Weight"),
+    ("Front Lever", "Variation | Seconds"),
+    ("Dips", "Reps | Weight"),
+    ("Split Squat", "Reps Left | Reps Right | Weight"),
+    ("Run", "Hours | Minutes"),
+]
+
+
+def _write_practices(practices_dir: str, num_practices: int) -> List[str]:
+    rng = random.Random(0)
+    paths = []
+    for practice_idx in range(num_practices):
+        path = os.path.join(
+            practices_dir, f"2020-01-01 Workouts - Pull {practice_idx}.md"
+        )
+        with open(path, "w") as file:
+            file.write("# Pull\n### 08:00 - 09:00\n")
+            for name, metric in EXERCISES:
+                file.write(f"- {name}\n\t- Metric: {metric}\n\t- Sets: 4\n")
+                for set_num in range(1, 5):
+                    if name == "Run":
+                        file.write(f"\t{set_num}. 1 h, {rng.randint(0, 59)} min\n")
+                    else:
+                        file.write(
+                            f"\t{set_num}. {rng.randint(3, 8)}, "
+                            f"{rng.randint(0, 100)} lbs\n"
+                        )
+            file.write("\n## Notes\n- \n")
+        paths.append(path)
+    return paths
+
+
+def _time(function: Callable, paths: List[str], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for path in paths:
+            function(path)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _consume_tokens(path: str):
+    with open(path, "r") as file:
+        for _ in tokenize_practice(file):
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--practices", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as practices_dir:
+        paths = _write_practices(practices_dir, args.practices)
+        num_lines = 0
+        for path in paths:
+            with open(path, "r") as file:
+                num_lines += sum(1 for _ in file)
+
+        parsers = {
+            "tokenize_practice": _consume_tokens,
+            "index rows (all exercises)": _parse_practice_file,
+            "baseline exercise names": _get_exercises_from_file,
+            "baseline results (all exercises)": lambda path: [
+                _get_exercise_results_from_file(path, name) for name, _ in EXERCISES
+            ],
+        }
+
+        print(f"{args.practices} practices, {num_lines} lines")
+        print(f"{'parser':<32}{'seconds':>10}{'lines/sec':>14}")
+        for name, function in parsers.items():
+            seconds = _time(function, paths, args.repeat)
+            print(f"{name:<32}{seconds:>10.3f}{num_lines / seconds:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark classifying set measurements into metrics and values.
+
+Usage:
+    python benchmarks/bench_units.py [--measurements 200000] [--repeat 5]
+
+Compares verbatim copies of the baseline classifier in `legacy`, which rebuilt unit
+lists with `combine_units` and filtered characters one at a time for every
+measurement, with the compiled scalar and vectorized classifiers in `units`.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from typing import Callable, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from legacy import (  # noqa: E402
+    _filter_non_digits,
+    _measurement_to_metric,
+    _str_to_float,
+)
+
+from units import parse_measurement, parse_measurements  # noqa: E402
+
+MEASUREMENTS = ["50 lbs", "5", "", "12 s", "Tuck", "1 h", "30 min", "45 lbs L", "6 R"]
+
+
+def _baseline_parse_measurements(measurements: List[str]):
+    # the metric and value of each measurement, as the baseline `get_exercise` got
+    # them.
+    return [
+        (
+            _measurement_to_metric(measurement),
+            _str_to_float(_filter_non_digits(measurement)),
+        )
+        for measurement in measurements
+    ]
+
+
+def _time(function: Callable, measurements: List[str], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(measurements)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--measurements", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    measurements = [rng.choice(MEASUREMENTS) for _ in range(args.measurements)]
+
+    classifiers = {
+        "baseline": _baseline_parse_measurements,
+        "parse_measurement": lambda measurements: [
+            parse_measurement(measurement) for measurement in measurements
+        ],
+        "parse_measurements": parse_measurements,
+    }
+
+    print(f"{args.measurements} measurements")
+    print(f"{'classifier':<24}{'seconds':>10}{'measurements/sec':>20}")
+    for name, function in classifiers.items():
+        seconds = _time(function, measurements, args.repeat)
+        print(f"{name:<24}{seconds:>10.3f}{args.measurements / seconds:>20,.0f}")
+
+
+if __name__ == "__main__":
+    main()
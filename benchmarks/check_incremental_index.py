@@ -0,0 +1,129 @@
+"""
+Check that the tables the index updates incrementally match a rebuild from scratch.
+
+Usage:
+    python benchmarks/check_incremental_index.py [--years 1]
+
+Generates a synthetic vault, fills the trend and rollup tables, then deletes and
+re-dates the latest practices, which moves the last session of their exercises back.
+The tables are then compared with those of a fresh index, and this exits with an
+error if any differ.
+"""
+import argparse
+import glob
+import os
+import sys
+import tempfile
+from functools import partial
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from synthetic_vault import generate_vault  # noqa: E402
+
+from dir_utils import get_index_path, get_practices_dir  # noqa: E402
+from index import (  # noqa: E402
+    ROLLUP_AGGREGATIONS,
+    clear_loaded_indexes,
+    get_rollups,
+    get_trends,
+)
+from vault import Vault  # noqa: E402
+
+ACTIVITY = "Fitness"
+FORGETTINGS = [1.0, 0.9]
+
+
+def _get_rebuilt(query: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+    index_path = get_index_path(activity=ACTIVITY)
+    os.replace(index_path, f"{index_path}.incremental")
+    clear_loaded_indexes()
+    try:
+        return query()
+    finally:
+        os.replace(f"{index_path}.incremental", index_path)
+        clear_loaded_indexes()
+
+
+def _compare_trends(forgetting: float) -> bool:
+    trends = get_trends(ACTIVITY, forgetting=forgetting)
+    rebuilt_trends = _get_rebuilt(lambda: get_trends(ACTIVITY, forgetting=forgetting))
+    return (
+        trends[["Exercise", "Metric", "Sessions", "Last"]].equals(
+            rebuilt_trends[["Exercise", "Metric", "Sessions", "Last"]]
+        )
+        and np.allclose(trends["Value"], rebuilt_trends["Value"])
+        and np.allclose(trends["Slope"], rebuilt_trends["Slope"])
+    )
+
+
+def _compare_rollups() -> bool:
+    label_columns = {column: str for column in ["Practice", "Exercise", "Metric"]}
+    rollups = get_rollups(ACTIVITY).astype(label_columns)
+    rebuilt_rollups = _get_rebuilt(lambda: get_rollups(ACTIVITY)).astype(label_columns)
+    return rollups[list(label_columns)].equals(
+        rebuilt_rollups[list(label_columns)]
+    ) and np.allclose(
+        rollups[ROLLUP_AGGREGATIONS].to_numpy(dtype=float),
+        rebuilt_rollups[ROLLUP_AGGREGATIONS].to_numpy(dtype=float),
+        equal_nan=True,
+    )
+
+
+def _compare_tables(edit: str) -> bool:
+    # queries update the index from the edited practices first.
+    clear_loaded_indexes()
+    comparisons = {
+        **{
+            f"trends {forgetting}": partial(_compare_trends, forgetting)
+            for forgetting in FORGETTINGS
+        },
+        "rollups": _compare_rollups,
+    }
+    matches = True
+    for table, compare in comparisons.items():
+        match = compare()
+        print(f"{edit:<32}{table:<16}{'ok' if match else 'MISMATCH'}")
+        matches = matches and match
+    return matches
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--years", type=float, default=1.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as vault_dir:
+        generate_vault(vault_dir, years=args.years, skip_rate=0)
+        with Vault(vault_dir):
+            for forgetting in FORGETTINGS:
+                get_trends(ACTIVITY, forgetting=forgetting)
+            get_rollups(ACTIVITY)
+            practices = sorted(
+                glob.glob(
+                    os.path.join(get_practices_dir(activity=ACTIVITY), "*", "*", "*.md")
+                ),
+                key=os.path.basename,
+            )
+
+            print(f"{'edit':<32}{'table':<16}result")
+            os.remove(practices[-1])
+            matches = _compare_tables("delete the latest practice")
+            # move the new latest practice about a month back.
+            latest_dir, latest_name = os.path.split(practices[-2])
+            earlier_date = os.path.basename(practices[-40])[:10]
+            os.rename(
+                practices[-2],
+                os.path.join(latest_dir, f"{earlier_date}{latest_name[10:-3]} 2.md"),
+            )
+            matches = _compare_tables("re-date the latest practice") and matches
+
+    if not matches:
+        sys.exit("incrementally updated tables differ from a rebuilt index")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+"""
+Verbatim copies of the baseline code (commit 9eff39f) that has since been replaced,
+kept only so that benchmarks can compare against the original implementations. Names
+and bodies are exactly those of the original `units`, `plan` and `exercise` modules.
+"""
+import os
+from datetime import datetime
+from itertools import product
+from logging import debug
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from dir_utils import get_practices_dir
+
+# from units.
+SECONDS_UNITS = ["s", "sec", "secs", "second", "seconds"]
+MINUTES_UNITS = ["minute", "minutes", "min", "mins", "m", "ms"]
+HOURS_UNITS = ["hour", "hours", "hr", "hrs", "h", "hs"]
+POUNDS_UNITS = ["lb", "lbs"]
+LEFT_UNITS = ["l", "left"]
+RIGHT_UNITS = ["r", "right"]
+PERCENTAGE_UNITS = ["%"]
+
+
+def combine_units(units_1: List[str], units_2: List[str]) -> List[str]:
+    return [" ".join(units) for units in product(units_1, units_2)]
+
+
+# from plan.
+def _measurement_to_metric(measurement: str) -> str:
+    lower_measurement = _filter_digits(measurement.lower()).strip()
+
+    if lower_measurement in POUNDS_UNITS:
+        return "Weight"
+    if lower_measurement in combine_units(POUNDS_UNITS, RIGHT_UNITS):
+        return "Weight Right"
+    if lower_measurement in combine_units(POUNDS_UNITS, LEFT_UNITS):
+        return "Weight Left"
+    if lower_measurement in combine_units(SECONDS_UNITS, RIGHT_UNITS):
+        return "Seconds Right"
+    if lower_measurement in combine_units(SECONDS_UNITS, LEFT_UNITS):
+        return "Seconds Left"
+    if lower_measurement in RIGHT_UNITS:
+        return "Reps Right"
+    if lower_measurement in LEFT_UNITS:
+        return "Reps Left"
+
+    if lower_measurement in HOURS_UNITS:
+        return "Hours"
+
+    if lower_measurement in MINUTES_UNITS:
+        return "Minutes"
+    if lower_measurement in SECONDS_UNITS:
+        return "Seconds"
+    if lower_measurement in PERCENTAGE_UNITS:
+        return "Percentage"
+    if lower_measurement == "[x]" or lower_measurement == "[ ]":
+        return "Completion"
+    if lower_measurement == "planks":
+        return "Distance"
+    if lower_measurement == "":
+        return "Reps"
+    return "Variation"
+
+
+def _str_to_float(string: str) -> float:
+    if string == "":
+        return np.nan
+    return float(string)
+
+
+def _filter_non_digits(string: str) -> str:
+    result = ""
+    for char in string:
+        if char in "1234567890.":
+            result += char
+    return result
+
+
+def _filter_digits(string: str) -> str:
+    result = ""
+    for char in string:
+        if char not in "1234567890.":
+            result += char
+    return result
+
+
+# from exercise.
+def _get_exercises_from_file(session_dir: str) -> List[str]:
+    with open(session_dir, "r") as file:
+        lines = file.readlines()
+
+    for line_idx, line in enumerate(lines):
+        if line == "## Notes\n":
+            lines = lines[:line_idx]
+            break
+    exercises_lines = [line[2:].strip() for line in lines if line.startswith("- ")]
+    exercises_lines = [
+        line[4:] if line.startswith("[") else line for line in exercises_lines
+    ]
+
+    exercises_lines = [
+        line[:-9].strip() if line.endswith("- SKIPPED") else line
+        for line in exercises_lines
+    ]
+    exercises_lines = [line for line in exercises_lines if len(line) > 0]
+
+    return exercises_lines
+
+
+def _get_exercise_results_from_file(
+    session_dir: str, exercise_name: str
+) -> Tuple[datetime, dict]:
+    found_exercise = False
+    session_date_str = os.path.split(session_dir)[-1][:10]
+    session_date = datetime.strptime(session_date_str, "%Y-%m-%d")
+    exercise_results = {}
+    with open(session_dir, "r") as file:
+        lines = file.readlines()
+
+    metrics = None
+    for line in lines:
+        if line.startswith("## Notes"):
+            break
+        if line.startswith("# "):
+            skipped = "skipped" in line.lower()
+            exercise_results["skipped"] = skipped
+            if skipped:
+                break
+
+            # assert line[2:-1] == session_name, f"{line[2:-1]} != {session_name}"
+
+        elif line.startswith("- "):
+            completion_false = line.startswith("- [ ] ")
+            completion_true = line.startswith("- [x] ")
+            new_exercise_name = (
+                line[6:-1] if completion_false or completion_true else line[2:-1]
+            )
+            if found_exercise:
+                return session_date, exercise_results
+            if new_exercise_name == exercise_name:
+                found_exercise = True
+                exercise_results = {}
+                if completion_false:
+                    exercise_results["completed"] = False
+                if completion_true:
+                    exercise_results["completed"] = True
+
+        elif line.startswith("\t- "):
+            if line[3:].startswith("Metric: "):
+                metrics = [metric.strip() for metric in line[11:].split("|")]
+                if "completed" not in exercise_results:
+                    for metric in metrics:
+                        exercise_results[metric] = []
+
+        elif line.startswith("\t") and len(line) >= 3 and line[2] == ".":
+            set_measurements = [
+                measurement.strip() for measurement in line[3:].split(",")
+            ]
+            set_metrics = [
+                _measurement_to_metric(measurement) for measurement in set_measurements
+            ]
+
+            for metric, measurement in zip(set_metrics, set_measurements):
+                if "Hours" == metric and "Minutes" in set_metrics:
+                    measurement_val = _filter_non_digits(measurement)
+                    new_measurement_val = (
+                        float(measurement_val)
+                        + int(
+                            _filter_non_digits(
+                                set_measurements[set_metrics.index("Minutes")]
+                            )
+                        )
+                        / 60
+                    )
+                    measurement = (
+                        f"{new_measurement_val}"
+                        f"{measurement.removeprefix(measurement_val)}"
+                    )
+
+                if "Minutes" == metric and "Hours" in set_metrics:
+                    continue
+
+                if metric in exercise_results:
+                    exercise_results[metric].append(measurement)
+
+    if not found_exercise:
+        return session_date, {}
+    return session_date, exercise_results
+
+
+def get_exercise(
+    activity: str,
+    exercise: str,
+    start: Optional[str] = None,
+) -> pd.DataFrame:
+    """
+    Get the data for a given exercise.
+
+    Args:
+        activity (str): The activity of the exercise.
+        exercise (str): The specified exercise.
+        start (Optional[str], optional): The date to start looking at historical data. Defaults to None.
+
+    Returns:
+        pd.DataFrame: A dataframe of the results.
+            This has the following columns:
+            - Date
+            - Session
+            - Set
+            - One column corresponding to each metric.
+            Each row corresponds to a single set performed.
+    """
+    if start is not None:
+        start = datetime.strptime(start, "%Y-%m-%d")
+    practices_dir = get_practices_dir(activity=activity)
+    if not os.path.isdir(practices_dir):
+        raise FileNotFoundError(practices_dir)
+
+    all_session_exercises: List[Dict] = []
+    session_dates = []
+    for session_path, _, files in os.walk(practices_dir):
+        for session in files:
+            session_dir = os.path.join(session_path, session)
+            # extract exercises from session plan
+            session_date, session_exercises = _get_exercise_results_from_file(
+                session_dir, exercise_name=exercise
+            )
+            if len(session_exercises) > 0 and (start is None or session_date >= start):
+                all_session_exercises.append(session_exercises)
+                session_dates.append(session_date)
+    metrics = list(
+        set(
+            [
+                key
+                for exercise_metrics in all_session_exercises
+                for key in exercise_metrics
+            ]
+        )
+    )
+
+    all_data = {}
+    for metric in metrics:
+        date_and_measurements = [
+            (date, exercise_metrics.get(metric, {}))
+            for date, exercise_metrics in zip(session_dates, all_session_exercises)
+        ]
+
+        # take all measurements across all sets.
+        date_and_measurements = [
+            (
+                date,
+                [
+                    _str_to_float(_filter_non_digits(set_measurement))
+                    for set_measurement in measurement
+                ],
+            )
+            if len(measurement) > 0 and any(len(m) > 0 for m in measurement)
+            else (date, [np.nan])
+            for date, measurement in date_and_measurements
+        ]
+
+        data = pd.DataFrame.from_records(
+            [
+                {
+                    "Session": session_idx,
+                    "Set": set_idx,
+                    "Date": date,
+                    metric: set_metric,
+                }
+                for session_idx, (date, measurements) in enumerate(
+                    date_and_measurements
+                )
+                for set_idx, set_metric in enumerate(measurements)
+            ]
+        )
+
+        y = data[metric].to_numpy()
+        notnan_indices = np.argwhere(~np.isnan(y))
+        if y[notnan_indices].shape[0] == 0:
+            debug("skipping", exercise, metric)
+            continue
+
+        all_data[metric] = data
+
+    final_metrics = list(all_data.keys())
+    exercise_data = all_data[final_metrics[0]]
+    for metric in final_metrics[1:]:
+        exercise_data = pd.merge(
+            exercise_data, all_data[metric], how="outer", on=["Date", "Set", "Session"]
+        )
+
+    # drop data if any rows are absent of measurements
+    exercise_data = exercise_data.dropna(how="all", subset=final_metrics)
+
+    return exercise_data
@@ -0,0 +1,301 @@
+"""
+Deterministic generator of synthetic activity vaults, for benchmarking.
+
+Usage:
+    python benchmarks/synthetic_vault.py --directory /tmp/vault [--years 2] ...
+
+Vaults are written through the same code as the CLI: activities with
+`create_activity`, plans with a `Schedule.md` in the format of `create_plan`, sessions
+in the format of `create_session`, and practices with `create_practice`, which are
+then filled in with measurements that slowly progress over time. The first activity
+is named "Fitness" and logs a "Weight" exercise, so that reports can find bodyweight.
+"""
+import argparse
+import datetime
+import os
+import random
+import re
+import sys
+from typing import Dict, List, Sequence, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from activity import create_activity  # noqa: E402
+from dir_utils import get_plan_dir, get_report_template_path  # noqa: E402
+from plan import DOW_TO_INT  # noqa: E402
+from practice import create_practice  # noqa: E402
+from report import create_report_template  # noqa: E402
+from vault import Vault  # noqa: E402
+
+DEFAULT_METRIC_MIX = [
+    "Reps | Weight",
+    "Reps",
+    "Variation | Seconds",
+    "Seconds",
+    "Hours | Minutes",
+    "Reps Left | Reps Right",
+    "Completion",
+]
+VARIATIONS = ["Tuck", "Advanced Tuck", "Straddle", "Full"]
+PLAN = "Training"
+BODYWEIGHT_EXERCISE = "Weight"
+
+_SET_LINE_PATTERN = re.compile(r"\t(\d+)\.")
+
+
+def _measurement(
+    exercise: str, metric: str, progress: float, rng: random.Random
+) -> str:
+    if exercise == BODYWEIGHT_EXERCISE:
+        return f"{170 + rng.uniform(-3, 3):.1f} lbs"
+    side = metric.split(" ")[-1][0] if metric.endswith(("Left", "Right")) else ""
+    if metric.startswith("Reps"):
+        return f"{rng.randint(3, 8) + int(4 * progress)} {side}".strip()
+    if metric.startswith("Weight"):
+        return f"{round(20 + 40 * progress + rng.uniform(-5, 5))} lbs {side}".strip()
+    if metric.startswith("Seconds"):
+        return f"{rng.randint(5, 20) + int(20 * progress)} s {side}".strip()
+    if metric == "Hours":
+        return f"{rng.randint(0, 2)} h"
+    if metric == "Minutes":
+        return f"{rng.randint(0, 59)} min"
+    if metric == "Completion":
+        return "[x]" if rng.random() < 0.9 else "[ ]"
+    if metric == "Variation":
+        return VARIATIONS[min(int(progress * len(VARIATIONS)), len(VARIATIONS) - 1)]
+    return ""
+
+
+def _fill_practice(
+    practice_path: str,
+    exercise_metrics: Dict[str, List[str]],
+    progress: float,
+    skip_rate: float,
+    rng: random.Random,
+):
+    with open(practice_path, "r") as file:
+        lines = file.readlines()
+
+    skipped = rng.random() < skip_rate
+    exercise = None
+    filled_lines = []
+    for line in lines:
+        set_match = _SET_LINE_PATTERN.match(line)
+        if line.startswith("# ") and skipped:
+            line = f"{line.rstrip()} - SKIPPED\n"
+        elif line.startswith("- [ ] "):
+            exercise = line[6:].strip()
+            if not skipped and rng.random() < 0.8:
+                line = line.replace("[ ]", "[x]", 1)
+        elif line.startswith("- "):
+            exercise = line[2:].strip()
+        elif set_match is not None and not skipped and exercise in exercise_metrics:
+            measurements = [
+                _measurement(exercise, metric, progress, rng)
+                for metric in exercise_metrics[exercise]
+            ]
+            line = f"\t{set_match.group(1)}. {', '.join(measurements)}\n"
+        filled_lines.append(line)
+
+    with open(practice_path, "w") as file:
+        file.writelines(filled_lines)
+
+
+def _create_plan(
+    activity: str,
+    start: datetime.date,
+    sessions_per_week: int,
+    exercises_per_session: int,
+    sets: int,
+    metric_mix: Sequence[str],
+    include_bodyweight: bool,
+    rng: random.Random,
+) -> Tuple[Dict[str, Dict[str, List[str]]], Dict[int, List[str]]]:
+    """
+    Write a plan with its schedule and sessions, returning the metrics of every
+    exercise of every session type, and the session types of every day of the week.
+    """
+    plan_dir = get_plan_dir(plan=PLAN, activity=activity, date=start.isoformat())
+    os.mkdir(plan_dir)
+
+    num_session_types = min(sessions_per_week, 3)
+    session_types = [
+        f"Session {chr(ord('A') + idx)}" for idx in range(num_session_types)
+    ]
+    session_metrics = {}
+    exercise_idx = 0
+    for session_type in session_types:
+        exercise_metrics = {}
+        if include_bodyweight:
+            exercise_metrics[BODYWEIGHT_EXERCISE] = ["Weight"]
+        for _ in range(exercises_per_session):
+            exercise_idx += 1
+            exercise_metrics[f"Exercise {exercise_idx}"] = [
+                metric.strip() for metric in rng.choice(metric_mix).split("|")
+            ]
+        session_metrics[session_type] = exercise_metrics
+
+        with open(os.path.join(plan_dir, f"{session_type}.md"), "w") as file:
+            file.write(f"# {session_type}\n")
+            for exercise, metrics in exercise_metrics.items():
+                file.write(f"- {exercise}\n")
+                file.write(f"\t- Metric: {' | '.join(metrics)}\n")
+                file.write("\t- Rest: 2 mins\n")
+                if exercise == BODYWEIGHT_EXERCISE:
+                    file.write("\t- Sets: 1\n")
+                elif metrics != ["Completion"]:
+                    file.write(f"\t- Sets: {sets}\n")
+
+    # spread the sessions evenly over the week.
+    days = [int(idx * 7 / sessions_per_week) for idx in range(sessions_per_week)]
+    day_sessions: Dict[int, List[str]] = {day: [] for day in range(7)}
+    for idx, day in enumerate(days):
+        session_type = session_types[idx % num_session_types]
+        # practices are named by date and session, so a session is at most daily.
+        if session_type not in day_sessions[day % 7]:
+            day_sessions[day % 7].append(session_type)
+    with open(os.path.join(plan_dir, "Schedule.md"), "w") as file:
+        for dow, day in DOW_TO_INT.items():
+            file.write(f"# {dow}\n")
+            if len(day_sessions[day]) == 0:
+                file.write("- Rest\n")
+            for session_type in day_sessions[day]:
+                file.write(f"- {session_type}\n")
+                file.write("\t- 08:00 - 09:00\n")
+
+    return session_metrics, day_sessions
+
+
+def _create_reports(activity: str, session_metrics: Dict[str, Dict[str, List[str]]]):
+    for session_type, exercise_metrics in session_metrics.items():
+        # only exercises with numeric measurements can be analyzed.
+        exercises = [
+            exercise
+            for exercise, metrics in exercise_metrics.items()
+            if exercise != BODYWEIGHT_EXERCISE
+            and any(metric not in {"Completion", "Variation"} for metric in metrics)
+        ]
+        if len(exercises) == 0:
+            continue
+        create_report_template(session_type, activity)
+        with open(get_report_template_path(session_type, activity), "w") as file:
+            file.write("\n".join(f"- Exercise: {exercise}" for exercise in exercises))
+            file.write("\n- Is Bodyweight Exercise\n")
+
+
+def generate_vault(
+    vault_dir: str,
+    num_activities: int = 1,
+    years: float = 1.0,
+    sessions_per_week: int = 3,
+    exercises_per_session: int = 4,
+    sets: int = 3,
+    metric_mix: Sequence[str] = DEFAULT_METRIC_MIX,
+    skip_rate: float = 0.05,
+    end: str = "2024-01-01",
+    seed: int = 0,
+):
+    """
+    Generate a synthetic vault. The same arguments always produce the same vault.
+
+    Args:
+        vault_dir (str): The directory to create the vault in.
+        num_activities (int, optional): The number of activities. Defaults to 1.
+        years (float, optional): The years of practice history. Defaults to 1.0.
+        sessions_per_week (int, optional): Practices per week. Defaults to 3.
+        exercises_per_session (int, optional): Exercises of each session, not
+            counting bodyweight. Defaults to 4.
+        sets (int, optional): Sets of each exercise. Defaults to 3.
+        metric_mix (Sequence[str], optional): Metric declarations to choose from for
+            each exercise. Defaults to DEFAULT_METRIC_MIX.
+        skip_rate (float, optional): Fraction of practices that are skipped.
+            Defaults to 0.05.
+        end (str, optional): The day after the last practice, as YYYY-MM-DD.
+            Defaults to "2024-01-01".
+        seed (int, optional): The random seed. Defaults to 0.
+    """
+    rng = random.Random(seed)
+    end_date = datetime.datetime.strptime(end, "%Y-%m-%d").date()
+    num_days = int(years * 365)
+    start_date = end_date - datetime.timedelta(days=num_days)
+
+    os.makedirs(vault_dir, exist_ok=True)
+    with Vault(vault_dir):
+        for activity_idx in range(num_activities):
+            activity = (
+                "Fitness" if activity_idx == 0 else f"Activity {activity_idx + 1}"
+            )
+            create_activity(activity)
+            session_metrics, day_sessions = _create_plan(
+                activity,
+                start_date,
+                sessions_per_week,
+                exercises_per_session,
+                sets,
+                metric_mix,
+                include_bodyweight=activity_idx == 0,
+                rng=rng,
+            )
+            _create_reports(activity, session_metrics)
+
+            for day in range(num_days):
+                date = start_date + datetime.timedelta(days=day)
+                date_str = date.isoformat()
+                for session_type in day_sessions[date.weekday()]:
+                    practice_name = " ".join([date_str, PLAN, "-", session_type])
+                    create_practice(
+                        session_type=session_type,
+                        plan=PLAN,
+                        activity=activity,
+                        date=date_str,
+                        practice_name=practice_name,
+                        error_if_exists=False,
+                    )
+                    practice_path = os.path.join(
+                        vault_dir,
+                        activity,
+                        "Practice",
+                        date_str[:4],
+                        date_str[:7],
+                        f"{practice_name}.md",
+                    )
+                    _fill_practice(
+                        practice_path,
+                        session_metrics[session_type],
+                        progress=day / num_days,
+                        skip_rate=skip_rate,
+                        rng=rng,
+                    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--directory", required=True, help="the vault to create")
+    parser.add_argument("--activities", type=int, default=1)
+    parser.add_argument("--years", type=float, default=1.0)
+    parser.add_argument("--sessions-per-week", type=int, default=3)
+    parser.add_argument("--exercises-per-session", type=int, default=4)
+    parser.add_argument("--sets", type=int, default=3)
+    parser.add_argument(
+        "--metric-mix",
+        nargs="+",
+        default=DEFAULT_METRIC_MIX,
+        help='metric declarations to choose from, e.g. "Reps | Weight"',
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    generate_vault(
+        args.directory,
+        num_activities=args.activities,
+        years=args.years,
+        sessions_per_week=args.sessions_per_week,
+        exercises_per_session=args.exercises_per_session,
+        sets=args.sets,
+        metric_mix=args.metric_mix,
+        seed=args.seed,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,8 @@
 import os
 from typing import List
 
-from config import get_activity_vault
 from dir_utils import get_activity_dir
+from vault import get_vault
 
 
 def create_activity(name: str):
@@ -17,7 +17,7 @@ def create_activity(name: str):
 
 
 def get_activities() -> List[str]:
-    activity_vault = get_activity_vault()
+    activity_vault = get_vault().path
     activity_paths = os.listdir(activity_vault)
     activities = [
         path
@@ -11,6 +11,9 @@ from commands.commands import (
     handle_exercise_compare_command,
     handle_exercise_info_command,
     handle_exercise_ls_command,
+    handle_exercise_trend_command,
+    handle_export_command,
+    handle_plan_adherence_command,
     handle_plan_create_command,
     handle_plan_info_command,
     handle_plan_ls_command,
@@ -21,9 +24,11 @@ from commands.commands import (
     handle_practice_ls_command,
     handle_report_generate_command,
     handle_report_template_command,
+    handle_serve_command,
     handle_session_create_command,
     handle_session_info_command,
     handle_session_ls_command,
+    handle_watch_command,
 )
 
 """
@@ -32,7 +37,11 @@ Config Commands
 
 
 def handle_config_cli_command(args: Namespace):
-    handle_config_command(activity_vault=args.directory)
+    handle_config_command(
+        activity_vault=args.directory,
+        bodyweight_activity=args.bodyweight_activity,
+        bodyweight_exercise=args.bodyweight_exercise,
+    )
 
 
 """
@@ -81,7 +90,7 @@ def _handle_report_template_cli_command(args: Namespace):
 
 
 def _handle_report_generate_cli_command(args: Namespace):
-    handle_report_generate_command(activity=args.activity)
+    handle_report_generate_command(activity=args.activity, jobs=args.jobs)
 
 
 """
@@ -96,6 +105,7 @@ def handle_plan_cli_command(args: Namespace):
         "info": _handle_plan_info_cli_command,
         "schedule": _handle_plan_schedule_cli_command,
         "visualize": _handle_plan_visualize_command,
+        "adherence": _handle_plan_adherence_command,
     }
 
     subcommands[args.subcommand](args)
@@ -115,12 +125,20 @@ def _handle_plan_info_cli_command(args: Namespace):
 
 def _handle_plan_schedule_cli_command(args: Namespace):
     handle_plan_schedule_command(
-        until=args.until, plan=args.name, activity=args.activity
+        until=args.until, plan=args.name, activity=args.activity, dry_run=args.dry_run
+    )
+
+
+def _handle_plan_adherence_command(args: Namespace):
+    handle_plan_adherence_command(
+        activity=args.activity, by=args.by, plan=args.plan, until=args.until
     )
 
 
 def _handle_plan_visualize_command(args: Namespace):
-    handle_plan_visualize_command(plan=args.plan, activity=args.activity)
+    handle_plan_visualize_command(
+        plan=args.plan, activity=args.activity, until=args.until
+    )
 
 
 """
@@ -194,13 +212,14 @@ def handle_exercise_cli_command(args: Namespace):
         "ls": _handle_exercise_ls_cli_command,
         "info": _handle_exercise_info_cli_command,
         "compare": _handle_exercise_compare_cli_command,
+        "trend": _handle_exercise_trend_cli_command,
     }
 
     subcommands[args.subcommand](args)
 
 
 def _handle_exercise_ls_cli_command(args: Namespace):
-    handle_exercise_ls_command(activity=args.activity)
+    handle_exercise_ls_command(activity=args.activity, sort=args.sort)
 
 
 def _handle_exercise_info_cli_command(args: Namespace):
@@ -217,3 +236,38 @@ def _handle_exercise_compare_cli_command(args: Namespace):
         exercise_2=args.name2,
         start=args.start,
     )
+
+
+def _handle_exercise_trend_cli_command(args: Namespace):
+    handle_exercise_trend_command(
+        activity=args.activity, exercises=args.name, forgetting=args.forgetting
+    )
+
+
+"""
+Watch Commands
+"""
+
+
+def handle_watch_cli_command(args: Namespace):
+    handle_watch_command(activity=args.activity, interval=args.interval)
+
+
+"""
+Export Commands
+"""
+
+
+def handle_export_cli_command(args: Namespace):
+    handle_export_command(
+        activity=args.activity, format=args.format, output=args.output
+    )
+
+
+"""
+Serve Commands
+"""
+
+
+def handle_serve_cli_command(args: Namespace):
+    handle_serve_command(host=args.host, port=args.port, socket_path=args.socket)
@@ -1,12 +1,16 @@
 """
 Main functionality of the app.
+
+Modules that pull in the analytics and plotting stacks (pandas, matplotlib, etc.)
+are imported inside the commands that need them, so that other commands start fast.
 """
+import os
+from typing import List, Optional
+
 from activity import create_activity, get_activities, get_activity
 from config import create_config
-from exercise import get_exercise, get_exercises, visualize_exercise_data
-from plan import create_plan, get_plans, schedule, visualize_plan
+from plan import create_plan, get_plan_adherence, get_plans, schedule, visualize_plan
 from practice import create_practice
-from report import create_report_template, generate_reports
 from session import create_session, get_sessions
 
 """
@@ -14,8 +18,16 @@ Config
 """
 
 
-def handle_config_command(activity_vault: str):
-    create_config(activity_vault=activity_vault)
+def handle_config_command(
+    activity_vault: str,
+    bodyweight_activity: Optional[str] = None,
+    bodyweight_exercise: Optional[str] = None,
+):
+    create_config(
+        activity_vault=activity_vault,
+        bodyweight_activity=bodyweight_activity,
+        bodyweight_exercise=bodyweight_exercise,
+    )
 
 
 """
@@ -43,11 +55,15 @@ Report
 
 
 def handle_report_template_command(name: str, activity: str):
+    from report import create_report_template
+
     create_report_template(name, activity)
 
 
-def handle_report_generate_command(activity: str):
-    generate_reports(activity)
+def handle_report_generate_command(activity: str, jobs: int):
+    from report import generate_reports
+
+    generate_reports(activity, jobs=jobs)
 
 
 """
@@ -68,12 +84,43 @@ def handle_plan_info_command(plan: str):
     pass
 
 
-def handle_plan_schedule_command(until: str, plan: str, activity: str):
-    schedule(until=until, plan=plan, activity=activity)
+def handle_plan_schedule_command(
+    until: str, plan: str, activity: str, dry_run: bool = False
+):
+    practice_paths = schedule(
+        until=until, plan=plan, activity=activity, dry_run=dry_run
+    )
+    practice_names = [os.path.basename(path)[:-3] for path in practice_paths]
+    verb = "Would create" if dry_run else "Created"
+    print(f"{verb} {len(practice_names)} practices:\n\t" + "\n\t".join(practice_names))
 
 
-def handle_plan_visualize_command(plan: str, activity: str):
-    visualize_plan(plan, activity)
+def handle_plan_adherence_command(
+    activity: str, by: str, plan: Optional[str], until: Optional[str]
+):
+    adherence = get_plan_adherence(activity=activity, by=by, plan=plan, until=until)
+    if len(adherence) == 0:
+        print(f"No practices of {activity} to rate")
+        return
+
+    for group, group_adherence in adherence.groupby("Group", observed=True, sort=False):
+        print(f"{group}:")
+        for _, row in group_adherence.iterrows():
+            line = (
+                f"\t{row['Window']}: {row['Completion Rate']:.0%} done, "
+                f"{row['Skip Rate']:.0%} skipped of {row['Planned']} exercises"
+            )
+            if row["Set Lines"] > 0:
+                line += f", {row['Set Rate']:.0%} of {row['Set Lines']} sets logged"
+            print(line)
+
+
+def handle_plan_visualize_command(plan: str, activity: str, until: Optional[str]):
+    paths = visualize_plan(plan, activity, until=until)
+    if len(paths) == 0:
+        print(f"No practices of plan {plan} to visualize")
+        return
+    print(f"Saved {len(paths)} pages:\n\t" + "\n\t".join(paths))
 
 
 """
@@ -118,23 +165,96 @@ Exercise
 """
 
 
-def handle_exercise_ls_command(activity: str):
-    exercises = get_exercises(activity=activity)
-    print(f"{activity} Exercises:\n\t" + "\n\t".join(exercises))
+def handle_exercise_ls_command(activity: Optional[str], sort: str):
+    from exercise import get_exercise_catalog
+
+    catalog = get_exercise_catalog(
+        activities=None if activity is None else [activity], sort=sort
+    )
+    lines = [
+        (exercise if activity is not None else f"{exercise_activity} / {exercise}")
+        + f": {sessions} sessions, {sets} sets, {first:%Y-%m-%d} to {last:%Y-%m-%d}"
+        + (f" ({', '.join(metrics)})" if len(metrics) > 0 else "")
+        for exercise_activity, exercise, first, last, sessions, sets, metrics in (
+            catalog.itertuples(index=False)
+        )
+    ]
+    title = "Exercises" if activity is None else f"{activity} Exercises"
+    print(f"{title}:\n\t" + "\n\t".join(lines))
 
 
 def handle_exercise_info_command(exercise: str, activity: str, start: str):
+    from exercise import get_exercise, visualize_exercise_data
+
     all_data = get_exercise(activity=activity, exercise=exercise, start=start)
-    visualize_exercise_data(all_data)
+    visualize_exercise_data({exercise: all_data})
 
 
 def handle_exercise_compare_command(
     exercise_1: str, activity_1: str, exercise_2: str, activity_2: str, start: str
 ):
+    from exercise import get_exercise, visualize_exercise_data
+
     exercise_1_data = get_exercise(
         activity=activity_1, exercise=exercise_1, start=start
     )
     exercise_2_data = get_exercise(
         activity=activity_2, exercise=exercise_2, start=start
     )
-    visualize_exercise_data(exercise_1_data | exercise_2_data)
+    visualize_exercise_data({exercise_1: exercise_1_data, exercise_2: exercise_2_data})
+
+
+def handle_exercise_trend_command(
+    activity: str, exercises: Optional[List[str]], forgetting: float
+):
+    from exercise import get_best_set_trends
+
+    trends = get_best_set_trends(
+        activity=activity, exercises=exercises, forgetting=forgetting
+    )
+    for exercise_metric, results in trends.items():
+        print(f"Results for {exercise_metric}:")
+        for values in results.values():
+            for key, value in values.items():
+                print(f"{key}: {value:0.2f}")
+        print()
+
+
+"""
+Watch
+"""
+
+
+def handle_watch_command(activity: str, interval: float):
+    from watch import watch
+
+    try:
+        watch(activity=activity, interval=interval)
+    except KeyboardInterrupt:
+        print(f"Stopped watching {activity}")
+
+
+"""
+Export
+"""
+
+
+def handle_export_command(activity: str, format: str, output: Optional[str]):
+    from export import export
+
+    paths = export(activity=activity, format=format, export_dir=output)
+    print(f"Exported {activity} to {len(paths)} files:\n\t" + "\n\t".join(paths))
+
+
+"""
+Serve
+"""
+
+
+def handle_serve_command(host: str, port: int, socket_path: Optional[str]):
+    from serve import serve
+
+    try:
+        serve(host=host, port=port, socket_path=socket_path)
+    except KeyboardInterrupt:
+        print("Stopped serving")
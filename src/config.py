@@ -2,14 +2,18 @@
 Functions to handle configuration.
 """
 import os
+from typing import Optional
 
 import yaml
 from configurator import Config
 
+from profiling import phase
+
 CONFIG_PATH = "./config.yml"
 
 
-def _load_config() -> Config:
+@phase("config load")
+def load_config() -> Config:
     """
     Loads in the current config from the default path
     """
@@ -17,16 +21,20 @@ def _load_config() -> Config:
     return config
 
 
-def create_config(activity_vault: str) -> Config:
+def create_config(
+    activity_vault: str,
+    bodyweight_activity: Optional[str] = None,
+    bodyweight_exercise: Optional[str] = None,
+) -> Config:
     """
-    Creates and saves a new config.
+    Creates and saves a new config. Optional settings are only saved when given, so
+    that their defaults apply otherwise.
     """
     config = {"activity_vault": os.path.abspath(activity_vault)}
+    if bodyweight_activity is not None:
+        config["bodyweight_activity"] = bodyweight_activity
+    if bodyweight_exercise is not None:
+        config["bodyweight_exercise"] = bodyweight_exercise
     with open("./config.yml", "w") as file:
         yaml.dump(config, file)
     return config
-
-
-def get_activity_vault() -> str:
-    config = _load_config()
-    return config["activity_vault"]
@@ -1,21 +1,22 @@
 import os
 from typing import Optional
 
-from config import get_activity_vault
+from vault import get_vault
+
+INDEX_FILENAME = ".index.sqlite"
 
 
 def get_activity_dir(activity: str) -> str:
-    activity_vault = get_activity_vault()
-    activity_dir = os.path.join(activity_vault, activity)
-    return activity_dir
+    return get_vault().get_activity_dir(activity)
 
 
-def get_reports_dir(activity: str) -> str:
-    reports_dir = os.path.join(get_activity_dir(activity), "Report")
-    if not os.path.isdir(reports_dir):
-        os.mkdir(reports_dir)
+def get_index_path(activity: str) -> str:
+    index_path = os.path.join(get_activity_dir(activity), INDEX_FILENAME)
+    return index_path
+
 
-    return reports_dir
+def get_reports_dir(activity: str) -> str:
+    return get_vault().get_reports_dir(activity)
 
 
 def get_report_dir(name: str, activity: str) -> str:
@@ -43,23 +44,13 @@ def get_report_template_path(name: str, activity: str) -> str:
 
 
 def get_plan_dir(plan: str, activity: str, date: Optional[str] = None) -> str:
+    return get_vault().get_plan_dir(plan=plan, activity=activity, date=date)
+
+
+def get_export_dir(activity: str) -> str:
     activity_dir = get_activity_dir(activity)
-    plans_dir = os.path.join(activity_dir, "Plan")
-    if date is None:
-        # find date corresponding to this plan
-        matches = [
-            path
-            for path in os.listdir(plans_dir)
-            if os.path.isdir(os.path.join(plans_dir, path)) and path.endswith(plan)
-        ]
-        if len(matches) > 1:
-            raise ValueError(matches)
-        if len(matches) == 0:
-            raise ValueError(plan)
-        date = matches[0].split(" ")[0]
-    plan = " ".join([date, plan])
-    plan_dir = os.path.join(plans_dir, plan)
-    return plan_dir
+    export_dir = os.path.join(activity_dir, "Export")
+    return export_dir
 
 
 def get_practices_dir(activity: str) -> str:
@@ -1,145 +1,179 @@
 import os
-from datetime import datetime
-from logging import debug
-from typing import Dict, List, Optional, Tuple
+from datetime import date
+from logging import DEBUG, debug, getLogger
+from typing import BinaryIO, Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
 
-import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
-import seaborn as sns
-import statsmodels.api as sm
 
+from activity import get_activities
 from dir_utils import get_practices_dir
-from plan import _filter_non_digits, _measurement_to_metric, _str_to_float
-
-plt.style.use("seaborn-v0_8")
-
-
-def _get_exercises_from_file(session_dir: str) -> List[str]:
-    with open(session_dir, "r") as file:
-        lines = file.readlines()
+from index import (
+    EXERCISE_ROW_SET,
+    ROLLUP_AGGREGATIONS,
+    get_catalog,
+    get_index,
+    get_rollups,
+    get_trends,
+    iter_index_rows,
+)
+from plotting import get_pyplot
+from profiling import phase
+from trends import Trends, fit_rolling_trends, fit_trends
+
+# Weeks past the last measurement to predict each metric at.
+PREDICTION_HORIZONS = {
+    "1 Month (4 Weeks)": 4,
+    "1 Season (13 Weeks)": 13,
+    "1/2 Year (26 Weeks)": 26,
+    "1 Year (52 Weeks)": 52,
+}
+
+# Recent windows to also fit the weekly trend of each metric over, in weeks up to its
+# last measurement, e.g. to show plateaus that the trend of the whole history hides.
+TREND_WINDOWS = {
+    "Last 4 Weeks": 4,
+    "Last 8 Weeks": 8,
+    "Last 12 Weeks": 12,
+}
+
+
+class SetRecord(NamedTuple):
+    date: date
+    plan: str
+    session: str
+    practice: str
+    exercise: str
+    set: int
+    # the value of every metric measured in the set, e.g. {"Reps": 5.0}.
+    metrics: Dict[str, float]
+
+
+def iter_sets(
+    activity: str,
+    exercise: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+) -> Iterator[SetRecord]:
+    """
+    Lazily get every measured set, in date order, without loading the index. Once the
+    practices are checked for changes, memory stays constant however long the history
+    is, e.g. to count sets or find records:
 
-    for line_idx, line in enumerate(lines):
-        if line == "## Notes\n":
-            lines = lines[:line_idx]
-            break
-    exercises_lines = [line[2:].strip() for line in lines if line.startswith("- ")]
-    exercises_lines = [
-        line[4:] if line.startswith("[") else line for line in exercises_lines
-    ]
+        max(record.metrics.get("Weight", 0) for record in iter_sets("Fitness"))
 
-    exercises_lines = [
-        line[:-9].strip() if line.endswith("- SKIPPED") else line
-        for line in exercises_lines
-    ]
-    exercises_lines = [line for line in exercises_lines if len(line) > 0]
-
-    return exercises_lines
-
-
-def _get_exercise_results_from_file(
-    session_dir: str, exercise_name: str
-) -> Tuple[datetime, dict]:
-    found_exercise = False
-    session_date_str = os.path.split(session_dir)[-1][:10]
-    session_date = datetime.strptime(session_date_str, "%Y-%m-%d")
-    exercise_results = {}
-    with open(session_dir, "r") as file:
-        lines = file.readlines()
-
-    metrics = None
-    for line in lines:
-        if line.startswith("## Notes"):
-            break
-        if line.startswith("# "):
-            skipped = "skipped" in line.lower()
-            exercise_results["skipped"] = skipped
-            if skipped:
-                break
-
-            # assert line[2:-1] == session_name, f"{line[2:-1]} != {session_name}"
-
-        elif line.startswith("- "):
-            completion_false = line.startswith("- [ ] ")
-            completion_true = line.startswith("- [x] ")
-            new_exercise_name = (
-                line[6:-1] if completion_false or completion_true else line[2:-1]
+    Args:
+        activity (str): The activity of the sets.
+        exercise (Optional[str], optional): Only get sets of this exercise. Defaults
+            to None.
+        start (Optional[str], optional): The date to start looking at historical data,
+            as YYYY-MM-DD. Defaults to None.
+        end (Optional[str], optional): The date to stop looking at historical data,
+            inclusive, as YYYY-MM-DD. Defaults to None.
+
+    Yields:
+        SetRecord: Every set with a measured metric, with the same values as the rows
+            of `get_exercise`.
+    """
+    record = None
+    for (
+        practice_date,
+        plan,
+        session,
+        practice,
+        set_exercise,
+        set_idx,
+        metric,
+        value,
+        _,
+        _,
+        skipped,
+    ) in iter_index_rows(activity=activity, exercise=exercise, start=start, end=end):
+        if (
+            set_idx == EXERCISE_ROW_SET
+            or skipped
+            or metric == "Completion"
+            or value is None
+        ):
+            continue
+        # the metrics of a set are consecutive rows.
+        if record is None or (practice, set_exercise, set_idx) != (
+            record.practice,
+            record.exercise,
+            record.set,
+        ):
+            if record is not None:
+                yield record
+            record = SetRecord(
+                date.fromisoformat(practice_date),
+                plan,
+                session,
+                practice,
+                set_exercise,
+                set_idx,
+                {},
             )
-            if found_exercise:
-                return session_date, exercise_results
-            if new_exercise_name == exercise_name:
-                found_exercise = True
-                exercise_results = {}
-                if completion_false:
-                    exercise_results["completed"] = False
-                if completion_true:
-                    exercise_results["completed"] = True
-
-        elif line.startswith("\t- "):
-            if line[3:].startswith("Metric: "):
-                metrics = [metric.strip() for metric in line[11:].split("|")]
-                if "completed" not in exercise_results:
-                    for metric in metrics:
-                        exercise_results[metric] = []
-
-        elif line.startswith("\t") and len(line) >= 3 and line[2] == ".":
-            set_measurements = [
-                measurement.strip() for measurement in line[3:].split(",")
-            ]
-            set_metrics = [
-                _measurement_to_metric(measurement) for measurement in set_measurements
-            ]
-
-            for metric, measurement in zip(set_metrics, set_measurements):
-                if "Hours" == metric and "Minutes" in set_metrics:
-                    measurement_val = _filter_non_digits(measurement)
-                    new_measurement_val = (
-                        float(measurement_val)
-                        + int(
-                            _filter_non_digits(
-                                set_measurements[set_metrics.index("Minutes")]
-                            )
-                        )
-                        / 60
-                    )
-                    measurement = (
-                        f"{new_measurement_val}"
-                        f"{measurement.removeprefix(measurement_val)}"
-                    )
-
-                if "Minutes" == metric and "Hours" in set_metrics:
-                    continue
-
-                if metric in exercise_results:
-                    exercise_results[metric].append(measurement)
-
-    if not found_exercise:
-        return session_date, {}
-    return session_date, exercise_results
+        # keep the first value of any duplicates, as `get_exercise` does.
+        record.metrics.setdefault(metric, value)
+    if record is not None:
+        yield record
 
 
 def get_exercises(
     activity: str,
 ) -> List[str]:
-    practices_dir = get_practices_dir(activity=activity)
-    if not os.path.isdir(practices_dir):
-        raise FileNotFoundError(practices_dir)
+    index = get_index(activity=activity)
+    return sorted(index["Exercise"].unique())
+
 
-    all_session_exercises = []
-    for session_path, _, files in os.walk(practices_dir):
-        for session in files:
-            session_dir = os.path.join(session_path, session)
-            # extract exercises from session plan
-            session_exercises = _get_exercises_from_file(session_dir)
-            all_session_exercises.extend(session_exercises)
+# Columns to sort the exercise catalog by, and whether ascending, by sort name.
+CATALOG_SORTS = {
+    "name": (["Activity", "Exercise"], True),
+    "recent": (["Last", "Activity", "Exercise"], [False, True, True]),
+    "frequent": (["Sessions", "Activity", "Exercise"], [False, True, True]),
+}
 
-    return list(set(all_session_exercises))
+
+def get_exercise_catalog(
+    activities: Optional[List[str]] = None, sort: str = "name"
+) -> pd.DataFrame:
+    """
+    Summarize the exercises of several activities, e.g. to find the most recent ones.
+
+    Args:
+        activities (Optional[List[str]], optional): The activities to summarize.
+            Defaults to every activity with practices.
+        sort (str, optional): One of `CATALOG_SORTS`: by "name", most "recent" first
+            or most "frequent" first. Defaults to "name".
+
+    Returns:
+        pd.DataFrame: The catalog of each activity, as returned by `get_catalog`, with
+            an "Activity" column.
+    """
+    if sort not in CATALOG_SORTS:
+        raise ValueError(sort)
+    if activities is None:
+        activities = [
+            activity
+            for activity in get_activities()
+            if os.path.isdir(get_practices_dir(activity=activity))
+        ]
+
+    catalogs = [
+        get_catalog(activity=activity).assign(Activity=activity)
+        for activity in activities
+    ]
+    catalog = pd.concat(catalogs, ignore_index=True)
+    columns, ascending = CATALOG_SORTS[sort]
+    catalog = catalog.sort_values(columns, ascending=ascending, ignore_index=True)
+    return catalog[["Activity", *catalog.columns.drop("Activity")]]
 
 
 def get_exercise(
     activity: str,
     exercise: str,
     start: Optional[str] = None,
+    float32: bool = False,
 ) -> pd.DataFrame:
     """
     Get the data for a given exercise.
@@ -148,6 +182,8 @@ def get_exercise(
         activity (str): The activity of the exercise.
         exercise (str): The specified exercise.
         start (Optional[str], optional): The date to start looking at historical data. Defaults to None.
+        float32 (bool, optional): Store metrics as float32 rather than float64, to
+            halve their memory. Defaults to False.
 
     Returns:
         pd.DataFrame: A dataframe of the results.
@@ -158,153 +194,331 @@ def get_exercise(
             - One column corresponding to each metric.
             Each row corresponds to a single set performed.
     """
-    if start is not None:
-        start = datetime.strptime(start, "%Y-%m-%d")
-    practices_dir = get_practices_dir(activity=activity)
-    if not os.path.isdir(practices_dir):
-        raise FileNotFoundError(practices_dir)
-
-    all_session_exercises: List[Dict] = []
-    session_dates = []
-    for session_path, _, files in os.walk(practices_dir):
-        for session in files:
-            session_dir = os.path.join(session_path, session)
-            # extract exercises from session plan
-            session_date, session_exercises = _get_exercise_results_from_file(
-                session_dir, exercise_name=exercise
-            )
-            if len(session_exercises) > 0 and (start is None or session_date >= start):
-                all_session_exercises.append(session_exercises)
-                session_dates.append(session_date)
-    metrics = list(
-        set(
-            [
-                key
-                for exercise_metrics in all_session_exercises
-                for key in exercise_metrics
-            ]
-        )
+    index = get_index(activity=activity, start=start)
+    return get_exercise_from_index(index, exercise, float32=float32)
+
+
+@phase("dataframe build")
+def get_exercise_from_index(
+    index: pd.DataFrame, exercise: str, float32: bool = False
+) -> pd.DataFrame:
+    """
+    Get the data for a given exercise from an index, e.g. one loaded from an export.
+
+    Args:
+        index (pd.DataFrame): The index to take the exercise from, as returned by
+            `get_index`, a year of `load_export` or `concat_export`.
+        exercise (str): The specified exercise.
+        float32 (bool, optional): Store metrics as float32 rather than float64, to
+            halve their memory. Defaults to False.
+
+    Returns:
+        pd.DataFrame: A dataframe of the results, as returned by `get_exercise`.
+    """
+    # only take the needed columns, at the rows of the exercise.
+    exercise_rows = np.flatnonzero(
+        (index["Exercise"] == exercise).to_numpy() & ~index["Skipped"].to_numpy()
+    )
+    # sessions are numbered over every practice the exercise appears in,
+    # even those without any measurements.
+    sessions, _ = pd.factorize(index["Practice"].cat.codes.to_numpy()[exercise_rows])
+    set_idxs = index["Set"].to_numpy()[exercise_rows]
+    metric_codes = index["Metric"].cat.codes.to_numpy()[exercise_rows]
+    metric_categories = index["Metric"].cat.categories
+    values = index["Value"].to_numpy()[exercise_rows]
+
+    is_set = (
+        (set_idxs != EXERCISE_ROW_SET)
+        & (metric_codes != metric_categories.get_indexer(["Completion"])[0])
+        & ~np.isnan(values)
+    )
+    if not is_set.any():
+        raise ValueError(exercise)
+    skipped_metrics = set(metric_categories[np.unique(metric_codes)]) - set(
+        metric_categories[np.unique(metric_codes[is_set])]
+    )
+    for metric in skipped_metrics - {""}:
+        debug(f"skipping {exercise} {metric}")
+
+    sessions = sessions[is_set]
+    set_idxs = set_idxs[is_set]
+    dates = index["Date"].to_numpy()[exercise_rows][is_set]
+    # categories are sorted, so metrics are too.
+    metric_idxs, metric_codes = pd.factorize(metric_codes[is_set], sort=True)
+    metric_names = metric_categories[metric_codes]
+    # a row per set, ordered by session and then set.
+    row_idxs, row_keys = pd.factorize(
+        sessions.astype(np.int64) * (int(set_idxs.max()) + 1) + set_idxs, sort=True
     )
 
-    all_data = {}
-    for metric in metrics:
-        date_and_measurements = [
-            (date, exercise_metrics.get(metric, {}))
-            for date, exercise_metrics in zip(session_dates, all_session_exercises)
-        ]
+    # fill a preallocated table, keeping the first value of any duplicates.
+    _, firsts = np.unique(row_idxs * len(metric_names) + metric_idxs, return_index=True)
+    table = np.full(
+        (len(row_keys), len(metric_names)),
+        np.nan,
+        dtype=np.float32 if float32 else np.float64,
+    )
+    table[row_idxs[firsts], metric_idxs[firsts]] = values[is_set][firsts]
+
+    _, row_firsts = np.unique(row_idxs, return_index=True)
+    exercise_data = pd.DataFrame(
+        {
+            "Session": sessions[row_firsts].astype(np.int32),
+            "Set": set_idxs[row_firsts],
+            "Date": dates[row_firsts],
+            **{
+                metric: table[:, metric_idx]
+                for metric_idx, metric in enumerate(metric_names)
+            },
+        }
+    )
 
-        # take all measurements across all sets.
-        date_and_measurements = [
-            (
-                date,
-                [
-                    _str_to_float(_filter_non_digits(set_measurement))
-                    for set_measurement in measurement
-                ],
-            )
-            if len(measurement) > 0 and any(len(m) > 0 for m in measurement)
-            else (date, [np.nan])
-            for date, measurement in date_and_measurements
-        ]
+    return exercise_data
+
+
+def get_session_rollups(
+    activity: str,
+    exercise: str,
+    start: Optional[str] = None,
+    aggregation: str = "max",
+) -> pd.DataFrame:
+    """
+    Get the sets of an exercise aggregated per session, from the rollups of its
+    activity rather than its sets.
+
+    Args:
+        activity (str): The activity of the exercise.
+        exercise (str): The specified exercise.
+        start (Optional[str], optional): The date to start looking at historical data,
+            as YYYY-MM-DD. Defaults to None.
+        aggregation (str, optional): One of `ROLLUP_AGGREGATIONS`. Defaults to "max".
+
+    Returns:
+        pd.DataFrame: A dataframe with one row per session with any sets, with the
+            columns "Date" and "Session" of `get_exercise`, and one column per metric,
+            including the volumes of `VOLUME_METRICS`.
+    """
+    if aggregation not in ROLLUP_AGGREGATIONS:
+        raise ValueError(aggregation)
+
+    rollups = get_rollups(activity=activity, start=start, exercise=exercise)
+    # sessions are numbered over every practice the exercise appears in.
+    sessions, _ = pd.factorize(rollups["Practice"].cat.codes.to_numpy())
+    is_measured = (rollups["Metric"] != "").to_numpy()
+    if not is_measured.any():
+        raise ValueError(exercise)
+
+    session_data = (
+        rollups[is_measured]
+        .assign(Session=sessions[is_measured].astype(np.int32))
+        .pivot(index=["Date", "Session"], columns="Metric", values=aggregation)
+        .reset_index()
+    )
+    session_data.columns.name = None
+    return session_data
 
-        data = pd.DataFrame.from_records(
-            [
+
+def _debug_ols_summary(title: str, x: np.ndarray, y: np.ndarray):
+    """
+    Log the full regression summary of a trend, if debugging and statsmodels is
+    installed.
+    """
+    if not getLogger().isEnabledFor(DEBUG):
+        return
+    try:
+        import statsmodels.api as sm
+    except ImportError:
+        debug("install statsmodels for full regression summaries")
+        return
+    debug(f"{title}\n")
+    debug(sm.OLS(y, sm.add_constant(x)).fit().summary())
+
+
+def _get_exercise_series(all_data: Dict[str, pd.DataFrame]) -> List[Dict]:
+    """
+    Gather every exercise-metric series, sorted by exercise and metric.
+    """
+    series = []
+    for exercise, data in sorted(all_data.items(), key=lambda x: x[0]):
+        weeks_from_start = ((data["Date"] - data["Date"].iat[0]).dt.days / 7).to_numpy()
+        for metric in sorted(
+            [col for col in data.columns if col not in {"Set", "Date", "Session"}]
+        ):
+            y = data[metric].to_numpy()
+            notnan_indices = np.argwhere(~np.isnan(y)).flatten()
+            series.append(
                 {
-                    "Session": session_idx,
-                    "Set": set_idx,
-                    "Date": date,
-                    metric: set_metric,
+                    "exercise": exercise,
+                    "metric": metric,
+                    "notnan_data": data.iloc[notnan_indices, :],
+                    "sessions": data["Session"].to_numpy()[notnan_indices],
+                    "weeks": weeks_from_start[notnan_indices],
+                    "y": y[notnan_indices],
                 }
-                for session_idx, (date, measurements) in enumerate(
-                    date_and_measurements
+            )
+    return series
+
+
+@phase("model fit")
+def _fit_exercise_series(series: List[Dict]) -> Tuple[Trends, Trends, np.ndarray]:
+    """
+    Fit the trends of every series at once, per session and per week, and per week
+    over each of the `TREND_WINDOWS` up to its last measurement, with a row per
+    series and a column per window.
+    """
+    ys = [metric_series["y"] for metric_series in series]
+    weeks = [metric_series["weeks"] for metric_series in series]
+    session_trends = fit_trends(
+        [metric_series["sessions"] for metric_series in series], ys
+    )
+    week_trends = fit_trends(
+        weeks,
+        ys,
+        horizons=list(PREDICTION_HORIZONS.values()),
+    )
+    window_slopes = np.array(
+        [
+            slopes[:, -1]
+            for slopes in fit_rolling_trends(weeks, ys, list(TREND_WINDOWS.values()))
+        ]
+    ).reshape(len(series), len(TREND_WINDOWS))
+    return session_trends, week_trends, window_slopes
+
+
+def _get_trend_results(
+    session_trends: Trends,
+    week_trends: Trends,
+    window_slopes: np.ndarray,
+    series_idx: int,
+) -> Dict[str, Dict[str, float]]:
+    return {
+        "Rates": {
+            "Increase per Session": session_trends.slope[series_idx],
+            "Increase per Week": week_trends.slope[series_idx],
+            **{
+                f"Increase per Week ({window})": slope
+                for window, slope in zip(
+                    TREND_WINDOWS.keys(), window_slopes[series_idx]
                 )
-                for set_idx, set_metric in enumerate(measurements)
-            ]
-        )
+            },
+        },
+        "Predictions": dict(
+            zip(PREDICTION_HORIZONS.keys(), week_trends.predictions[series_idx])
+        ),
+    }
 
-        y = data[metric].to_numpy()
-        notnan_indices = np.argwhere(~np.isnan(y))
-        if y[notnan_indices].shape[0] == 0:
-            debug("skipping", exercise, metric)
-            continue
 
-        all_data[metric] = data
+def get_exercise_trends(
+    all_data: Dict[str, pd.DataFrame]
+) -> Dict[str, Dict[str, Dict[str, float]]]:
+    """
+    Get the rates and predictions of every metric of the exercises, without
+    visualizing them.
+
+    Args:
+        all_data (Dict[str, pd.DataFrame]): The data of each exercise, as returned by
+            `get_exercise`.
 
-    final_metrics = list(all_data.keys())
-    exercise_data = all_data[final_metrics[0]]
-    for metric in final_metrics[1:]:
-        exercise_data = pd.merge(
-            exercise_data, all_data[metric], how="outer", on=["Date", "Set", "Session"]
+    Returns:
+        Dict[str, Dict[str, Dict[str, float]]]: The "Rates" and "Predictions" of each
+            metric, by "exercise (metric)", as returned by `visualize_exercise_data`.
+    """
+    series = _get_exercise_series(all_data)
+    session_trends, week_trends, window_slopes = _fit_exercise_series(series)
+    return {
+        f"{metric_series['exercise']} ({metric_series['metric']})": _get_trend_results(
+            session_trends, week_trends, window_slopes, series_idx
         )
+        for series_idx, metric_series in enumerate(series)
+    }
 
-    # drop data if any rows are absent of measurements
-    exercise_data = exercise_data.dropna(how="all", subset=final_metrics)
 
-    return exercise_data
+def get_best_set_trends(
+    activity: str, exercises: Optional[List[str]] = None, forgetting: float = 1.0
+) -> Dict[str, Dict[str, Dict[str, float]]]:
+    """
+    Get the weekly rates and predictions of the best set of each session of every
+    metric of the exercises, from the trends kept in the index, so that only sessions
+    logged since the last call are fit.
 
+    Args:
+        activity (str): The activity the exercises are associated with.
+        exercises (Optional[List[str]], optional): The exercises to get the trends
+            of. Defaults to every exercise.
+        forgetting (float, optional): The factor the weight of a session is
+            multiplied by per week since the last session, as in `get_trends`.
+            Defaults to 1.0, weighing every session the same.
 
-def visualize_exercise_data(
-    all_data: Dict[str, pd.DataFrame], filename: Optional[str] = None
-) -> Dict[str, Dict[str, Dict[str, float]]]:
-    num_metrics = len(
-        [
-            col
-            for data in all_data.values()
-            for col in data.columns
-            if col not in {"Set", "Date", "Session"}
-        ]
-    )
-    _, axs = plt.subplots(
-        nrows=num_metrics, ncols=1, figsize=(20, num_metrics * 3), sharex="col"
-    )
+    Returns:
+        Dict[str, Dict[str, Dict[str, float]]]: The "Rates" and "Predictions" of each
+            metric, by "exercise (metric)", predicting from the last session.
+    """
+    trends = get_trends(activity=activity, forgetting=forgetting)
+    if exercises is not None:
+        for exercise in set(exercises) - set(trends["Exercise"]):
+            raise ValueError(exercise)
+        trends = trends[trends["Exercise"].isin(exercises)]
+    return {
+        f"{exercise} ({metric})": {
+            "Rates": {"Increase per Week": slope},
+            "Predictions": {
+                horizon: value + slope * weeks
+                for horizon, weeks in PREDICTION_HORIZONS.items()
+            },
+        }
+        for exercise, metric, value, slope in zip(
+            trends["Exercise"], trends["Metric"], trends["Value"], trends["Slope"]
+        )
+    }
 
-    if num_metrics == 1:
-        axs = np.array([axs])
 
-    results_dict = {}
+def visualize_exercise_data(
+    all_data: Dict[str, pd.DataFrame], filename: Optional[Union[str, BinaryIO]] = None
+) -> Dict[str, Dict[str, Dict[str, float]]]:
+    # plotting is slow to import, so only do so when needed.
+    import seaborn as sns
 
-    num_plots = 0
-    for exercise, data in sorted(all_data.items(), key=lambda x: x[0]):
+    plt = get_pyplot()
 
-        for metric in sorted(
-            [col for col in data.columns if col not in {"Set", "Date", "Session"}]
-        ):
+    series = _get_exercise_series(all_data)
+    session_trends, week_trends, window_slopes = _fit_exercise_series(series)
 
-            exercise_metric = f"{exercise} ({metric})"
+    num_metrics = len(series)
+    with phase("plot rendering"):
+        _, axs = plt.subplots(
+            nrows=num_metrics, ncols=1, figsize=(20, num_metrics * 3), sharex="col"
+        )
 
-            print(f"Results for {exercise_metric}:")
+    if num_metrics == 1:
+        axs = np.array([axs])
 
-            # Session-wise
-            y = data[metric].to_numpy()
-            x = data["Session"].to_numpy()
-            notnan_indices = np.argwhere(~np.isnan(y)).flatten()
-            y = y[notnan_indices]
-            x = x[notnan_indices]
-            model = sm.OLS(y, sm.add_constant(x))
-            result = model.fit()
+    results_dict = {}
 
-            debug(f"{exercise_metric} Rates\n")
-            debug(result.summary())
-            metric_per_session = result.params[1]
-            print(f"Increase per Session: {metric_per_session:0.2f}")
+    for num_plots, metric_series in enumerate(series):
+        metric = metric_series["metric"]
+        notnan_data = metric_series["notnan_data"]
+        x = metric_series["weeks"]
+        exercise_metric = f"{metric_series['exercise']} ({metric})"
 
-            # Week-wise
-            y = data[metric].to_numpy()
-            weeks_from_start = (data["Date"] - data["Date"].iat[0]).dt.days / 7
-            x = weeks_from_start.to_numpy()
-            notnan_indices = np.argwhere(~np.isnan(y)).flatten()
-            y = y[notnan_indices]
-            x = x[notnan_indices]
-            model = sm.OLS(y, sm.add_constant(x))
-            result = model.fit()
-
-            debug(f"{exercise_metric} Week-wise\n")
-            debug(result.summary())
-            base_metric = result.params[0]
-            metric_per_week = result.params[1]
-            print(f"Increase per Week: {metric_per_week:0.2f}\n")
-            notnan_data = data.iloc[notnan_indices, :]
+        print(f"Results for {exercise_metric}:")
 
+        # Session-wise
+        _debug_ols_summary(
+            f"{exercise_metric} Rates", metric_series["sessions"], metric_series["y"]
+        )
+        metric_per_session = session_trends.slope[num_plots]
+        print(f"Increase per Session: {metric_per_session:0.2f}")
+
+        # Week-wise
+        _debug_ols_summary(f"{exercise_metric} Week-wise", x, metric_series["y"])
+        base_metric = week_trends.intercept[num_plots]
+        metric_per_week = week_trends.slope[num_plots]
+        print(f"Increase per Week: {metric_per_week:0.2f}")
+        for window, slope in zip(TREND_WINDOWS.keys(), window_slopes[num_plots]):
+            print(f"Increase per Week ({window}): {slope:0.2f}")
+        print()
+
+        with phase("plot rendering"):
             sns.scatterplot(data=notnan_data, x="Date", y=metric, ax=axs[num_plots])
 
             next_week = np.floor(np.max(x)) + 1
@@ -333,38 +547,23 @@ def visualize_exercise_data(
             exercise_metric_multiline = exercise_metric_multiline.replace(")", "")
             axs[num_plots].set_ylabel(exercise_metric_multiline)
 
-            # Predictions
-            print(f"{exercise_metric} Predictions:")
-            week_4_pred = base_metric + metric_per_week * (x[-1] + 4)
-            print(f"1 Month (4 Weeks): {week_4_pred:0.2f}")
-            week_13_pred = base_metric + metric_per_week * (x[-1] + 13)
-            print(f"1 Season (13 Weeks): {week_13_pred:0.2f}")
-            week_26_pred = base_metric + metric_per_week * (x[-1] + 26)
-            print(f"1/2 Year (26 Weeks): {week_26_pred:0.2f}")
-            week_52_pred = base_metric + metric_per_week * (x[-1] + 52)
-            print(f"1 Year (52 Weeks): {week_52_pred:0.2f}")
-
-            results_dict[exercise_metric] = {
-                "Rates": {
-                    "Increase per Session": metric_per_session,
-                    "Increase per Week": metric_per_week,
-                },
-                "Predictions": {
-                    "1 Month (4 Weeks)": week_4_pred,
-                    "1 Season (13 Weeks)": week_13_pred,
-                    "1/2 Year (26 Weeks)": week_26_pred,
-                    "1 Year (52 Weeks)": week_52_pred,
-                },
-            }
-
-            if num_plots != num_metrics - 1:
-                print("\n")
-
-            num_plots += 1
-    plt.tight_layout()
-    if filename is None:
-        plt.show()
-    else:
-        plt.savefig(filename)
+        # Predictions
+        print(f"{exercise_metric} Predictions:")
+        results_dict[exercise_metric] = _get_trend_results(
+            session_trends, week_trends, window_slopes, num_plots
+        )
+        for horizon, prediction in results_dict[exercise_metric]["Predictions"].items():
+            print(f"{horizon}: {prediction:0.2f}")
+
+        if num_plots != num_metrics - 1:
+            print("\n")
+
+    with phase("plot rendering"):
+        plt.tight_layout()
+        if filename is None:
+            plt.show()
+        else:
+            plt.savefig(filename)
+            plt.close()
 
     return results_dict
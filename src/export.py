@@ -0,0 +1,256 @@
+"""
+Export the index of an activity as columnar files, so that heavy analysis, e.g. in a
+notebook, doesn't need to parse practices.
+
+Exports are partitioned by year, in the Hive layout that pyarrow, DuckDB and Spark read
+as a single dataset:
+
+    Export/
+        Year=2023/data.arrow
+        Year=2024/data.arrow
+
+Arrow (Feather) files are written uncompressed, so that `load_export` can memory-map
+them rather than reading them into memory, and loads each year on its own so that they
+are only copied if combined with `concat_export`. Arrow and Parquet need pyarrow.
+"""
+import os
+from glob import glob
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from dir_utils import get_export_dir
+from index import LABEL_COLUMNS, index_from_rows, iter_index_rows
+from profiling import phase
+
+PARTITION_COLUMN = "Year"
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+    except ImportError as exception:
+        raise ImportError(
+            "install pyarrow to export to arrow or parquet"
+        ) from exception
+    return pyarrow
+
+
+def _to_arrow_table(index: pd.DataFrame):
+    pa = _import_pyarrow()
+    table = pa.Table.from_pandas(index, preserve_index=False)
+    # keep missing values as NaN rather than nulls, so they are loaded without a copy.
+    return table.set_column(
+        table.schema.get_field_index("Value"),
+        "Value",
+        pa.array(index["Value"].to_numpy(), from_pandas=False),
+    )
+
+
+def _write_arrow(index: pd.DataFrame, path: str):
+    from pyarrow import feather
+
+    feather.write_feather(_to_arrow_table(index), path, compression="uncompressed")
+
+
+def _write_parquet(index: pd.DataFrame, path: str):
+    from pyarrow import parquet
+
+    parquet.write_table(_to_arrow_table(index), path)
+
+
+def _write_csv(index: pd.DataFrame, path: str):
+    index.to_csv(path, index=False)
+
+
+def _read_arrow(path: str) -> pd.DataFrame:
+    from pyarrow import feather
+
+    # split blocks, so that columns are not copied into one block per dtype.
+    table = feather.read_table(path, memory_map=True)
+    return table.to_pandas(split_blocks=True)
+
+
+def _read_parquet(path: str) -> pd.DataFrame:
+    from pyarrow import parquet
+
+    return parquet.read_table(path, memory_map=True).to_pandas(split_blocks=True)
+
+
+def _read_csv(path: str) -> pd.DataFrame:
+    # labels may be empty, e.g. the metric of an exercise row.
+    return pd.read_csv(
+        path,
+        dtype={
+            **{column: str for column in LABEL_COLUMNS},
+            "Set": np.int16,
+            "Value": float,
+            "Measurement": str,
+            "Completed": "boolean",
+            "Skipped": bool,
+        },
+        keep_default_na=False,
+        na_values={"Value": [""], "Completed": [""]},
+        parse_dates=["Date"],
+    )
+
+
+_WRITERS: Dict[str, Callable[[pd.DataFrame, str], None]] = {
+    "arrow": _write_arrow,
+    "parquet": _write_parquet,
+    "csv": _write_csv,
+}
+
+_READERS: Dict[str, Callable[[str], pd.DataFrame]] = {
+    "arrow": _read_arrow,
+    "parquet": _read_parquet,
+    "csv": _read_csv,
+}
+
+EXPORT_FORMATS = list(_WRITERS.keys())
+
+
+def _get_partition_paths(export_dir: str, format: str) -> List[str]:
+    return sorted(
+        glob(os.path.join(export_dir, f"{PARTITION_COLUMN}=*", f"data.{format}"))
+    )
+
+
+def _write_partition(rows: List[tuple], format: str, export_dir: str) -> str:
+    # rows are dated YYYY-MM-DD.
+    partition_dir = os.path.join(export_dir, f"{PARTITION_COLUMN}={rows[0][0][:4]}")
+    with phase("dataframe build"):
+        partition = index_from_rows(rows)
+    with phase("file write"):
+        os.makedirs(partition_dir, exist_ok=True)
+        path = os.path.join(partition_dir, f"data.{format}")
+        _WRITERS[format](partition, path)
+    return path
+
+
+def export(
+    activity: str, format: str = "arrow", export_dir: Optional[str] = None
+) -> List[str]:
+    """
+    Export every set of an activity, one file per year. The sets are streamed from
+    the index database, so only a year of them is ever in memory.
+
+    Args:
+        activity (str): The activity to export.
+        format (str, optional): One of `EXPORT_FORMATS`. Defaults to "arrow".
+        export_dir (Optional[str], optional): The directory to export to. Defaults to
+            the `Export` directory of the activity.
+
+    Returns:
+        List[str]: The paths of the exported files.
+    """
+    if format not in _WRITERS:
+        raise ValueError(format)
+    if format != "csv":
+        _import_pyarrow()
+    if export_dir is None:
+        export_dir = get_export_dir(activity)
+
+    # remove a previous export, which may have years that no longer have practices.
+    for path in _get_partition_paths(export_dir, format):
+        os.remove(path)
+
+    paths = []
+    rows: List[tuple] = []
+    for row in iter_index_rows(activity=activity):
+        # rows are sorted by date, so a year is complete once the next one starts.
+        if len(rows) > 0 and row[0][:4] != rows[0][0][:4]:
+            paths.append(_write_partition(rows, format, export_dir))
+            rows = []
+        rows.append(row)
+    if len(rows) > 0:
+        paths.append(_write_partition(rows, format, export_dir))
+    return paths
+
+
+def load_export(
+    export_dir: str, format: str = "arrow", start: Optional[str] = None
+) -> List[pd.DataFrame]:
+    """
+    Load each year of an export back into its own index, e.g. to get exercises from
+    with `get_exercise_from_index`, or to combine with `concat_export`.
+
+    Arrow files are memory-mapped, so only the pages that are used are read from disk,
+    and the numeric columns of each year are used in place, unless filtered by the
+    start date.
+
+    Args:
+        export_dir (str): The directory that was exported to.
+        format (str, optional): The format that was exported. Defaults to "arrow".
+        start (Optional[str], optional): Only load practices on or after this date, as
+            YYYY-MM-DD. Earlier years aren't read at all. Defaults to None.
+
+    Returns:
+        List[pd.DataFrame]: The index of every exported year, in order, as returned
+            by `get_index`. The categories of the columns in `LABEL_COLUMNS` are only
+            those of the year.
+    """
+    if format not in _READERS:
+        raise ValueError(format)
+    paths = _get_partition_paths(export_dir, format)
+    if start is not None:
+        start_year = pd.Timestamp(start).year
+        paths = [
+            path
+            for path in paths
+            if int(os.path.basename(os.path.dirname(path)).split("=")[1]) >= start_year
+        ]
+    if len(paths) == 0:
+        raise FileNotFoundError(export_dir)
+
+    with phase("file parse"):
+        partitions = [_READERS[format](path) for path in paths]
+    with phase("dataframe build"):
+        for partition in partitions:
+            # only converts csv, which has no categories.
+            partition[LABEL_COLUMNS] = partition[LABEL_COLUMNS].astype("category")
+        if start is not None:
+            # only the first year can have practices before the start date.
+            partitions[0] = partitions[0][
+                partitions[0]["Date"] >= pd.Timestamp(start)
+            ].reset_index(drop=True)
+    return partitions
+
+
+def concat_export(partitions: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Combine the years of an export into a single index, which copies every column.
+
+    Args:
+        partitions (List[pd.DataFrame]): The years of an export, as returned by
+            `load_export`.
+
+    Returns:
+        pd.DataFrame: The index of the whole export, as returned by `get_index`.
+    """
+    if len(partitions) == 1:
+        return partitions[0]
+
+    with phase("dataframe build"):
+        # years have their own categories, which are only kept if they are the same.
+        categories = {
+            column: sorted(
+                set().union(
+                    *[partition[column].cat.categories for partition in partitions]
+                )
+            )
+            for column in LABEL_COLUMNS
+        }
+        return pd.concat(
+            [
+                partition.assign(
+                    **{
+                        column: partition[column].cat.set_categories(column_categories)
+                        for column, column_categories in categories.items()
+                    }
+                )
+                for partition in partitions
+            ],
+            ignore_index=True,
+        )
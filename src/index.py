@@ -0,0 +1,1075 @@
+"""
+Index of every set of every exercise logged in an activity's practices.
+
+Each practice file is parsed once into a long-format table with one row per
+(set, metric), plus one row per exercise occurrence with a `Set` of -1 so that
+exercises without any logged sets are still present. All exercise, report and
+plan queries are answered from this table.
+
+The table is persisted in a SQLite database inside the activity directory, along
+with the modification time and size of every practice file, so that only added,
+changed or deleted practices are re-parsed on later runs.
+"""
+import json
+import os
+import sqlite3
+from itertools import chain
+from logging import debug
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from dir_utils import get_index_path, get_practices_dir
+from profiling import phase
+from tokenizer import (
+    ExerciseItem,
+    MetricDeclaration,
+    SessionHeader,
+    SetLine,
+    tokenize_practice,
+)
+from trends import (
+    TrendState,
+    empty_trend_state,
+    get_state_trends,
+    move_trend_state,
+    update_trend_state,
+)
+from units import parse_measurement
+
+INDEX_COLUMNS = [
+    "Date",
+    "Plan",
+    "Session",
+    "Practice",
+    "Exercise",
+    "Set",
+    "Metric",
+    "Value",
+    "Measurement",
+    "Completed",
+    "Skipped",
+]
+
+# Set index used for the row describing the exercise as a whole.
+EXERCISE_ROW_SET = -1
+
+# Columns with few distinct values, which are stored as categoricals to save memory.
+LABEL_COLUMNS = ["Plan", "Session", "Practice", "Exercise", "Metric"]
+
+# Bump whenever parsing changes, so that existing on-disk indexes are rebuilt.
+INDEX_VERSION = 7
+
+# loaded indexes and the start date they were loaded from, by practices directory.
+_INDEX_CACHE: Dict[str, Tuple[Optional[str], pd.DataFrame]] = {}
+
+# Aggregations of the sets of each metric in a session, kept in `get_rollups`.
+ROLLUP_AGGREGATIONS = ["max", "mean", "sum", "count"]
+
+# Metrics whose product is rolled up as the volume of a set.
+VOLUME_METRICS = {
+    "Volume": ("Weight", "Reps"),
+    "Volume Left": ("Weight Left", "Reps Left"),
+    "Volume Right": ("Weight Right", "Reps Right"),
+}
+
+
+def _set_line_to_measurements(set_line: SetLine) -> List[Tuple[str, str, float]]:
+    """
+    Classify each measurement of a set line into its (metric, measurement, value).
+    """
+    measurements = []
+    for measurement in set_line.measurements:
+        metric, value = parse_measurement(measurement)
+        measurements.append((metric, measurement, value))
+
+    # hours and minutes logged together are combined into fractional hours.
+    set_metrics = [metric for metric, _, _ in measurements]
+    if "Hours" in set_metrics and "Minutes" in set_metrics:
+        hours_idx = set_metrics.index("Hours")
+        minutes_idx = set_metrics.index("Minutes")
+        _, hours_measurement, hours = measurements[hours_idx]
+        minutes = measurements[minutes_idx][2]
+        measurements[hours_idx] = ("Hours", hours_measurement, hours + minutes / 60)
+        del measurements[minutes_idx]
+
+    return measurements
+
+
+@phase("file parse")
+def _parse_practice_file(
+    practice_path: str,
+) -> Tuple[List[tuple], Dict[str, int], Dict[str, List[str]]]:
+    """
+    Parse a single practice file into index rows, ordered as they appear in the file,
+    the number of set lines of each exercise, including empty ones, and the metrics
+    each exercise declares, in declared order.
+    """
+    practice_name = os.path.basename(practice_path)[:-3]
+    date = practice_name[:10]
+    plan, _, session = practice_name[11:].partition(" - ")
+
+    rows = []
+    set_lines: Dict[str, int] = {}
+    declared_metrics: Dict[str, List[str]] = {}
+    skipped = False
+    exercise = None
+    metrics: List[str] = []
+    set_idx = 0
+    with open(practice_path, "r") as file:
+        for event in tokenize_practice(file):
+            if isinstance(event, SessionHeader):
+                skipped = event.skipped
+
+            elif isinstance(event, ExerciseItem):
+                exercise = event
+                metrics = []
+                set_idx = 0
+                set_lines.setdefault(exercise.name, 0)
+                declared_metrics.setdefault(exercise.name, [])
+                rows.append(
+                    (
+                        date,
+                        plan,
+                        session,
+                        practice_name,
+                        exercise.name,
+                        EXERCISE_ROW_SET,
+                        "",
+                        np.nan,
+                        "",
+                        exercise.completed,
+                        skipped or exercise.skipped,
+                    )
+                )
+
+            elif exercise is None:
+                continue
+
+            elif isinstance(event, MetricDeclaration):
+                metrics = event.metrics
+                # an exercise listed twice declares the metrics of both.
+                declared_metrics[exercise.name].extend(
+                    metric
+                    for metric in metrics
+                    if metric not in declared_metrics[exercise.name]
+                )
+
+            elif isinstance(event, SetLine):
+                for metric, measurement, value in _set_line_to_measurements(event):
+                    if metric not in metrics:
+                        continue
+                    rows.append(
+                        (
+                            date,
+                            plan,
+                            session,
+                            practice_name,
+                            exercise.name,
+                            set_idx,
+                            metric,
+                            value,
+                            measurement,
+                            exercise.completed,
+                            skipped or exercise.skipped,
+                        )
+                    )
+                set_idx += 1
+                set_lines[exercise.name] += 1
+
+    return rows, set_lines, declared_metrics
+
+
+def _summarize_exercises(
+    rows: List[tuple],
+    set_lines: Dict[str, int],
+    declared_metrics: Dict[str, List[str]],
+) -> List[Tuple[str, str, str, int, int, Optional[bool], bool, str]]:
+    """
+    Summarize every exercise of a parsed practice as its plan, session, name, number
+    of logged sets (with any measurement of a declared metric, numeric or not, except
+    unchecked completions), number of set lines, whether it was checked off, whether
+    it was skipped and the JSON list of its declared metrics.
+    """
+    summaries: Dict[str, list] = {}
+    exercise_sets: Dict[str, set] = {}
+    for (
+        _,
+        plan,
+        session,
+        _,
+        exercise,
+        set_idx,
+        metric,
+        value,
+        measurement,
+        completed,
+        skipped,
+    ) in rows:
+        if set_idx == EXERCISE_ROW_SET:
+            # an exercise listed twice is summarized as a whole, skipped only if both
+            # are.
+            summary = summaries.setdefault(
+                exercise, [plan, session, exercise, completed, skipped]
+            )
+            summary[4] = summary[4] and skipped
+            exercise_sets.setdefault(exercise, set())
+            continue
+        if skipped or measurement.strip() == "":
+            continue
+        if metric == "Completion" and value == 0:
+            continue
+        exercise_sets[exercise].add(set_idx)
+    return [
+        (
+            plan,
+            session,
+            exercise,
+            len(exercise_sets[exercise]),
+            set_lines[exercise],
+            completed,
+            skipped,
+            json.dumps(declared_metrics[exercise]),
+        )
+        for plan, session, exercise, completed, skipped in summaries.values()
+    ]
+
+
+def _roll_up_exercises(
+    rows: List[tuple],
+) -> List[Tuple[str, str, float, float, float, int]]:
+    """
+    Aggregate the sets of every metric of every exercise of a parsed practice, with
+    the same sets as `get_exercise`, as its exercise, metric and the aggregations in
+    `ROLLUP_AGGREGATIONS`. Every exercise with any rows that weren't skipped also has
+    one with an empty metric, so that sessions are numbered as in `get_exercise`.
+    """
+    exercise_values: Dict[str, Dict[str, List[float]]] = {}
+    set_values: Dict[Tuple[str, int], Dict[str, float]] = {}
+    for _, _, _, _, exercise, set_idx, metric, value, _, _, skipped in rows:
+        if skipped:
+            continue
+        metric_values = exercise_values.setdefault(exercise, {})
+        if set_idx == EXERCISE_ROW_SET or metric == "Completion" or np.isnan(value):
+            continue
+        values = set_values.setdefault((exercise, set_idx), {})
+        # keep the first value of any duplicates.
+        if metric in values:
+            continue
+        values[metric] = value
+        metric_values.setdefault(metric, []).append(value)
+
+    # volumes are rolled up as extra metrics.
+    for volume, (weight, reps) in VOLUME_METRICS.items():
+        for (exercise, _), values in set_values.items():
+            if weight in values and reps in values:
+                exercise_values[exercise].setdefault(volume, []).append(
+                    values[weight] * values[reps]
+                )
+
+    rollups = []
+    for exercise, metric_values in exercise_values.items():
+        for metric, values in metric_values.items():
+            total = sum(values)
+            rollups.append(
+                (exercise, metric, max(values), total / len(values), total, len(values))
+            )
+        rollups.append((exercise, "", np.nan, np.nan, np.nan, 0))
+    return rollups
+
+
+def _is_before(name: str, start: str) -> bool:
+    """
+    Whether a year directory, month directory or practice file, all of which are
+    named starting with their date, lies entirely before the start date.
+    """
+    date = name[:10]
+    return date < start[: len(date)]
+
+
+def _is_after(name: str, end: str) -> bool:
+    """
+    Whether a year directory, month directory or practice file lies entirely after
+    the end date, e.g. a practice scheduled in the future.
+    """
+    date = name[:10]
+    return date > end[: len(date)]
+
+
+@phase("directory walk")
+def _scan_practices(
+    practices_dir: str, start: Optional[str] = None, end: Optional[str] = None
+) -> Dict[str, Tuple[str, int, int]]:
+    """
+    Stat every practice file between the start and end dates, keyed by its path
+    relative to the practices directory. Year and month directories outside of these
+    dates are pruned without being listed.
+    """
+    practices = {}
+    for practice_path, dirs, files in os.walk(practices_dir):
+        if start is not None:
+            dirs[:] = [dir for dir in dirs if not _is_before(dir, start)]
+        if end is not None:
+            dirs[:] = [dir for dir in dirs if not _is_after(dir, end)]
+        for practice in files:
+            if not practice.endswith(".md"):
+                continue
+            if start is not None and _is_before(practice, start):
+                continue
+            if end is not None and _is_after(practice, end):
+                continue
+            path = os.path.join(practice_path, practice)
+            stat = os.stat(path)
+            practices[os.path.relpath(path, practices_dir)] = (
+                practice[:10],
+                stat.st_mtime_ns,
+                stat.st_size,
+            )
+    return practices
+
+
+def _connect_index_database(index_path: str) -> sqlite3.Connection:
+    connection = sqlite3.connect(index_path)
+    version = connection.execute("PRAGMA user_version").fetchone()[0]
+    if version != INDEX_VERSION:
+        # the index is only a cache, so an outdated one is simply rebuilt.
+        connection.execute("DROP TABLE IF EXISTS practices")
+        connection.execute("DROP TABLE IF EXISTS sets")
+        connection.execute("DROP TABLE IF EXISTS exercises")
+        connection.execute("DROP TABLE IF EXISTS trends")
+        connection.execute("DROP TABLE IF EXISTS rollups")
+        connection.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+    connection.execute(
+        "CREATE TABLE IF NOT EXISTS practices "
+        "(path TEXT PRIMARY KEY, date TEXT, mtime INTEGER, size INTEGER)"
+    )
+    connection.execute(
+        "CREATE TABLE IF NOT EXISTS sets "
+        "(path TEXT, date TEXT, plan TEXT, session TEXT, practice TEXT, "
+        "exercise TEXT, set_idx INTEGER, metric TEXT, value REAL, "
+        "measurement TEXT, completed INTEGER, skipped INTEGER)"
+    )
+    # a summary of every exercise of every practice, for `get_catalog` and
+    # `get_adherence`.
+    connection.execute(
+        "CREATE TABLE IF NOT EXISTS exercises "
+        "(path TEXT, date TEXT, plan TEXT, session TEXT, exercise TEXT, "
+        "sets INTEGER, set_lines INTEGER, completed INTEGER, skipped INTEGER, "
+        "metrics TEXT)"
+    )
+    # the sets of every metric of every exercise of every practice, aggregated for
+    # `get_rollups`.
+    connection.execute(
+        "CREATE TABLE IF NOT EXISTS rollups "
+        "(path TEXT, date TEXT, practice TEXT, exercise TEXT, metric TEXT, "
+        'max REAL, mean REAL, sum REAL, "count" INTEGER)'
+    )
+    # the `TrendState` of every exercise metric, per forgetting factor of `get_trends`.
+    connection.execute(
+        "CREATE TABLE IF NOT EXISTS trends "
+        "(exercise TEXT, metric TEXT, forgetting REAL, count INTEGER, weight REAL, "
+        "x REAL, y REAL, xx REAL, xy REAL, origin REAL, last_x REAL, "
+        "PRIMARY KEY (exercise, metric, forgetting))"
+    )
+    connection.execute("CREATE INDEX IF NOT EXISTS sets_path ON sets (path)")
+    connection.execute("CREATE INDEX IF NOT EXISTS exercises_path ON exercises (path)")
+    connection.execute("CREATE INDEX IF NOT EXISTS sets_date ON sets (date)")
+    connection.execute("CREATE INDEX IF NOT EXISTS sets_exercise ON sets (exercise)")
+    connection.execute("CREATE INDEX IF NOT EXISTS exercises_date ON exercises (date)")
+    connection.execute("CREATE INDEX IF NOT EXISTS rollups_path ON rollups (path)")
+    connection.execute(
+        "CREATE INDEX IF NOT EXISTS rollups_exercise ON rollups (exercise, date)"
+    )
+    return connection
+
+
+def _select_values(connection: sqlite3.Connection, values: List[str]) -> str:
+    """
+    Put values in a temporary table of the connection, returning a query that selects
+    them, e.g. for `IN (...)`. Unlike a parameter per value, this takes any number of
+    values, as SQLite before 3.32 only takes 999 parameters.
+    """
+    connection.execute(
+        "CREATE TEMP TABLE IF NOT EXISTS selected_values (value TEXT PRIMARY KEY)"
+    )
+    connection.execute("DELETE FROM selected_values")
+    connection.executemany(
+        "INSERT OR IGNORE INTO selected_values VALUES (?)",
+        [(value,) for value in values],
+    )
+    return "SELECT value FROM selected_values"
+
+
+def _get_session_bests(
+    connection: sqlite3.Connection, paths: Optional[List[str]] = None
+) -> pd.DataFrame:
+    """
+    Get the best set of every metric of every exercise of the practices, or of every
+    practice, with the columns "Exercise", "Metric", "Week" (weeks since the epoch)
+    and "Value".
+    """
+    path_filter = (
+        "" if paths is None else f" AND path IN ({_select_values(connection, paths)})"
+    )
+    bests = pd.read_sql_query(
+        "SELECT exercise, metric, date, MAX(value) FROM sets WHERE NOT skipped "
+        f"AND set_idx != ? AND metric != 'Completion' AND value IS NOT NULL"
+        f"{path_filter} GROUP BY path, exercise, metric",
+        connection,
+        params=(EXERCISE_ROW_SET,),
+    )
+    bests.columns = ["Exercise", "Metric", "Week", "Value"]
+    bests["Week"] = (
+        bests["Week"].to_numpy(dtype="datetime64[D]").astype(np.int64) / 7
+        if len(bests) > 0
+        else bests["Week"].astype(float)
+    )
+    return bests
+
+
+def _get_last_weeks(
+    connection: sqlite3.Connection, exercises: List[str]
+) -> pd.DataFrame:
+    """
+    Get the week of the latest session of every metric of the exercises with the
+    sets of `_get_session_bests`, with the columns "Exercise", "Metric" and "Week".
+    """
+    last_weeks = pd.read_sql_query(
+        "SELECT exercise, metric, MAX(date) FROM sets WHERE NOT skipped "
+        "AND set_idx != ? AND metric != 'Completion' AND value IS NOT NULL "
+        f"AND exercise IN ({_select_values(connection, exercises)}) "
+        "GROUP BY exercise, metric",
+        connection,
+        params=(EXERCISE_ROW_SET,),
+    )
+    last_weeks.columns = ["Exercise", "Metric", "Week"]
+    last_weeks["Week"] = (
+        last_weeks["Week"].to_numpy(dtype="datetime64[D]").astype(np.int64) / 7
+        if len(last_weeks) > 0
+        else last_weeks["Week"].astype(float)
+    )
+    return last_weeks
+
+
+def _update_trend_states(
+    connection: sqlite3.Connection,
+    forgetting: float,
+    removed_bests: pd.DataFrame,
+    added_bests: pd.DataFrame,
+):
+    """
+    Remove and add session bests to the trend states of a forgetting factor, in time
+    proportional to their number and to the number of exercise metrics, rather than
+    to the number of practices. Series that had sessions removed are also moved to
+    their latest remaining session, found through the sets index.
+    """
+    stored_states = pd.read_sql_query(
+        "SELECT exercise, metric, count, weight, x, y, xx, xy, origin, last_x "
+        "FROM trends WHERE forgetting = ?",
+        connection,
+        params=(forgetting,),
+    )
+    stored_keys = pd.MultiIndex.from_frame(stored_states[["exercise", "metric"]])
+    keys = stored_keys.append(
+        pd.MultiIndex.from_frame(
+            pd.concat([removed_bests, added_bests])[["Exercise", "Metric"]]
+        )
+    ).unique()
+    state = empty_trend_state(len(keys))
+    stored_idxs = keys.get_indexer(stored_keys)
+    for field in TrendState._fields:
+        getattr(state, field)[stored_idxs] = stored_states[field].to_numpy()
+
+    for bests, remove in [(removed_bests, True), (added_bests, False)]:
+        state = update_trend_state(
+            state,
+            keys.get_indexer(pd.MultiIndex.from_frame(bests[["Exercise", "Metric"]])),
+            bests["Week"].to_numpy(),
+            bests["Value"].to_numpy(),
+            forgetting=forgetting,
+            remove=remove,
+        )
+    if len(removed_bests) > 0:
+        # the latest session of a series may have been removed, so weigh its
+        # remaining sessions from their own latest one.
+        last_weeks = _get_last_weeks(
+            connection, removed_bests["Exercise"].unique().tolist()
+        )
+        last_x = state.last_x.copy()
+        last_idxs = keys.get_indexer(
+            pd.MultiIndex.from_frame(last_weeks[["Exercise", "Metric"]])
+        )
+        is_moved = last_idxs >= 0
+        last_x[last_idxs[is_moved]] = last_weeks["Week"].to_numpy()[is_moved]
+        state = move_trend_state(state, last_x, forgetting=forgetting)
+
+    connection.execute("DELETE FROM trends WHERE forgetting = ?", (forgetting,))
+    connection.executemany(
+        "INSERT INTO trends VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [
+            (exercise, metric, forgetting, *[field[idx].item() for field in state])
+            for idx, (exercise, metric) in enumerate(keys)
+            # series whose every session was removed.
+            if state.count[idx] > 0
+        ],
+    )
+
+
+def _update_index_database(
+    connection: sqlite3.Connection,
+    practices_dir: str,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+) -> Tuple[List[str], List[str]]:
+    """
+    Re-parse only the practices between the start and end dates that were added,
+    changed or deleted since the index was last updated, returning the paths of the
+    practices removed from and added to the index.
+    """
+    practices = _scan_practices(practices_dir, start=start, end=end)
+    indexed_practices = {
+        path: (date, mtime, size)
+        for path, date, mtime, size in connection.execute(
+            "SELECT path, date, mtime, size FROM practices "
+            "WHERE date >= ? AND date <= ?",
+            (start or "", end or "9999"),
+        )
+    }
+
+    stale_paths = [
+        path for path, stat in indexed_practices.items() if practices.get(path) != stat
+    ]
+    new_paths = [
+        path for path, stat in practices.items() if indexed_practices.get(path) != stat
+    ]
+    if len(stale_paths) == 0 and len(new_paths) == 0:
+        return stale_paths, new_paths
+    debug(f"re-indexing {len(new_paths)} practices, removing {len(stale_paths)}")
+
+    forgettings = [
+        forgetting
+        for (forgetting,) in connection.execute(
+            "SELECT DISTINCT forgetting FROM trends"
+        )
+    ]
+    with connection:
+        if len(forgettings) > 0:
+            removed_bests = _get_session_bests(connection, stale_paths)
+        connection.executemany(
+            "DELETE FROM sets WHERE path = ?", [(path,) for path in stale_paths]
+        )
+        connection.executemany(
+            "DELETE FROM practices WHERE path = ?", [(path,) for path in stale_paths]
+        )
+        connection.executemany(
+            "DELETE FROM exercises WHERE path = ?", [(path,) for path in stale_paths]
+        )
+        connection.executemany(
+            "DELETE FROM rollups WHERE path = ?", [(path,) for path in stale_paths]
+        )
+        for path in sorted(new_paths):
+            rows, set_lines, declared_metrics = _parse_practice_file(
+                os.path.join(practices_dir, path)
+            )
+            connection.executemany(
+                f"INSERT INTO sets VALUES (?{', ?' * len(INDEX_COLUMNS)})",
+                [(path, *row) for row in rows],
+            )
+            connection.executemany(
+                f"INSERT INTO exercises VALUES (?, ?{', ?' * 8})",
+                [
+                    (path, practices[path][0], *summary)
+                    for summary in _summarize_exercises(
+                        rows, set_lines, declared_metrics
+                    )
+                ],
+            )
+            connection.executemany(
+                "INSERT INTO rollups VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (path, practices[path][0], os.path.basename(path)[:-3], *rollup)
+                    for rollup in _roll_up_exercises(rows)
+                ],
+            )
+            connection.execute(
+                "INSERT INTO practices VALUES (?, ?, ?, ?)", (path, *practices[path])
+            )
+        if len(forgettings) > 0:
+            added_bests = _get_session_bests(connection, new_paths)
+            for forgetting in forgettings:
+                _update_trend_states(connection, forgetting, removed_bests, added_bests)
+
+    return stale_paths, new_paths
+
+
+@phase("dataframe build")
+def _load_index_database(
+    connection: sqlite3.Connection,
+    start: Optional[str] = None,
+    paths: Optional[List[str]] = None,
+) -> pd.DataFrame:
+    path_filter = (
+        "" if paths is None else f" AND path IN ({_select_values(connection, paths)})"
+    )
+    index = pd.read_sql_query(
+        "SELECT date, plan, session, practice, exercise, set_idx, metric, value, "
+        f"measurement, completed, skipped FROM sets WHERE date >= ?{path_filter} "
+        "ORDER BY date, practice, rowid",
+        connection,
+        params=(start or "",),
+    )
+    index.columns = INDEX_COLUMNS
+    return _set_index_dtypes(index)
+
+
+def _set_index_dtypes(index: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convert the columns of index rows as stored in the database to those of
+    `get_index`.
+    """
+    index["Date"] = pd.to_datetime(index["Date"], format="%Y-%m-%d")
+    index[LABEL_COLUMNS] = index[LABEL_COLUMNS].astype("category")
+    index["Set"] = index["Set"].astype(np.int16)
+    index["Value"] = index["Value"].astype(float)
+    index["Completed"] = index["Completed"].astype(float).astype("boolean")
+    index["Skipped"] = index["Skipped"].astype(bool)
+    return index
+
+
+def build_index(
+    practices_dir: str, index_path: str, start: Optional[str] = None
+) -> pd.DataFrame:
+    """
+    Bring the on-disk index of a practices directory up to date and load it.
+
+    Args:
+        practices_dir (str): The `Practice` directory of an activity.
+        index_path (str): The path of the index database for this directory.
+        start (Optional[str], optional): Only update and load practices on or after
+            this date, as YYYY-MM-DD. Defaults to None.
+
+    Returns:
+        pd.DataFrame: A long-format dataframe with the columns in `INDEX_COLUMNS`,
+            sorted by date and practice, with rows of a practice in file order. The
+            columns in `LABEL_COLUMNS` are categoricals.
+    """
+    connection = _connect_index_database(index_path)
+    try:
+        _update_index_database(connection, practices_dir, start=start)
+        index = _load_index_database(connection, start=start)
+    finally:
+        connection.close()
+    return index
+
+
+def get_index(activity: str, start: Optional[str] = None) -> pd.DataFrame:
+    """
+    Get the index of an activity, updating it from its practices on first use.
+
+    Only practices on or after the start date are looked at, so the cost of a query
+    is proportional to the selected window rather than the whole history.
+
+    Args:
+        activity (str): The activity to get the index for.
+        start (Optional[str], optional): Only keep practices on or after this date,
+            as YYYY-MM-DD. Defaults to None.
+
+    Returns:
+        pd.DataFrame: The index of the activity, as described in `build_index`.
+    """
+    practices_dir = get_practices_dir(activity=activity)
+    if not os.path.isdir(practices_dir):
+        raise FileNotFoundError(practices_dir)
+
+    # reuse the loaded index if it covers the requested window.
+    loaded_start, index = _INDEX_CACHE.get(practices_dir, ("", None))
+    if index is None or (
+        loaded_start is not None and (start is None or start < loaded_start)
+    ):
+        index = build_index(practices_dir, get_index_path(activity=activity), start)
+        _INDEX_CACHE[practices_dir] = (start, index)
+
+    if start is not None:
+        index = index[index["Date"] >= pd.Timestamp(start)]
+    return index
+
+
+def iter_index_rows(
+    activity: str,
+    exercise: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    plan: Optional[str] = None,
+) -> Iterator[tuple]:
+    """
+    Stream the rows of the index of an activity straight from its database, updating
+    it from its practices first, without loading the whole index into memory.
+
+    Args:
+        activity (str): The activity to stream the index of.
+        exercise (Optional[str], optional): Only stream the rows of this exercise.
+            Defaults to None.
+        start (Optional[str], optional): Only stream practices on or after this date,
+            as YYYY-MM-DD. Defaults to None.
+        end (Optional[str], optional): Only stream practices on or before this date,
+            as YYYY-MM-DD. Later practices aren't even parsed. Defaults to None.
+        plan (Optional[str], optional): Only stream the rows of practices of this
+            plan. Defaults to None.
+
+    Yields:
+        tuple: A row with the columns in `INDEX_COLUMNS`, in the order of `get_index`.
+            Dates are YYYY-MM-DD strings, missing values are None, and flags are 0 or
+            1.
+    """
+    practices_dir = get_practices_dir(activity=activity)
+    if not os.path.isdir(practices_dir):
+        raise FileNotFoundError(practices_dir)
+
+    connection = _connect_index_database(get_index_path(activity=activity))
+    try:
+        _update_index_database(connection, practices_dir, start=start, end=end)
+        filters = {"exercise": exercise, "plan": plan}
+        filters = {
+            column: value for column, value in filters.items() if value is not None
+        }
+        yield from connection.execute(
+            "SELECT date, plan, session, practice, exercise, set_idx, metric, value, "
+            "measurement, completed, skipped FROM sets WHERE date >= ? AND date <= ?"
+            + "".join(f" AND {column} = ?" for column in filters)
+            + " ORDER BY date, practice, rowid",
+            (start or "", end or "9999", *filters.values()),
+        )
+    finally:
+        connection.close()
+
+
+def index_from_rows(rows: List[tuple]) -> pd.DataFrame:
+    """
+    Build an index from rows streamed by `iter_index_rows`, e.g. a batch of them.
+
+    Args:
+        rows (List[tuple]): The rows, with the columns in `INDEX_COLUMNS`.
+
+    Returns:
+        pd.DataFrame: The rows as an index, as described in `build_index`. The
+            categories of the columns in `LABEL_COLUMNS` are only those of the rows.
+    """
+    return _set_index_dtypes(pd.DataFrame.from_records(rows, columns=INDEX_COLUMNS))
+
+
+def refresh_index(activity: str) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Update the loaded index of an activity with the practices added, changed or
+    deleted on disk since it was loaded, re-parsing only those.
+
+    Args:
+        activity (str): The activity to refresh the index of.
+
+    Returns:
+        Tuple[pd.DataFrame, pd.DataFrame]: The rows removed from and added to the
+            index, e.g. to find what changed. Every row is added if the index wasn't
+            loaded yet.
+    """
+    practices_dir = get_practices_dir(activity=activity)
+    if practices_dir not in _INDEX_CACHE:
+        index = get_index(activity=activity)
+        return index.iloc[:0], index
+    loaded_start, index = _INDEX_CACHE[practices_dir]
+
+    connection = _connect_index_database(get_index_path(activity=activity))
+    try:
+        stale_paths, new_paths = _update_index_database(
+            connection, practices_dir, start=loaded_start
+        )
+        new_rows = _load_index_database(connection, start=loaded_start, paths=new_paths)
+    finally:
+        connection.close()
+
+    changed_practices = {
+        os.path.basename(path)[:-3] for path in [*stale_paths, *new_paths]
+    }
+    is_changed = index["Practice"].isin(changed_practices).to_numpy()
+    removed_rows = index[is_changed]
+    if len(removed_rows) == 0 and len(new_rows) == 0:
+        return removed_rows, new_rows
+
+    index = _splice_practices(index[~is_changed], new_rows)
+    _INDEX_CACHE[practices_dir] = (loaded_start, index)
+    return removed_rows, new_rows
+
+
+def _splice_practices(rows: pd.DataFrame, new_rows: pd.DataFrame) -> pd.DataFrame:
+    """
+    Add the rows of new practices to those of others, keeping them sorted by date and
+    practice.
+    """
+    return _sort_practices(pd.concat([rows, new_rows], ignore_index=True))
+
+
+def _sort_practices(rows: pd.DataFrame) -> pd.DataFrame:
+    label_columns = [column for column in LABEL_COLUMNS if column in rows.columns]
+    rows[label_columns] = rows[label_columns].astype(str).astype("category")
+    # a stable sort keeps the rows of each practice in file order.
+    return rows.sort_values(["Date", "Practice"], kind="stable", ignore_index=True)
+
+
+def get_rollups(
+    activity: str, start: Optional[str] = None, exercise: Optional[str] = None
+) -> pd.DataFrame:
+    """
+    Get the rollups of every session of an activity from its index database, where
+    they are kept up to date along with the sets of each practice.
+
+    Args:
+        activity (str): The activity to get the rollups for.
+        start (Optional[str], optional): Only keep practices on or after this date,
+            as YYYY-MM-DD. Defaults to None.
+        exercise (Optional[str], optional): Only get the rollups of this exercise.
+            Defaults to None.
+
+    Returns:
+        pd.DataFrame: A dataframe with one row per metric of every exercise of every
+            practice, sorted by date and practice, with the columns "Date",
+            "Practice", "Exercise", "Metric" and those in `ROLLUP_AGGREGATIONS`. The
+            metrics in `VOLUME_METRICS` are rolled up from the products of the sets.
+    """
+    # brings the database up to date once per loaded index.
+    get_index(activity=activity, start=start)
+
+    connection = _connect_index_database(get_index_path(activity=activity))
+    try:
+        with phase("dataframe build"):
+            rollups = pd.read_sql_query(
+                'SELECT date, practice, exercise, metric, max, mean, sum, "count" '
+                "FROM rollups WHERE date >= ?"
+                + ("" if exercise is None else " AND exercise = ?")
+                + " ORDER BY date, practice, rowid",
+                connection,
+                params=(start or "", *([] if exercise is None else [exercise])),
+            )
+    finally:
+        connection.close()
+
+    rollups.columns = ["Date", "Practice", "Exercise", "Metric", *ROLLUP_AGGREGATIONS]
+    rollups["Date"] = pd.to_datetime(rollups["Date"], format="%Y-%m-%d")
+    rollups[["Practice", "Exercise", "Metric"]] = rollups[
+        ["Practice", "Exercise", "Metric"]
+    ].astype("category")
+    rollups[ROLLUP_AGGREGATIONS[:-1]] = rollups[ROLLUP_AGGREGATIONS[:-1]].astype(float)
+    return rollups
+
+
+def get_catalog(activity: str) -> pd.DataFrame:
+    """
+    Summarize every exercise of an activity from its index database, updating it
+    from its practices first, without loading the index.
+
+    Args:
+        activity (str): The activity to summarize the exercises of.
+
+    Returns:
+        pd.DataFrame: A dataframe with one row per exercise that wasn't always
+            skipped, with the columns "Exercise", "First" and "Last" (the dates of
+            its first and last practices), "Sessions" (its number of practices),
+            "Sets" (its number of logged sets, numeric or not) and
+            "Metrics" (the list of metrics it declares, in the declared order of
+            its latest practice, followed by those only older practices declare).
+    """
+    practices_dir = get_practices_dir(activity=activity)
+    if not os.path.isdir(practices_dir):
+        raise FileNotFoundError(practices_dir)
+
+    connection = _connect_index_database(get_index_path(activity=activity))
+    try:
+        _update_index_database(connection, practices_dir)
+        catalog = pd.read_sql_query(
+            "SELECT exercise, MIN(date), MAX(date), COUNT(*), SUM(sets), "
+            "GROUP_CONCAT(DISTINCT metrics) FROM (SELECT * FROM exercises "
+            "WHERE NOT skipped ORDER BY date DESC) GROUP BY exercise ORDER BY exercise",
+            connection,
+        )
+    finally:
+        connection.close()
+
+    catalog.columns = ["Exercise", "First", "Last", "Sessions", "Sets", "Metrics"]
+    catalog["First"] = pd.to_datetime(catalog["First"], format="%Y-%m-%d")
+    catalog["Last"] = pd.to_datetime(catalog["Last"], format="%Y-%m-%d")
+    # the distinct JSON lists of metrics of each exercise, latest first, joined by
+    # commas.
+    catalog["Metrics"] = [
+        list(dict.fromkeys(chain.from_iterable(json.loads(f"[{metric_lists}]"))))
+        for metric_lists in catalog["Metrics"]
+    ]
+    return catalog
+
+
+def get_trends(activity: str, forgetting: float = 1.0) -> pd.DataFrame:
+    """
+    Get the weekly trend of the best set of each session of every exercise metric of
+    an activity, from its index database, updating it from its practices first.
+
+    The trends are kept in the database, and updated with only the sessions of the
+    practices that changed, so that this doesn't refit the whole history. The trends
+    of a forgetting factor are kept from its first use on.
+
+    Args:
+        activity (str): The activity to get the trends of.
+        forgetting (float, optional): The factor the weight of a session is
+            multiplied by per week since the last session, between 0 and 1, so that
+            recent sessions weigh more. Defaults to 1.0, weighing every session the
+            same.
+
+    Returns:
+        pd.DataFrame: A dataframe with one row per exercise metric, sorted by both,
+            with the columns "Exercise", "Metric", "Sessions" (its number of
+            sessions), "Last" (the date of its last session), "Value" (its trend at
+            that date) and "Slope" (its increase per week).
+    """
+    if not 0 < forgetting <= 1:
+        raise ValueError(forgetting)
+    practices_dir = get_practices_dir(activity=activity)
+    if not os.path.isdir(practices_dir):
+        raise FileNotFoundError(practices_dir)
+
+    connection = _connect_index_database(get_index_path(activity=activity))
+    try:
+        _update_index_database(connection, practices_dir)
+        stored_states = pd.read_sql_query(
+            "SELECT exercise, metric, count, weight, x, y, xx, xy, origin, last_x "
+            "FROM trends WHERE forgetting = ? ORDER BY exercise, metric",
+            connection,
+            params=(forgetting,),
+        )
+        if len(stored_states) == 0:
+            with phase("model fit"), connection:
+                no_bests = _get_session_bests(connection, [])
+                _update_trend_states(
+                    connection, forgetting, no_bests, _get_session_bests(connection)
+                )
+            stored_states = pd.read_sql_query(
+                "SELECT exercise, metric, count, weight, x, y, xx, xy, origin, "
+                "last_x FROM trends WHERE forgetting = ? ORDER BY exercise, metric",
+                connection,
+                params=(forgetting,),
+            )
+    finally:
+        connection.close()
+
+    # an activity without any sessions has no states, read as objects.
+    state = TrendState(
+        *[stored_states[field].to_numpy(dtype=float) for field in TrendState._fields]
+    )
+    trends = get_state_trends(state)
+    return pd.DataFrame(
+        {
+            "Exercise": stored_states["exercise"],
+            "Metric": stored_states["metric"],
+            "Sessions": state.count.astype(np.int64),
+            "Last": pd.to_datetime(np.round(state.last_x * 7).astype("datetime64[D]")),
+            "Value": trends.intercept + trends.slope * state.last_x,
+            "Slope": trends.slope,
+        }
+    )
+
+
+# Columns `get_adherence` can group by, as SQL expressions over the exercises table.
+ADHERENCE_GROUPS = {
+    "plan": "plan",
+    "session": "session",
+    # 0 is Sunday.
+    "weekday": "CAST(strftime('%w', date) AS INTEGER)",
+    "exercise": "exercise",
+}
+
+
+def get_adherence(
+    activity: str,
+    by: str,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    plan: Optional[str] = None,
+) -> pd.DataFrame:
+    """
+    Count how many of the planned exercises of an activity were done, skipped or
+    missed each day, from its index database, updating it from its practices first,
+    without loading the index.
+
+    An exercise was done if it was checked off, or if it has no checkbox and any of
+    its sets were logged. It was missed if it was neither done nor skipped, e.g. a
+    scheduled practice that was never filled in.
+
+    Args:
+        activity (str): The activity to count the exercises of.
+        by (str): What to group the exercises by, one of `ADHERENCE_GROUPS`.
+        start (Optional[str], optional): Only count practices on or after this date,
+            as YYYY-MM-DD. Defaults to None.
+        end (Optional[str], optional): Only count practices on or before this date,
+            as YYYY-MM-DD. Later practices aren't even parsed. Defaults to None.
+        plan (Optional[str], optional): Only count the practices of this plan.
+            Defaults to None.
+
+    Returns:
+        pd.DataFrame: A dataframe with one row per group and date with any
+            practices, sorted by both, with the columns "Group", "Date", "Planned",
+            "Done", "Skipped" and "Missed" (numbers of exercises), and "Sets" and
+            "Set Lines" (the numbers of logged sets and of set lines of these
+            exercises).
+    """
+    if by not in ADHERENCE_GROUPS:
+        raise ValueError(by)
+    practices_dir = get_practices_dir(activity=activity)
+    if not os.path.isdir(practices_dir):
+        raise FileNotFoundError(practices_dir)
+
+    done = "NOT skipped AND (completed OR (completed IS NULL AND sets > 0))"
+    connection = _connect_index_database(get_index_path(activity=activity))
+    try:
+        _update_index_database(connection, practices_dir, start=start, end=end)
+        adherence = pd.read_sql_query(
+            f"SELECT {ADHERENCE_GROUPS[by]} AS grp, date, COUNT(*), SUM({done}), "
+            "SUM(skipped), SUM(sets), SUM(set_lines) FROM exercises "
+            "WHERE date >= ? AND date <= ?"
+            + ("" if plan is None else " AND plan = ?")
+            + " GROUP BY grp, date ORDER BY grp, date",
+            connection,
+            params=(start or "", end or "9999", *([] if plan is None else [plan])),
+        )
+    finally:
+        connection.close()
+
+    adherence.columns = [
+        "Group",
+        "Date",
+        "Planned",
+        "Done",
+        "Skipped",
+        "Sets",
+        "Set Lines",
+    ]
+    adherence["Date"] = pd.to_datetime(adherence["Date"], format="%Y-%m-%d")
+    adherence.insert(
+        5, "Missed", adherence["Planned"] - adherence["Done"] - adherence["Skipped"]
+    )
+    return adherence
+
+
+def get_loaded_indexes() -> Dict[str, Tuple[Optional[str], pd.DataFrame]]:
+    """
+    Get every index loaded in this process, e.g. to share them with other processes.
+    """
+    return dict(_INDEX_CACHE)
+
+
+def set_loaded_indexes(loaded_indexes: Dict[str, Tuple[Optional[str], pd.DataFrame]]):
+    """
+    Use indexes loaded by another process, as returned by `get_loaded_indexes`.
+    """
+    _INDEX_CACHE.update(loaded_indexes)
+
+
+def clear_loaded_indexes():
+    """
+    Forget every index loaded in this process, so the next query reloads from disk.
+    """
+    _INDEX_CACHE.clear()
@@ -4,22 +4,38 @@ Main entrypoint for progress app.
 
 import argparse
 import logging
+from contextlib import nullcontext
 
 from commands.cli_commands import (
     handle_activity_cli_command,
     handle_config_cli_command,
     handle_exercise_cli_command,
+    handle_export_cli_command,
     handle_plan_cli_command,
     handle_practice_cli_command,
     handle_report_cli_command,
+    handle_serve_cli_command,
     handle_session_cli_command,
+    handle_watch_cli_command,
 )
+from profiling import profile
+from vault import Vault
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument(
         "-v", "--verbose", help="increase output verbosity", action="store_true"
     )
+    parser.add_argument(
+        "--profile",
+        help="print the time spent in each phase of the command",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--profile-output",
+        help="also write a JSON trace of the phases (if ending in .json), "
+        "or else cProfile stats, to this path",
+    )
 
     # high level commands
     subparsers = parser.add_subparsers(title="commands", dest="command", required=True)
@@ -30,6 +46,15 @@ if __name__ == "__main__":
     parser_session = subparsers.add_parser("session", help="manage sessions")
     parser_practice = subparsers.add_parser("practice", help="manage practices")
     parser_exercise = subparsers.add_parser("exercise", help="manage exercises")
+    parser_watch = subparsers.add_parser(
+        "watch", help="regenerate reports whenever their inputs change"
+    )
+    parser_export = subparsers.add_parser(
+        "export", help="export every set of an activity as columnar files"
+    )
+    parser_serve = subparsers.add_parser(
+        "serve", help="answer queries about exercises over local HTTP"
+    )
 
     """
     Config
@@ -37,6 +62,14 @@ if __name__ == "__main__":
     parser_config.add_argument(
         "--directory", required=True, help="the directory of the activities vault"
     )
+    parser_config.add_argument(
+        "--bodyweight-activity",
+        help="the activity that bodyweight is logged in (default: Fitness)",
+    )
+    parser_config.add_argument(
+        "--bodyweight-exercise",
+        help="the exercise that bodyweight is logged as (default: Weight)",
+    )
 
     """
     Activity
@@ -94,6 +127,12 @@ if __name__ == "__main__":
     parser_report_generate.add_argument(
         "--activity", required=True, help="the activity to generate reports for"
     )
+    parser_report_generate.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="the number of reports to generate in parallel",
+    )
 
     """
     Plan
@@ -112,6 +151,9 @@ if __name__ == "__main__":
     parser_plan_visualize = subparsers_plan.add_parser(
         "visualize", help="visualize practices according to the plan"
     )
+    parser_plan_adherence = subparsers_plan.add_parser(
+        "adherence", help="rate how closely practices followed their plans"
+    )
 
     # plan create
     parser_plan_create.add_argument(
@@ -143,6 +185,11 @@ if __name__ == "__main__":
         required=True,
         help="the final date this plan should be scheduled for",
     )
+    parser_plan_schedule.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="only list the practices that would be created",
+    )
 
     # plan visualize
     parser_plan_visualize.add_argument(
@@ -151,6 +198,29 @@ if __name__ == "__main__":
     parser_plan_visualize.add_argument(
         "--activity", required=True, help="the activity this plan is associated with"
     )
+    parser_plan_visualize.add_argument(
+        "--until",
+        help="the final date to visualize practices of, as YYYY-MM-DD "
+        "(default: today)",
+    )
+
+    # plan adherence
+    parser_plan_adherence.add_argument(
+        "--activity", required=True, help="the activity to rate the practices of"
+    )
+    parser_plan_adherence.add_argument(
+        "--plan", help="only rate the practices of this plan (default: all plans)"
+    )
+    parser_plan_adherence.add_argument(
+        "--by",
+        choices=["plan", "session", "weekday", "exercise"],
+        default="plan",
+        help="what to rate separately",
+    )
+    parser_plan_adherence.add_argument(
+        "--until",
+        help="the final date of every window, as YYYY-MM-DD (default: today)",
+    )
 
     """
     Session
@@ -241,12 +311,23 @@ if __name__ == "__main__":
     parser_exercise_compare = subparsers_exercise.add_parser(
         "compare", help="compare the results of two different exercises"
     )
+    parser_exercise_trend = subparsers_exercise.add_parser(
+        "trend", help="get the weekly trends of the best sets of exercises"
+    )
 
     # exercise ls
     parser_exercise_ls.add_argument(
         "--activity",
-        required=True,
-        help="the activity the desired exercises are associated with",
+        required=False,
+        help="the activity the desired exercises are associated with, "
+        "by default every activity",
+    )
+    parser_exercise_ls.add_argument(
+        "--sort",
+        choices=["name", "recent", "frequent"],
+        default="name",
+        help="list exercises by name, most recently done first, "
+        "or most often done first",
     )
 
     # exercise info
@@ -283,6 +364,67 @@ if __name__ == "__main__":
         "--start", required=False, help="the starting date to analyze, as YYYY-MM-DD"
     )
 
+    # exercise trend
+    parser_exercise_trend.add_argument(
+        "--activity",
+        required=True,
+        help="the activity the desired exercises are associated with",
+    )
+    parser_exercise_trend.add_argument(
+        "--name",
+        action="append",
+        help="the name of an exercise to get the trend of, by default every exercise",
+    )
+    parser_exercise_trend.add_argument(
+        "--forgetting",
+        type=float,
+        default=1.0,
+        help="the factor sessions are weighted by per week since the last session, "
+        "e.g. 0.98 to weigh recent sessions more (default: 1, no forgetting)",
+    )
+
+    """
+    Watch
+    """
+    parser_watch.add_argument("--activity", required=True, help="the activity to watch")
+    parser_watch.add_argument(
+        "--interval",
+        type=float,
+        default=1.0,
+        help="the seconds between checks for changes, when polling",
+    )
+
+    """
+    Export
+    """
+    parser_export.add_argument(
+        "--activity", required=True, help="the activity to export"
+    )
+    parser_export.add_argument(
+        "--format",
+        choices=["arrow", "parquet", "csv"],
+        default="arrow",
+        help="the format to export to (arrow and parquet need pyarrow)",
+    )
+    parser_export.add_argument(
+        "--output",
+        help="the directory to export to, by default the Export directory of the "
+        "activity",
+    )
+
+    """
+    Serve
+    """
+    parser_serve.add_argument(
+        "--host", default="127.0.0.1", help="the host to listen on"
+    )
+    parser_serve.add_argument(
+        "--port", type=int, default=8765, help="the port to listen on"
+    )
+    parser_serve.add_argument(
+        "--socket", help="listen on this Unix socket instead of a host and port"
+    )
+
     args = parser.parse_args()
 
     level = logging.DEBUG if args.verbose else logging.INFO
@@ -296,6 +438,16 @@ if __name__ == "__main__":
         "session": handle_session_cli_command,
         "practice": handle_practice_cli_command,
         "exercise": handle_exercise_cli_command,
+        "watch": handle_watch_cli_command,
+        "export": handle_export_cli_command,
+        "serve": handle_serve_cli_command,
     }
 
-    simple_args_commands[args.command](args)
+    profiling = args.profile or args.profile_output is not None
+    with profile(args.profile_output) if profiling else nullcontext():
+        if args.command == "config":
+            # there is no vault to work in until it is configured.
+            simple_args_commands[args.command](args)
+        else:
+            with Vault.from_config():
+                simple_args_commands[args.command](args)
@@ -1,48 +1,72 @@
 # from https://www.brianmac.co.uk/maxload.htm#:~:text=The%20Epley%20(1985)%20equation%20is,of%20repetitions%20%C3%97%20Weight)%20%2B%20Weight
 # NOTE: Baechle and Epley are the same........
+#
+# All calculations are elementwise, so weights, repetitions and bodyweights may be
+# given as floats, numpy arrays or pandas series.
 
-from typing import Literal
+from typing import Callable, Dict, Literal, Sequence, Union, get_args
+
+import numpy as np
+import pandas as pd
 
 ORM_TYPE = Literal["Brzycki", "Epley", "Landers"]
+ORM_TYPES: Sequence[ORM_TYPE] = get_args(ORM_TYPE)
+
+Values = Union[float, np.ndarray, pd.Series]
 
 
-def _calculate_brzycki_orm(total_weight: float, repetitions: int) -> float:
+def _calculate_brzycki_orm(total_weight: Values, repetitions: Values) -> Values:
     return total_weight / (1.0278 - (0.0278 * repetitions))
 
 
-def _calculate_epley_orm(total_weight: float, repetitions: int) -> float:
+def _calculate_epley_orm(total_weight: Values, repetitions: Values) -> Values:
     return total_weight * (1 + (0.033 * repetitions))
 
 
-def _calculate_landers_orm(total_weight: float, repetitions: int) -> float:
+def _calculate_landers_orm(total_weight: Values, repetitions: Values) -> Values:
     return (100 * total_weight) / (101.3 - (2.67123 * repetitions))
 
 
+_ORM_CALCULATIONS: Dict[str, Callable[[Values, Values], Values]] = {
+    "Brzycki": _calculate_brzycki_orm,
+    "Epley": _calculate_epley_orm,
+    "Landers": _calculate_landers_orm,
+}
+
+
 def calculate_orm(
-    added_weight: float,
-    repetitions: int,
-    bodyweight: float = 0.0,
+    added_weight: Values,
+    repetitions: Values,
+    bodyweight: Values = 0.0,
     method: ORM_TYPE = "Epley",
-) -> float:
-    if method == "Brzycki":
-        return (
-            _calculate_brzycki_orm(
-                total_weight=bodyweight + added_weight, repetitions=repetitions
-            )
-            - bodyweight
-        )
-    elif method == "Epley":
-        return (
-            _calculate_epley_orm(
-                total_weight=bodyweight + added_weight, repetitions=repetitions
-            )
-            - bodyweight
-        )
-    elif method == "Landers":
-        return (
-            _calculate_landers_orm(
-                total_weight=bodyweight + added_weight, repetitions=repetitions
-            )
-            - bodyweight
+) -> Values:
+    if method not in _ORM_CALCULATIONS:
+        raise ValueError(method)
+    total_weight = bodyweight + added_weight
+    return (
+        _ORM_CALCULATIONS[method](total_weight=total_weight, repetitions=repetitions)
+        - bodyweight
+    )
+
+
+def calculate_orms(
+    added_weight: Values,
+    repetitions: Values,
+    bodyweight: Values = 0.0,
+    methods: Sequence[ORM_TYPE] = ORM_TYPES,
+) -> Dict[ORM_TYPE, Values]:
+    """
+    Calculate the one-rep max with several methods at once, sharing the total
+    weight between them.
+    """
+    for method in methods:
+        if method not in _ORM_CALCULATIONS:
+            raise ValueError(method)
+    total_weight = bodyweight + added_weight
+    return {
+        method: _ORM_CALCULATIONS[method](
+            total_weight=total_weight, repetitions=repetitions
         )
-    raise ValueError(method)
+        - bodyweight
+        for method in methods
+    }
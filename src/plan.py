@@ -1,24 +1,14 @@
 import datetime
 import os
-from typing import List
-
-import matplotlib.pyplot as plt
-import numpy as np
+from glob import glob
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 
 from dir_utils import get_activity_dir, get_plan_dir, get_practices_dir
-from practice import create_practice
-from units import (
-    HOURS_UNITS,
-    LEFT_UNITS,
-    MINUTES_UNITS,
-    PERCENTAGE_UNITS,
-    POUNDS_UNITS,
-    RIGHT_UNITS,
-    SECONDS_UNITS,
-    combine_units,
-)
-
-plt.style.use("seaborn-v0_8")
+from practice import read_session, write_practice
+from profiling import phase
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 DOW_TO_INT = {
     "Monday": 0,
@@ -30,6 +20,23 @@ DOW_TO_INT = {
     "Sunday": 6,
 }
 
+# Metrics plotted as their mean per practice by `visualize_plan`.
+PLAN_METRICS = ["Reps", "Weight"]
+
+# Panels of a plan visualization per saved page and per row of a page, and the width
+# and height of each panel in inches.
+PLAN_PANELS_PER_PAGE = 24
+PLAN_PANEL_COLUMNS = 4
+PLAN_PANEL_SIZE = (5, 3)
+
+# Trailing windows rated by `get_plan_adherence`, in weeks up to its last date.
+ADHERENCE_WINDOWS = {
+    "4 Weeks": 4,
+    "13 Weeks": 13,
+    "52 Weeks": 52,
+    "All Time": None,
+}
+
 
 def create_plan(plan: str, activity: str):
     # add on date to activity name:
@@ -69,18 +76,11 @@ def create_plan(plan: str, activity: str):
         file.write("\t- (HH:MM - HH:MM)\n")
 
 
-def schedule(until: str, plan: str, activity: str):
-    until_date = datetime.datetime.strptime(until, "%Y-%m-%d")
-    date = datetime.datetime.now()
-
-    plan_dir = get_plan_dir(plan=plan, activity=activity)
-    if not os.path.isdir(plan_dir):
-        raise FileNotFoundError(plan)
-    schedule_name = "Schedule.md"
-    schedule_path = os.path.join(plan_dir, schedule_name)
-    if not os.path.isfile(schedule_path):
-        raise FileNotFoundError(schedule_path)
-
+@phase("file parse")
+def _read_schedule(schedule_path: str) -> List[List[Dict[str, str]]]:
+    """
+    Read the sessions of every day of the week, from Monday to Sunday.
+    """
     with open(schedule_path, "r") as file:
         lines = file.readlines()
 
@@ -108,53 +108,120 @@ def schedule(until: str, plan: str, activity: str):
     if len(current_dow_sessions) > 0:
         dow_sessions[dow_index] = current_dow_sessions
 
+    return dow_sessions
+
+
+def _get_session_names(
+    date_str: str, plan: str, sessions: List[Dict[str, str]]
+) -> List[str]:
+    """
+    Name the practices of the sessions of a single day.
+    """
+    session_names = [
+        " ".join([date_str, plan, "-", session["Session Type"]]) for session in sessions
+    ]
+
+    # if need to enumerate, do so
+    if list(set(session_names)) != session_names:
+        # for each session that has multiple, append a number
+        session_counts = {}
+        for session_name in session_names:
+            if session_name in session_counts:
+                session_counts[session_name] += 1
+            else:
+                session_counts[session_name] = 1
+
+        sessions_seen = {session_name: 0 for session_name in session_names}
+        for session_idx, session_name in enumerate(session_names):
+            if session_counts[session_name] > 1:
+                sessions_seen[session_name] += 1
+                session_names[
+                    session_idx
+                ] = f"{session_name} {sessions_seen[session_name]}"
+
+    return session_names
+
+
+def schedule(until: str, plan: str, activity: str, dry_run: bool = False) -> List[str]:
+    """
+    Create a practice for every session of the plan's schedule, from today until the
+    given date, skipping practices that already exist.
+
+    The schedule and every session are read once, and every month directory is
+    listed once, however long the schedule is.
+
+    Args:
+        until (str): The date to schedule until, exclusive, as YYYY-MM-DD.
+        plan (str): The plan to schedule.
+        activity (str): The activity of the plan.
+        dry_run (bool, optional): Only find the practices that would be created,
+            without creating them. Defaults to False.
+
+    Returns:
+        List[str]: The paths of the practices created, or that would be created.
+    """
+    until_date = datetime.datetime.strptime(until, "%Y-%m-%d")
+    date = datetime.datetime.now()
+
+    plan_dir = get_plan_dir(plan=plan, activity=activity)
+    if not os.path.isdir(plan_dir):
+        raise FileNotFoundError(plan)
+    schedule_name = "Schedule.md"
+    schedule_path = os.path.join(plan_dir, schedule_name)
+    if not os.path.isfile(schedule_path):
+        raise FileNotFoundError(schedule_path)
+
+    dow_sessions = _read_schedule(schedule_path)
+
+    # plan out every practice before touching the practices directory.
+    practices = []
     while until_date > date:
         date_str = date.strftime("%Y-%m-%d")
-        dow_index = date.weekday()
-
-        # create practices for all sessions on this DoW
-        # if multiple of same name, enumerate with numbers
-
-        sessions = dow_sessions[dow_index]
-
-        # before creating any, plan out their names.
-        session_names = [
-            " ".join([date_str, plan, "-", session["Session Type"]])
-            for session in sessions
-        ]
-
-        # if need to enumerate, do so
-        if list(set(session_names)) != session_names:
-            # for each session that has multiple, append a number
-            session_counts = {}
-            for session_name in session_names:
-                if session_name in session_counts:
-                    session_counts[session_name] += 1
-                else:
-                    session_counts[session_name] = 1
-
-            sessions_seen = {session_name: 0 for session_name in session_names}
-            for session_idx, session_name in enumerate(session_names):
-                if session_counts[session_name] > 1:
-                    sessions_seen[session_name] += 1
-                    session_names[
-                        session_idx
-                    ] = f"{session_name} {sessions_seen[session_name]}"
-
-        # create the practices from the sessions
+        sessions = dow_sessions[date.weekday()]
+        session_names = _get_session_names(date_str, plan, sessions)
         for session, session_name in zip(sessions, session_names):
-            print(session, session_name)
-            create_practice(
-                session_type=session["Session Type"],
-                plan=plan,
-                activity=activity,
-                date=date_str,
-                practice_name=session_name,
-                error_if_exists=False,
-            )
-
+            practices.append((date_str, session["Session Type"], session_name))
         date = date + datetime.timedelta(days=1)
 
+    session_exercises = {}
+    for session_type in sorted({session_type for _, session_type, _ in practices}):
+        session_path = os.path.join(plan_dir, session_type + ".md")
+        if not os.path.isfile(session_path):
+            raise FileNotFoundError(session_path)
+        session_exercises[session_type] = read_session(session_path)
+
+    # list each month directory once to find the practices that already exist.
+    practices_dir = get_practices_dir(activity=activity)
+    month_dirs = {}
+    existing_practices = set()
+    with phase("directory walk"):
+        for date_str, _, _ in practices:
+            month = date_str[:7]
+            if month in month_dirs:
+                continue
+            month_dirs[month] = os.path.join(practices_dir, month[:4], month)
+            if os.path.isdir(month_dirs[month]):
+                existing_practices.update(os.listdir(month_dirs[month]))
+
+    missing_practices = [
+        (date_str, session_type, session_name)
+        for date_str, session_type, session_name in practices
+        if session_name + ".md" not in existing_practices
+    ]
+    practice_paths = [
+        os.path.join(month_dirs[date_str[:7]], session_name + ".md")
+        for date_str, _, session_name in missing_practices
+    ]
+    if dry_run:
+        return practice_paths
+
+    for month_dir in {os.path.dirname(path) for path in practice_paths}:
+        os.makedirs(month_dir, exist_ok=True)
+    for (_, session_type, _), practice_path in zip(missing_practices, practice_paths):
+        write_practice(practice_path, session_type, session_exercises[session_type])
+
+    return practice_paths
+
 
 def get_plans(activity: str) -> List[str]:
     activity_plan_dir = os.path.join(get_activity_dir(activity), "Plan")
@@ -168,65 +235,70 @@ def get_plans(activity: str) -> List[str]:
     return plans
 
 
-def _measurement_to_metric(measurement: str) -> str:
-    lower_measurement = _filter_digits(measurement.lower()).strip()
-
-    if lower_measurement in POUNDS_UNITS:
-        return "Weight"
-    if lower_measurement in combine_units(POUNDS_UNITS, RIGHT_UNITS):
-        return "Weight Right"
-    if lower_measurement in combine_units(POUNDS_UNITS, LEFT_UNITS):
-        return "Weight Left"
-    if lower_measurement in combine_units(SECONDS_UNITS, RIGHT_UNITS):
-        return "Seconds Right"
-    if lower_measurement in combine_units(SECONDS_UNITS, LEFT_UNITS):
-        return "Seconds Left"
-    if lower_measurement in RIGHT_UNITS:
-        return "Reps Right"
-    if lower_measurement in LEFT_UNITS:
-        return "Reps Left"
-
-    if lower_measurement in HOURS_UNITS:
-        return "Hours"
-
-    if lower_measurement in MINUTES_UNITS:
-        return "Minutes"
-    if lower_measurement in SECONDS_UNITS:
-        return "Seconds"
-    if lower_measurement in PERCENTAGE_UNITS:
-        return "Percentage"
-    if lower_measurement == "[x]" or lower_measurement == "[ ]":
-        return "Completion"
-    if lower_measurement == "planks":
-        return "Distance"
-    if lower_measurement == "":
-        return "Reps"
-    return "Variation"
-
-
-def _str_to_float(string: str) -> float:
-    if string == "":
-        return np.nan
-    return float(string)
-
-
-def _filter_non_digits(string: str) -> str:
-    result = ""
-    for char in string:
-        if char in "1234567890.":
-            result += char
-    return result
-
-
-def _filter_digits(string: str) -> str:
-    result = ""
-    for char in string:
-        if char not in "1234567890.":
-            result += char
-    return result
-
-
-def visualize_plan(plan: str, activity: str):
+def _get_plan_panels(
+    plan_index: "pd.DataFrame",
+) -> List[Tuple[str, "pd.Series", "pd.Series"]]:
+    """
+    Get the title, dates and values of every panel of a plan visualization: the mean
+    reps and weight of each exercise of each session per practice, and whether it was
+    completed.
+    """
+    # the index is slow to import, so only do so when needed.
+    from index import EXERCISE_ROW_SET
+
+    panels = []
+    for (session_name, exercise), exercise_index in plan_index.groupby(
+        ["Session", "Exercise"], sort=True
+    ):
+        practice_rows = exercise_index[
+            exercise_index["Set"] == EXERCISE_ROW_SET
+        ].set_index("Practice")
+
+        for metric in PLAN_METRICS:
+            metric_rows = exercise_index[exercise_index["Metric"] == metric]
+            if len(metric_rows) == 0:
+                continue
+            metric_means = (
+                metric_rows.groupby("Practice")["Value"]
+                .mean()
+                .reindex(practice_rows.index)
+                .fillna(0)
+            )
+            panels.append(
+                (
+                    f"{session_name} {exercise} {metric}",
+                    practice_rows["Date"],
+                    metric_means,
+                )
+            )
+
+        completed = practice_rows["Completed"]
+        if completed.notna().any():
+            panels.append(
+                (
+                    f"{session_name} {exercise}",
+                    practice_rows["Date"],
+                    completed.fillna(False).astype(int),
+                )
+            )
+    return panels
+
+
+def visualize_plan(plan: str, activity: str, until: Optional[str] = None) -> List[str]:
+    """
+    Plot the practices of a plan up to a date, with a panel per exercise metric, into
+    pages of `PLAN_PANELS_PER_PAGE` panels saved in the plan directory.
+
+    Args:
+        plan (str): The plan to visualize.
+        activity (str): The activity this plan is associated with.
+        until (Optional[str], optional): The last date to plot practices of, as
+            YYYY-MM-DD. Practices scheduled after it aren't read at all. Defaults to
+            today.
+
+    Returns:
+        List[str]: The paths of the saved pages.
+    """
     plan_dir = get_plan_dir(plan=plan, activity=activity)
     if not os.path.isdir(plan_dir):
         raise FileNotFoundError(plan)
@@ -234,144 +306,152 @@ def visualize_plan(plan: str, activity: str):
     schedule_path = os.path.join(plan_dir, schedule_name)
     if not os.path.isfile(schedule_path):
         raise FileNotFoundError(schedule_path)
-
-    # TODO get all of the sessions associated with this plan
-    session_names = [
-        file[:-3] for file in os.listdir(plan_dir) if file != schedule_name
-    ]
-
-    sessions = {session_name: [] for session_name in session_names}
-
-    practices_dir = get_practices_dir(activity=activity)
-
-    for practice_path, _, files in os.walk(practices_dir):
-        for file in files:
-            practice_name = file[:-3]
-            split_practice_name = practice_name.split(" ")
-            date = split_practice_name[0]
-            session_name = " ".join(split_practice_name[3:])
-
-            with open(os.path.join(practice_path, practice_name + ".md"), "r") as file:
-                # extract exercises from practice
-                practice_lines = file.readlines()
-
-            sessions[session_name].append({})
-            sessions[session_name][-1]["date"] = date
-
-            if datetime.datetime.strptime(date, "%Y-%m-%d") > datetime.datetime.now():
-                continue
-
-            metrics = None
-
-            for line in practice_lines:
-                if line.startswith("## Notes"):
-                    break
-                if line.startswith("# "):
-                    skipped = "skipped" in line.lower()
-                    sessions[session_name][-1]["skipped"] = skipped
-                    if skipped:
-                        break
-
-                    assert line[2:-1] == session_name, f"{line[2:-1]} != {session_name}"
-
-                elif line.startswith("- "):
-                    completion_false = line.startswith("- [ ] ")
-                    completion_true = line.startswith("- [x] ")
-                    exercise_name = (
-                        line[6:-1]
-                        if completion_false or completion_true
-                        else line[2:-1]
-                    )
-                    sessions[session_name][-1][exercise_name] = {}
-                    if completion_false:
-                        sessions[session_name][-1][exercise_name]["completed"] = False
-                    if completion_true:
-                        sessions[session_name][-1][exercise_name]["completed"] = True
-
-                elif line.startswith("\t- "):
-                    if line[3:].startswith("Metric: "):
-                        metrics = [metric.strip() for metric in line[11:].split("|")]
-                        if "completed" not in sessions[session_name][-1][exercise_name]:
-                            for metric in metrics:
-                                sessions[session_name][-1][exercise_name][metric] = []
-
-                elif line.startswith("\t") and len(line) >= 3 and line[2] == ".":
-                    set_measurements = [
-                        measurement.strip() for measurement in line[3:].split(",")
-                    ]
-                    set_metrics = [
-                        _measurement_to_metric(measurement)
-                        for measurement in set_measurements
-                    ]
-                    for metric, measurement in zip(set_metrics, set_measurements):
-                        if metric in sessions[session_name][-1][exercise_name]:
-                            sessions[session_name][-1][exercise_name][metric].append(
-                                measurement
-                            )
-
-                    # if metrics is not None:
-                    #     print(set_num, set_measurements, metrics)
-
-    # print(sessions[session_name])
-
-    for session_name in sessions:
-        session_keys = set.union(
-            *[set(session.keys()) for session in sessions[session_name]]
+    if until is None:
+        until = datetime.date.today().isoformat()
+
+    # the index and plotting are slow to import, so only do so when needed.
+    import matplotlib.dates as mdates
+    import pandas as pd
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    from matplotlib.style import context
+
+    from index import INDEX_COLUMNS, iter_index_rows
+    from plotting import PLOT_STYLE
+
+    with phase("dataframe build"):
+        plan_index = pd.DataFrame.from_records(
+            list(iter_index_rows(activity=activity, end=until, plan=plan)),
+            columns=INDEX_COLUMNS,
         )
-        print(session_name)
-
-        # for each, plot something
-        for session_key in session_keys:
-            if session_key == "date":
-                continue
-            # print(sessions)
-            dated_vals = [
-                (session["date"], session[session_key])
-                for session in sessions[session_name]
-                if session_key in session
-            ]
-            print(dated_vals)
-            if len(dated_vals) > 0 and any(
-                isinstance(dated_val[1], dict) and "Reps" in dated_val[1]
-                for dated_val in dated_vals
-            ):
-                plt.plot_date(
-                    [dated_val[0] for dated_val in dated_vals],
-                    [
-                        np.mean([int(reps) for reps in dated_val[1]["Reps"]])
-                        if "Reps" in dated_val[1] and len(dated_val[1]["Reps"]) > 0
-                        else 0
-                        for dated_val in dated_vals
-                    ],
-                )
-                plt.title(f"{session_key} Reps")
-                plt.show()
-            if len(dated_vals) > 0 and any(
-                isinstance(dated_val[1], dict) and "Weight" in dated_val[1]
-                for dated_val in dated_vals
-            ):
-                plt.plot_date(
-                    [dated_val[0] for dated_val in dated_vals],
-                    [
-                        np.mean(
-                            [
-                                float(_filter_non_digits(weight))
-                                for weight in dated_val[1]["Weight"]
-                            ]
-                        )
-                        if "Weight" in dated_val[1] and len(dated_val[1]["Weight"]) > 0
-                        else 0
-                        for dated_val in dated_vals
-                    ],
-                )
-                plt.title(f"{session_key} Weight")
-                plt.show()
-            if len(dated_vals) > 0 and any(
-                isinstance(dated_val[1], bool) for dated_val in dated_vals
+        plan_index["Date"] = pd.to_datetime(plan_index["Date"], format="%Y-%m-%d")
+        plan_index["Value"] = plan_index["Value"].astype(float)
+        plan_index["Completed"] = plan_index["Completed"].astype("boolean")
+        plan_index = plan_index[plan_index["Skipped"] == 0]
+    panels = _get_plan_panels(plan_index)
+
+    # remove the pages of a previous visualization, which may have had more panels.
+    for path in glob(os.path.join(plan_dir, "Visualization*.png")):
+        os.remove(path)
+
+    paths = []
+    for page_start in range(0, len(panels), PLAN_PANELS_PER_PAGE):
+        page_panels = panels[page_start : page_start + PLAN_PANELS_PER_PAGE]
+        num_rows = -(-len(page_panels) // PLAN_PANEL_COLUMNS)
+        height = PLAN_PANEL_SIZE[1] * num_rows
+        with phase("plot rendering"), context(PLOT_STYLE):
+            # pages are only ever saved, so they are drawn straight onto an Agg
+            # canvas rather than through pyplot, leaving its backend alone.
+            figure = Figure(figsize=(PLAN_PANEL_SIZE[0] * PLAN_PANEL_COLUMNS, height))
+            FigureCanvasAgg(figure)
+            # the practices of a plan span the same dates, so panels share a date axis,
+            # labelled only below the last panel of each column.
+            axs = figure.subplots(
+                nrows=num_rows, ncols=PLAN_PANEL_COLUMNS, sharex=True, squeeze=False
+            )
+            locator = mdates.AutoDateLocator()
+            axs[0, 0].xaxis.set_major_locator(locator)
+            axs[0, 0].xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
+            for panel, (ax, (title, dates, values)) in enumerate(
+                zip(axs.flat, page_panels)
             ):
-                plt.plot_date(
-                    [dated_val[0] for dated_val in dated_vals],
-                    [1 if dated_val[1] else 0 for dated_val in dated_vals],
+                ax.plot(dates, values, "o")
+                ax.set_title(title)
+                ax.tick_params(
+                    axis="x", labelbottom=panel + PLAN_PANEL_COLUMNS >= len(page_panels)
                 )
-                plt.title(f"{session_name} {session_key}")
-                plt.show()
+            for ax in axs.flat[len(page_panels) :]:
+                ax.set_visible(False)
+            # fixed margins, in inches, as fitting them with `tight_layout` takes
+            # about as long as drawing the page.
+            figure.subplots_adjust(
+                left=0.04,
+                right=0.99,
+                bottom=0.4 / height,
+                top=1 - 0.35 / height,
+                hspace=0.35,
+                wspace=0.15,
+            )
+
+        page = page_start // PLAN_PANELS_PER_PAGE + 1
+        page_name = "Visualization.png" if page == 1 else f"Visualization {page}.png"
+        path = os.path.join(plan_dir, page_name)
+        with phase("file write"), context(PLOT_STYLE):
+            figure.savefig(path)
+        paths.append(path)
+    return paths
+
+
+def get_plan_adherence(
+    activity: str,
+    by: str = "plan",
+    plan: Optional[str] = None,
+    until: Optional[str] = None,
+) -> "pd.DataFrame":
+    """
+    Rate how closely practices followed their plans over each of the
+    `ADHERENCE_WINDOWS`, from the index, so only practices changed since it was last
+    updated are parsed.
+
+    Args:
+        activity (str): The activity to rate the practices of.
+        by (str, optional): What to rate separately, one of "plan", "session",
+            "weekday" or "exercise". Defaults to "plan".
+        plan (Optional[str], optional): Only rate the practices of this plan.
+            Defaults to None.
+        until (Optional[str], optional): The last date of every window, as
+            YYYY-MM-DD. Practices scheduled after it aren't read at all. Defaults to
+            today.
+
+    Returns:
+        pd.DataFrame: A dataframe with a row per group and window with any planned
+            exercises, with the columns "Group", "Window", the counts described in
+            `index.get_adherence`, and "Completion Rate", "Skip Rate" (the shares of
+            planned exercises that were done and skipped) and "Set Rate" (the share
+            of set lines that were logged, NaN without any).
+    """
+    # the index is slow to import, so only do so when needed.
+    import pandas as pd
+
+    from index import get_adherence
+
+    if plan is not None:
+        # raises for unknown plans, rather than rating no practices.
+        get_plan_dir(plan=plan, activity=activity)
+    if until is None:
+        until = datetime.date.today().isoformat()
+
+    daily_adherence = get_adherence(activity=activity, by=by, end=until, plan=plan)
+    if by == "weekday":
+        # from Sunday first, as in SQLite, to the names of `DOW_TO_INT`.
+        weekdays = list(DOW_TO_INT.keys())
+        daily_adherence["Group"] = pd.Categorical(
+            [weekdays[(weekday - 1) % 7] for weekday in daily_adherence["Group"]],
+            categories=weekdays,
+        )
+
+    windows = []
+    for window, weeks in ADHERENCE_WINDOWS.items():
+        window_adherence = daily_adherence
+        if weeks is not None:
+            start = (
+                pd.Timestamp(until) - pd.Timedelta(weeks=weeks) + pd.Timedelta(days=1)
+            )
+            window_adherence = daily_adherence[daily_adherence["Date"] >= start]
+        window_adherence = (
+            window_adherence.drop(columns="Date")
+            .groupby("Group", observed=True, sort=True)
+            .sum()
+            .reset_index()
+        )
+        window_adherence.insert(1, "Window", window)
+        windows.append(window_adherence)
+
+    adherence = pd.concat(windows, ignore_index=True)
+    adherence["Completion Rate"] = adherence["Done"] / adherence["Planned"]
+    adherence["Skip Rate"] = adherence["Skipped"] / adherence["Planned"]
+    adherence["Set Rate"] = adherence["Sets"] / adherence["Set Lines"].where(
+        adherence["Set Lines"] > 0
+    )
+    # the windows of each group together, in the order of `ADHERENCE_WINDOWS`.
+    return adherence.sort_values("Group", kind="stable").reset_index(drop=True)
@@ -0,0 +1,18 @@
+"""
+Lazy access to the plotting stack, which is slow to import.
+"""
+from functools import lru_cache
+from types import ModuleType
+
+PLOT_STYLE = "seaborn-v0_8"
+
+
+@lru_cache(maxsize=None)
+def get_pyplot() -> ModuleType:
+    """
+    Import `matplotlib.pyplot`, applying the plot style of the app on first use.
+    """
+    import matplotlib.pyplot as plt
+
+    plt.style.use(PLOT_STYLE)
+    return plt
@@ -1,8 +1,8 @@
 import os
-from typing import Optional
+from typing import Dict, List, Optional
 
-from dir_utils import get_practices_dir
-from plan import get_plan_dir
+from dir_utils import get_plan_dir, get_practices_dir
+from profiling import phase
 
 
 def create_practice(
@@ -46,7 +46,16 @@ def create_practice(
             # just skip creating the practice.
             return
 
-    # extract exercises from session plan
+    exercises = read_session(session_path)
+    write_practice(practice_path, session_type, exercises)
+
+
+@phase("file parse")
+def read_session(session_path: str) -> List[Dict[str, str]]:
+    """
+    Read the exercises of a session template, each as a dict of its name and
+    properties (e.g. "Metric", "Sets").
+    """
     with open(session_path, "r") as file:
         lines = file.readlines()
 
@@ -64,7 +73,17 @@ def create_practice(
             val = ":".join(line.split(":")[1:]).strip()
             current_exercise[key] = val
 
-    with open(os.path.join(practice_dir, practice_path), "w") as file:
+    return exercises
+
+
+@phase("file write")
+def write_practice(
+    practice_path: str, session_type: str, exercises: List[Dict[str, str]]
+):
+    """
+    Write a practice file for the exercises of a session, as read by `read_session`.
+    """
+    with open(practice_path, "w") as file:
         file.write(f"# {session_type}\n")
         file.write("### HH:MM - HH:MM\n")
 
@@ -0,0 +1,142 @@
+"""
+Wall time and call counts of the main phases of a command, e.g. file parsing or
+plot rendering, for `--profile`.
+
+Phases are marked with `phase`, as a context manager or a decorator. Until profiling is
+enabled, marking a phase only costs a flag check. Phases may nest, in which case the
+time of the inner phase is also counted in the outer one.
+"""
+import cProfile
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+_ENABLED = False
+
+# every completed phase, as (phase, start, seconds, process id).
+_PHASE_EVENTS: List[Tuple[str, float, float, int]] = []
+
+
+def enable_profiling():
+    """
+    Start recording phases, e.g. in a worker process of a profiled command.
+    """
+    global _ENABLED
+    _ENABLED = True
+
+
+def is_profiling() -> bool:
+    return _ENABLED
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """
+    Record the wall time of a phase.
+
+    Args:
+        name (str): The name of the phase, e.g. "file parse".
+    """
+    if not _ENABLED:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _PHASE_EVENTS.append((name, start, time.perf_counter() - start, os.getpid()))
+
+
+def pop_phase_events() -> List[Tuple[str, float, float, int]]:
+    """
+    Get and forget the phases recorded so far, e.g. to send them to another process.
+    """
+    events = list(_PHASE_EVENTS)
+    _PHASE_EVENTS.clear()
+    return events
+
+
+def add_phase_events(events: List[Tuple[str, float, float, int]]):
+    """
+    Add phases recorded by another process, as returned by `pop_phase_events`.
+    """
+    _PHASE_EVENTS.extend(events)
+
+
+def format_phase_summary(total_seconds: float) -> str:
+    """
+    Format a table of the time and calls of every phase, slowest first. Phases run in
+    parallel processes are summed, so may add up to more than the total.
+
+    Args:
+        total_seconds (float): The wall time of the whole command, to compare with.
+    """
+    totals: Dict[str, List[float]] = {}
+    for name, _, seconds, _ in _PHASE_EVENTS:
+        phase_totals = totals.setdefault(name, [0.0, 0])
+        phase_totals[0] += seconds
+        phase_totals[1] += 1
+
+    lines = [f"{'phase':<20}{'seconds':>10}{'% total':>10}{'calls':>10}"]
+    for name, (seconds, calls) in sorted(totals.items(), key=lambda item: -item[1][0]):
+        percent = seconds / total_seconds * 100 if total_seconds > 0 else 0
+        lines.append(f"{name:<20}{seconds:>10.3f}{percent:>10.1f}{calls:>10}")
+    lines.append(f"{'total':<20}{total_seconds:>10.3f}")
+    return "\n".join(lines)
+
+
+def write_phase_trace(path: str):
+    """
+    Write every recorded phase as a JSON trace, in the Trace Event Format that
+    chrome://tracing and Perfetto open.
+
+    Args:
+        path (str): The path of the trace file.
+    """
+    trace_events = [
+        {
+            "name": name,
+            "ph": "X",
+            "ts": start * 1e6,
+            "dur": seconds * 1e6,
+            "pid": pid,
+            "tid": pid,
+        }
+        for name, start, seconds, pid in _PHASE_EVENTS
+    ]
+    with open(path, "w") as file:
+        json.dump({"traceEvents": trace_events}, file)
+
+
+@contextmanager
+def profile(output_path: Optional[str] = None) -> Iterator[None]:
+    """
+    Profile everything run in the context, printing a summary of its phases to
+    stderr when done.
+
+    Args:
+        output_path (Optional[str], optional): Also write the phases as a JSON trace
+            to this path if it ends with ".json", or else the full cProfile stats,
+            which `python -m pstats` or snakeviz open. Defaults to None.
+    """
+    enable_profiling()
+    profiler = None
+    if output_path is not None and not output_path.endswith(".json"):
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        total_seconds = time.perf_counter() - start
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(output_path)
+        elif output_path is not None:
+            write_phase_trace(output_path)
+        print(format_phase_summary(total_seconds), file=sys.stderr)
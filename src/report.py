@@ -1,9 +1,16 @@
+import io
 import os
-from typing import List
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from itertools import repeat
+from typing import Dict, List, NamedTuple, Optional, Tuple
 
+import matplotlib
+import numpy as np
 import pandas as pd
 
 from dir_utils import (
+    get_practices_dir,
     get_report_dir,
     get_report_path,
     get_report_template_path,
@@ -11,13 +18,45 @@ from dir_utils import (
     get_reports_dir,
     strip_before_activity,
 )
-from exercise import get_exercise, visualize_exercise_data
+from exercise import get_exercise, get_session_rollups, visualize_exercise_data
+from index import (
+    ROLLUP_AGGREGATIONS,
+    VOLUME_METRICS,
+    get_index,
+    get_loaded_indexes,
+    set_loaded_indexes,
+)
 from orm_calculations import calculate_orm
+from profiling import (
+    add_phase_events,
+    enable_profiling,
+    is_profiling,
+    phase,
+    pop_phase_events,
+)
+from vault import Vault, get_vault, set_vault
 
-# Type of aggregation to be performed over sets in a single session.
-# Setting as None keeps all sets.
+# Type of aggregation to be performed over sets in a single session, unless a report
+# template sets another one of `ROLLUP_AGGREGATIONS` with "- Aggregation: ...".
 SET_AGG_FUNCTION = "max"
 
+# The metric of the bodyweight exercise of the vault that is used as bodyweight.
+BODYWEIGHT_METRIC = "Weight"
+
+
+class BodyweightSeries(NamedTuple):
+    # days with a measurement, sorted.
+    measured_days: np.ndarray
+    # the last measurement on or before every day from the first to the last
+    # measured day.
+    daily: np.ndarray
+
+
+# the bodyweight series of each vault, with the index it was read from.
+_BODYWEIGHT_CACHE: Dict[
+    Tuple[str, str, str], Tuple[pd.DataFrame, BodyweightSeries]
+] = {}
+
 
 def create_report_template(name: str, activity: str):
     report_dir = get_report_dir(name, activity)
@@ -41,150 +80,297 @@ def _get_metrics_for_exercise_data(exercise_data: pd.DataFrame) -> List[str]:
     ]
 
 
-def generate_reports(activity: str):
-    reports_dir = get_reports_dir(activity)
-    for report_name in os.listdir(reports_dir):
-        report_template_path = get_report_template_path(report_name, activity)
-        with open(report_template_path, "r") as file:
-            lines = file.readlines()
-
-        exercises = []
-        start_date = None
-
-        weight_cols = ["Weight", "Weight Left", "Weight Right"]
-        weight_to_reps_col = {
-            "Weight": "Reps",
-            "Weight Left": "Reps Left",
-            "Weight Right": "Reps Right",
-        }
+class ReportTemplate(NamedTuple):
+    exercises: List[str]
+    start: Optional[str]
+    is_bodyweight_exercise: bool
+    normalize_by_bodyweight: bool
+    aggregation: str
+
+
+def read_report_template(report_name: str, activity: str) -> ReportTemplate:
+    report_template_path = get_report_template_path(report_name, activity)
+    with open(report_template_path, "r") as file:
+        lines = file.readlines()
+
+    exercises = []
+    start_date = None
+    is_bodyweight_exercise = False
+    normalize_by_bodyweight = False
+    aggregation = SET_AGG_FUNCTION
+    for line in lines:
+        if line.startswith("- Exercise:"):
+            exercises.append(line.removeprefix("- Exercise:").strip())
+        if line.startswith("- Start:"):
+            start_date = line.removeprefix("- Start:").strip()
+        if line.startswith("- Is Bodyweight Exercise"):
+            is_bodyweight_exercise = True
+        if line.startswith("- Normalize by Bodyweight"):
+            normalize_by_bodyweight = True
+        if line.startswith("- Aggregation:"):
+            aggregation = line.removeprefix("- Aggregation:").strip()
+
+    if len(exercises) == 0:
+        raise ValueError(exercises)
+    if aggregation not in ROLLUP_AGGREGATIONS:
+        raise ValueError(aggregation)
+
+    return ReportTemplate(
+        exercises=exercises,
+        start=start_date,
+        is_bodyweight_exercise=is_bodyweight_exercise,
+        normalize_by_bodyweight=normalize_by_bodyweight,
+        aggregation=aggregation,
+    )
+
+
+def get_bodyweight_series() -> BodyweightSeries:
+    """
+    Get the bodyweight of the current vault by day, reading it only once for every
+    report, until its index changes.
+    """
+    vault = get_vault()
+    activity = vault.bodyweight_activity
+    exercise = vault.bodyweight_exercise
+    index = get_index(activity=activity)
+    key = (vault.path, activity, exercise)
+    if key in _BODYWEIGHT_CACHE and _BODYWEIGHT_CACHE[key][0] is index:
+        return _BODYWEIGHT_CACHE[key][1]
+
+    with phase("bodyweight join"):
+        data = get_exercise(activity=activity, exercise=exercise)
+        if BODYWEIGHT_METRIC not in data.columns:
+            raise ValueError(exercise)
+        data = data.dropna(subset=[BODYWEIGHT_METRIC])
+        days = data["Date"].to_numpy().astype("datetime64[D]")
+        weights = data[BODYWEIGHT_METRIC].to_numpy()
+
+        # keep the last measurement of each day.
+        measured_days, last_idxs = np.unique(days[::-1], return_index=True)
+        weights = weights[len(weights) - 1 - last_idxs]
+        day_idxs = (measured_days - measured_days[0]).astype(np.int64)
+        # fill every day with the index of its last measured day.
+        measured_day_idxs = np.zeros(day_idxs[-1] + 1, dtype=np.int64)
+        measured_day_idxs[day_idxs] = np.arange(len(day_idxs))
+        measured_day_idxs = np.maximum.accumulate(measured_day_idxs)
+        series = BodyweightSeries(
+            measured_days=measured_days, daily=weights[measured_day_idxs]
+        )
+
+    _BODYWEIGHT_CACHE[key] = (index, series)
+    return series
+
+
+def lookup_bodyweight(
+    series: BodyweightSeries, dates: pd.Series, start: Optional[str] = None
+) -> np.ndarray:
+    """
+    Get the bodyweight on each date: the last measured on or before it, or else the
+    first measured after it.
+
+    Args:
+        series (BodyweightSeries): The bodyweight series, from
+            `get_bodyweight_series`.
+        dates (pd.Series): The dates to get the bodyweight on.
+        start (Optional[str], optional): Ignore measurements before this date, as
+            YYYY-MM-DD. Defaults to None.
+
+    Returns:
+        np.ndarray: The bodyweight on each date.
+    """
+    first_idx = 0
+    if start is not None:
+        first_idx = np.searchsorted(series.measured_days, np.datetime64(start, "D"))
+        if first_idx == len(series.measured_days):
+            raise ValueError(start)
+    first_day = series.measured_days[0]
+    day_idxs = (dates.to_numpy().astype("datetime64[D]") - first_day).astype(np.int64)
+    min_day_idx = (series.measured_days[first_idx] - first_day).astype(np.int64)
+    return series.daily[np.clip(day_idxs, min_day_idx, len(series.daily) - 1)]
 
-        # NOTE: This is a hard-coded exercise name
-        # representing your "bodyweight" measurement.
-        # TODO This should probably be configurable globally.
-        bodyweight = "Weight"
-        is_bodyweight_exercise = False
-        normalize_by_bodyweight = False
-        for line in lines:
-            if line.startswith("- Exercise:"):
-                exercises.append(line.removeprefix("- Exercise:").strip())
-            if line.startswith("- Start:"):
-                start_date = line.removeprefix("- Start:").strip()
-            if line.startswith("- Is Bodyweight Exercise"):
-                is_bodyweight_exercise = True
-            if line.startswith("- Normalize by Bodyweight"):
-                normalize_by_bodyweight = True
-
-        if len(exercises) == 0:
-            raise ValueError(exercises)
-
-        all_data = {
-            exercise: get_exercise(
-                activity=activity, exercise=exercise, start=start_date
-            )
-            for exercise in exercises
-        }
 
-        weight_exercises = [
-            exercise
-            for exercise, data in all_data.items()
-            if any(col in data.columns for col in weight_cols)
-        ]
-        weight_exercise_params = {
-            exercise: {
-                "is_bw_exercise": is_bodyweight_exercise,
-                "normalize_by_bw": normalize_by_bodyweight,
-                "calculate_orm": True,
-                # NOTE may want to parameterize by exercise at some point.
-                # For now, a global aggregation function is fine.
-                "set_agg_func": SET_AGG_FUNCTION,
-            }
-            for exercise in weight_exercises
+def generate_report(report_name: str, activity: str):
+    template = read_report_template(report_name, activity)
+    exercises = template.exercises
+    start_date = template.start
+    is_bodyweight_exercise = template.is_bodyweight_exercise
+    normalize_by_bodyweight = template.normalize_by_bodyweight
+
+    weight_cols = ["Weight", "Weight Left", "Weight Right"]
+    weight_to_reps_col = {
+        "Weight": "Reps",
+        "Weight Left": "Reps Left",
+        "Weight Right": "Reps Right",
+    }
+
+    all_data = {
+        exercise: get_exercise(activity=activity, exercise=exercise, start=start_date)
+        for exercise in exercises
+    }
+
+    weight_exercises = [
+        exercise
+        for exercise, data in all_data.items()
+        if any(col in data.columns for col in weight_cols)
+    ]
+    weight_exercise_params = {
+        exercise: {
+            "is_bw_exercise": is_bodyweight_exercise,
+            "normalize_by_bw": normalize_by_bodyweight,
+            "calculate_orm": True,
+            "set_agg_func": template.aggregation,
         }
+        for exercise in weight_exercises
+    }
 
-        if bodyweight is not None:
-            bodyweight_data = get_exercise(
-                activity="Fitness", exercise=bodyweight, start=start_date
-            )
-            bodyweight_data["Bodyweight"] = bodyweight_data["Weight"]
-            del bodyweight_data["Weight"]
-
-        for exercise, data in all_data.items():
-            data["data_index"] = data.index.to_numpy()
-            for weight_col in [col for col in data.columns if col in weight_cols]:
-                col_of_interest = weight_col
-                reps_col = weight_to_reps_col[weight_col]
-
-                if bodyweight is not None:
-                    bw_col = "Bodyweight"
-                    # use temporary data index column to retain correct rows.
-                    merged = pd.merge(data, bodyweight_data, how="outer", on="Date")
-                    merged[bw_col] = merged[bw_col].ffill().bfill()
-                    merged = merged.dropna(subset=["data_index"])
-                    merged = merged.set_index("data_index")
-                else:
-                    merged = data.copy()
-
-                # calculate ORM
-                if (
-                    reps_col in data.columns
-                    and weight_exercise_params[exercise]["calculate_orm"]
-                ):
-                    if weight_exercise_params[exercise]["is_bw_exercise"]:
-                        # TODO vectorize calculate ORM
-                        merged[f"{col_of_interest} | ORM"] = [
-                            calculate_orm(
-                                row[col_of_interest],
-                                row[reps_col],
-                                bodyweight=row[bw_col],
-                            )
-                            for _, row in merged.iterrows()
-                        ]
+    # columns calculated from the sets of each exercise.
+    feature_cols: Dict[str, List[str]] = {}
+    for exercise in weight_exercises:
+        data = all_data[exercise]
+        params = weight_exercise_params[exercise]
+        feature_cols[exercise] = []
+        bodyweight = None
+        if params["is_bw_exercise"] or params["normalize_by_bw"]:
+            bodyweight_series = get_bodyweight_series()
+            with phase("bodyweight join"):
+                bodyweight = lookup_bodyweight(
+                    bodyweight_series, data["Date"], start=start_date
+                )
+
+        for weight_col in [col for col in data.columns if col in weight_cols]:
+            col_of_interest = weight_col
+            reps_col = weight_to_reps_col[weight_col]
+
+            # calculate ORM
+            if reps_col in data.columns and params["calculate_orm"]:
+                with phase("orm"):
+                    if params["is_bw_exercise"]:
+                        data[f"{col_of_interest} | ORM"] = calculate_orm(
+                            data[col_of_interest],
+                            data[reps_col],
+                            bodyweight=bodyweight,
+                        )
                     else:
-                        # TODO vectorize calculate ORM
-                        merged[f"{col_of_interest} | ORM"] = [
-                            calculate_orm(
-                                row[col_of_interest],
-                                row[reps_col],
-                            )
-                            for _, row in merged.iterrows()
-                        ]
-                    col_of_interest = f"{col_of_interest} | ORM"
-                    data.loc[merged.index, col_of_interest] = merged[col_of_interest]
-
-                # normalize by bodyweight
-                if weight_exercise_params[exercise]["normalize_by_bw"]:
-                    merged[f"{col_of_interest} | %BW"] = (
-                        merged[col_of_interest] / merged[bw_col] * 100
-                    )
-                    col_of_interest = f"{col_of_interest} | %BW"
-                    data.loc[merged.index, col_of_interest] = merged[col_of_interest]
-            del data["data_index"]
-
-        # after doing any feature engineering, aggregate across sets.
-        for exercise in weight_exercises:
-            all_data[exercise] = (
-                all_data[exercise]
-                .groupby(["Date", "Session"], as_index=False)
-                .agg(weight_exercise_params[exercise]["set_agg_func"])
+                        data[f"{col_of_interest} | ORM"] = calculate_orm(
+                            data[col_of_interest],
+                            data[reps_col],
+                        )
+                col_of_interest = f"{col_of_interest} | ORM"
+                feature_cols[exercise].append(col_of_interest)
+
+            # normalize by bodyweight
+            if params["normalize_by_bw"]:
+                data[f"{col_of_interest} | %BW"] = (
+                    data[col_of_interest] / bodyweight * 100
+                )
+                col_of_interest = f"{col_of_interest} | %BW"
+                feature_cols[exercise].append(col_of_interest)
+
+    # after doing any feature engineering, aggregate across sets. Metrics are already
+    # rolled up per session, so only calculated features need aggregating.
+    for exercise in weight_exercises:
+        set_agg_func = weight_exercise_params[exercise]["set_agg_func"]
+        session_data = get_session_rollups(
+            activity=activity,
+            exercise=exercise,
+            start=start_date,
+            aggregation=set_agg_func,
+        )
+        with phase("aggregation"):
+            session_data = session_data.drop(
+                columns=[col for col in VOLUME_METRICS if col in session_data.columns]
             )
-            del all_data[exercise]["Set"]
-
-        # finally, start generating the results
-        visualization_path = get_report_visualization_path(report_name, activity)
-        results_dict = visualize_exercise_data(all_data, filename=visualization_path)
-
-        lines = []
-        for metric, metric_results in results_dict.items():
-            lines.append(f"# {metric}")
-            for metric_category, metric_category_stats in metric_results.items():
-                lines.append(f"## {metric_category}")
-                for stat, val in metric_category_stats.items():
-                    lines.append(f"- {stat}: **{val:0.2f}**")
-
-        lines.append("# Visualization")
-        lines.append(f"![[{strip_before_activity(visualization_path, activity)}]]")
-        report_results = "\n".join(lines)
-
-        report_path = get_report_path(report_name, activity)
-        with open(report_path, "w") as file:
-            file.write(report_results)
+            if len(feature_cols[exercise]) > 0:
+                session_data = session_data.join(
+                    all_data[exercise]
+                    .groupby("Session")[feature_cols[exercise]]
+                    .agg(set_agg_func),
+                    on="Session",
+                )
+        all_data[exercise] = session_data
+
+    # finally, start generating the results
+    visualization_path = get_report_visualization_path(report_name, activity)
+    results_dict = visualize_exercise_data(all_data, filename=visualization_path)
+
+    lines = []
+    for metric, metric_results in results_dict.items():
+        lines.append(f"# {metric}")
+        for metric_category, metric_category_stats in metric_results.items():
+            lines.append(f"## {metric_category}")
+            for stat, val in metric_category_stats.items():
+                lines.append(f"- {stat}: **{val:0.2f}**")
+
+    lines.append("# Visualization")
+    lines.append(f"![[{strip_before_activity(visualization_path, activity)}]]")
+    report_results = "\n".join(lines)
+
+    report_path = get_report_path(report_name, activity)
+    with phase("file write"), open(report_path, "w") as file:
+        file.write(report_results)
+
+
+def _init_report_worker(vault: Vault, loaded_indexes: Dict, profiling: bool):
+    # reports are only ever written to files, so never open any windows.
+    matplotlib.use("Agg")
+    set_vault(vault)
+    set_loaded_indexes(loaded_indexes)
+    if profiling:
+        enable_profiling()
+
+
+def _generate_report_with_output(
+    report_name: str, activity: str
+) -> Tuple[str, List[tuple]]:
+    output = io.StringIO()
+    with redirect_stdout(output):
+        generate_report(report_name, activity)
+    return output.getvalue(), pop_phase_events()
+
+
+def get_reports(activity: str) -> List[str]:
+    reports_dir = get_reports_dir(activity)
+    return sorted(
+        report_name
+        for report_name in os.listdir(reports_dir)
+        if os.path.isdir(os.path.join(reports_dir, report_name))
+    )
+
+
+def generate_reports(activity: str, jobs: int = 1):
+    """
+    Generate every report of an activity.
+
+    Args:
+        activity (str): The activity to generate reports for.
+        jobs (int, optional): The number of reports to generate in parallel, each in
+            its own process. Defaults to 1.
+    """
+    report_names = get_reports(activity)
+
+    if jobs == 1:
+        for report_name in report_names:
+            generate_report(report_name, activity)
+        return
+
+    # parse practices once up front, and share them with every worker. Like in
+    # `generate_report`, the bodyweight is only read if a report may need it, and a
+    # vault without a bodyweight activity is left to fail in the reports that do.
+    get_index(activity=activity)
+    bodyweight_activity = get_vault().bodyweight_activity
+    if os.path.isdir(get_practices_dir(activity=bodyweight_activity)) and any(
+        template.is_bodyweight_exercise or template.normalize_by_bodyweight
+        for template in map(read_report_template, report_names, repeat(activity))
+    ):
+        get_index(activity=bodyweight_activity)
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=_init_report_worker,
+        initargs=(get_vault(), get_loaded_indexes(), is_profiling()),
+    ) as executor:
+        # outputs are printed in report order, regardless of which finishes first.
+        for output, phase_events in executor.map(
+            _generate_report_with_output, report_names, repeat(activity)
+        ):
+            print(output, end="")
+            add_phase_events(phase_events)
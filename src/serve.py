@@ -0,0 +1,197 @@
+"""
+Answer queries about a vault over local HTTP, so that editors and scripts don't pay
+for starting Python and parsing the vault on every lookup.
+
+The server loads the index of an activity on its first query and keeps it loaded,
+re-parsing only the practices changed since the previous query. Requests are handled
+one at a time, as the loaded indexes are shared. Every endpoint takes its arguments
+as query parameters and answers with JSON, except for charts:
+
+    GET /exercises?activity=Fitness
+    GET /exercise?activity=Fitness&name=Pullups[&start=YYYY-MM-DD]
+    GET /trend?activity=Fitness&name=Pullups[&name=Dips][&start=YYYY-MM-DD]
+    GET /chart?activity=Fitness&name=Pullups[&name=Dips][&start=YYYY-MM-DD]
+
+For example, `curl "localhost:8765/trend?activity=Fitness&name=Pullups"`.
+"""
+import io
+import json
+import math
+import os
+import socket
+import socketserver
+import stat
+from contextlib import redirect_stdout
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from logging import debug, error
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+
+from exercise import (
+    get_exercise,
+    get_exercise_trends,
+    get_exercises,
+    visualize_exercise_data,
+)
+from index import refresh_index
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+
+def _get_param(params: Dict[str, List[str]], name: str) -> str:
+    if name not in params:
+        raise KeyError(name)
+    return params[name][0]
+
+
+def _get_exercises_data(params: Dict[str, List[str]]) -> Dict[str, pd.DataFrame]:
+    """
+    Get the data of every requested exercise, after updating the loaded index.
+    """
+    activity = _get_param(params, "activity")
+    exercises = params.get("name", [])
+    if len(exercises) == 0:
+        raise KeyError("name")
+    start = params.get("start", [None])[0]
+    refresh_index(activity=activity)
+    return {
+        exercise: get_exercise(activity=activity, exercise=exercise, start=start)
+        for exercise in exercises
+    }
+
+
+def _to_json_float(value: float) -> Optional[float]:
+    # JSON has no NaN, e.g. for the trend of a single measurement.
+    return float(value) if math.isfinite(value) else None
+
+
+def _handle_exercises(params: Dict[str, List[str]]) -> Tuple[str, bytes]:
+    activity = _get_param(params, "activity")
+    refresh_index(activity=activity)
+    exercises = get_exercises(activity=activity)
+    return "application/json", json.dumps(exercises).encode()
+
+
+def _handle_exercise(params: Dict[str, List[str]]) -> Tuple[str, bytes]:
+    params = {**params, "name": [_get_param(params, "name")]}
+    (data,) = _get_exercises_data(params).values()
+    # one row per set, with ISO dates and null for missing metrics.
+    body = data.to_json(orient="split", index=False, date_format="iso")
+    return "application/json", body.encode()
+
+
+def _handle_trend(params: Dict[str, List[str]]) -> Tuple[str, bytes]:
+    trends = get_exercise_trends(_get_exercises_data(params))
+    trends = {
+        exercise_metric: {
+            section: {key: _to_json_float(value) for key, value in values.items()}
+            for section, values in results.items()
+        }
+        for exercise_metric, results in trends.items()
+    }
+    return "application/json", json.dumps(trends).encode()
+
+
+def _handle_chart(params: Dict[str, List[str]]) -> Tuple[str, bytes]:
+    all_data = _get_exercises_data(params)
+    image = io.BytesIO()
+    # the results printed for `exercise info` aren't needed here.
+    with redirect_stdout(io.StringIO()):
+        visualize_exercise_data(all_data, filename=image)
+    return "image/png", image.getvalue()
+
+
+ENDPOINTS: Dict[str, Callable[[Dict[str, List[str]]], Tuple[str, bytes]]] = {
+    "/exercises": _handle_exercises,
+    "/exercise": _handle_exercise,
+    "/trend": _handle_trend,
+    "/chart": _handle_chart,
+}
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path not in ENDPOINTS:
+            self._send_error(404, f"unknown endpoint {url.path}")
+            return
+
+        try:
+            content_type, body = ENDPOINTS[url.path](parse_qs(url.query))
+        except KeyError as exception:
+            self._send_error(400, f"missing parameter {exception.args[0]}")
+            return
+        except (FileNotFoundError, ValueError) as exception:
+            self._send_error(404, f"not found: {exception}")
+            return
+        except Exception as exception:
+            # keep serving, e.g. after a practice that can't be parsed.
+            error(f"could not answer {self.path}: {exception!r}")
+            self._send_error(500, repr(exception))
+            return
+
+        self._send(200, content_type, body)
+
+    def _send_error(self, status: int, message: str):
+        self._send(status, "application/json", json.dumps({"error": message}).encode())
+
+    def _send(self, status: int, content_type: str, body: bytes):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any):
+        debug(format % args)
+
+
+class _UnixHTTPServer(HTTPServer):
+    address_family = socket.AF_UNIX
+
+    def server_bind(self):
+        # skip looking up the host name, as there is none.
+        socketserver.TCPServer.server_bind(self)
+        self.server_name = "localhost"
+        self.server_port = 0
+
+
+def serve(
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    socket_path: Optional[str] = None,
+):
+    """
+    Answer queries about the current vault until interrupted.
+
+    Args:
+        host (str, optional): The host to listen on. Defaults to DEFAULT_HOST.
+        port (int, optional): The port to listen on. Defaults to DEFAULT_PORT.
+        socket_path (Optional[str], optional): Listen on this Unix socket instead of
+            a host and port. Defaults to None.
+    """
+    # charts are only ever saved, so never need a display.
+    import matplotlib
+
+    matplotlib.use("Agg")
+
+    if socket_path is not None:
+        if os.path.exists(socket_path) and stat.S_ISSOCK(os.stat(socket_path).st_mode):
+            # left over from a previous server.
+            os.remove(socket_path)
+        server = _UnixHTTPServer(socket_path, _RequestHandler)
+        address = socket_path
+    else:
+        server = HTTPServer((host, port), _RequestHandler)
+        address = f"http://{host}:{server.server_port}"
+
+    print(f"Serving on {address}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if socket_path is not None:
+            os.remove(socket_path)
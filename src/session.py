@@ -1,7 +1,7 @@
 import os
 from typing import List
 
-from plan import get_plan_dir
+from dir_utils import get_plan_dir
 
 
 def create_session(session_type: str, plan: str, activity: str):
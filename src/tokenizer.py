@@ -0,0 +1,117 @@
+"""
+Streaming tokenizer for the practice markdown grammar.
+
+A practice file looks like:
+
+    # Pull
+    ### HH:MM - HH:MM
+    - [x] Weighted Pullups
+        - Metric: Reps | Weight
+        - Sets: 2
+        1. 5, 50 lbs
+        2. 4, 55 lbs
+
+    ## Notes
+    -
+
+`tokenize_practice` turns these lines into typed events in a single pass, reading
+lines lazily so that a file object can be passed in directly.
+"""
+import re
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Union
+
+_SET_LINE_PATTERN = re.compile(r"\t(\d+)\.(.*)")
+
+
+class SessionHeader(NamedTuple):
+    name: str
+    skipped: bool
+
+
+class ExerciseItem(NamedTuple):
+    name: str
+    completed: Optional[bool]
+    skipped: bool
+
+
+class MetricDeclaration(NamedTuple):
+    metrics: List[str]
+
+
+class SetLine(NamedTuple):
+    number: int
+    measurements: List[str]
+
+
+class NotesBoundary(NamedTuple):
+    pass
+
+
+PracticeEvent = Union[
+    SessionHeader, ExerciseItem, MetricDeclaration, SetLine, NotesBoundary
+]
+
+
+def _tokenize_exercise(item: str) -> Optional[ExerciseItem]:
+    completed = None
+    if item.startswith("[ ] "):
+        completed = False
+    elif item.startswith("[x] "):
+        completed = True
+    if completed is not None:
+        item = item[4:].strip()
+
+    skipped = item.endswith("- SKIPPED")
+    if skipped:
+        item = item[:-9].strip()
+    if len(item) == 0:
+        return None
+    return ExerciseItem(name=item, completed=completed, skipped=skipped)
+
+
+def tokenize_practice(lines: Iterable[str]) -> Iterator[PracticeEvent]:
+    """
+    Tokenize the lines of a practice file.
+
+    Lines that are not part of the grammar (e.g. times, exercise attributes other
+    than the metric) are skipped. Tokenizing stops after the notes boundary, so the
+    notes themselves are never read.
+
+    Args:
+        lines (Iterable[str]): The lines of the practice, with or without newlines.
+
+    Yields:
+        PracticeEvent: The events of the practice, in file order.
+    """
+    for line in lines:
+        first_char = line[:1]
+        if first_char == "#":
+            if line.startswith("## Notes"):
+                yield NotesBoundary()
+                return
+            if line.startswith("# "):
+                name = line[2:].strip()
+                yield SessionHeader(name=name, skipped="skipped" in name.lower())
+
+        elif first_char == "-":
+            if line.startswith("- "):
+                exercise = _tokenize_exercise(line[2:].strip())
+                if exercise is not None:
+                    yield exercise
+
+        elif first_char == "\t":
+            if line.startswith("\t- "):
+                if line.startswith("\t- Metric: "):
+                    yield MetricDeclaration(
+                        metrics=[metric.strip() for metric in line[11:].split("|")]
+                    )
+            else:
+                set_match = _SET_LINE_PATTERN.match(line)
+                if set_match is not None:
+                    yield SetLine(
+                        number=int(set_match.group(1)),
+                        measurements=[
+                            measurement.strip()
+                            for measurement in set_match.group(2).split(",")
+                        ],
+                    )
@@ -0,0 +1,338 @@
+"""
+Closed-form least-squares trend lines, fit for many series at once.
+
+Every series is fit with an intercept and a slope. Rather than building a model per
+series, the series are concatenated and their sums of squares are accumulated per
+series with `np.bincount`, so fitting a whole report is a handful of array operations.
+
+Trends over sliding windows, e.g. of the last 4 weeks, are fit for every point at
+once with `fit_rolling_trends`, from prefix sums, rather than by fitting each window.
+
+Trends can also be kept up to date as points are added and removed, with
+`update_trend_state`, which keeps only the weighted sums of each series (recursive
+least squares). These can forget exponentially, so that recent points weigh more.
+"""
+from typing import List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+
+class Trends(NamedTuple):
+    # one entry per series.
+    slope: np.ndarray
+    intercept: np.ndarray
+    # only computed when standard errors are asked for.
+    slope_se: Optional[np.ndarray]
+    intercept_se: Optional[np.ndarray]
+    # one row per series and one column per horizon, when horizons are given.
+    predictions: Optional[np.ndarray]
+
+
+def _divide(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    # degenerate series (e.g. a single point) have no trend, rather than an error.
+    return np.divide(
+        numerator,
+        denominator,
+        out=np.full(numerator.shape, np.nan),
+        where=denominator != 0,
+    )
+
+
+class TrendState(NamedTuple):
+    """
+    The sums of every series needed to fit its trend, with every point weighted by
+    `forgetting ** (last_x - x)`.
+    """
+
+    # one entry per series.
+    count: np.ndarray
+    weight: np.ndarray
+    # sums of the weighted x, y, x * x and x * y, with x relative to `origin`.
+    x: np.ndarray
+    y: np.ndarray
+    xx: np.ndarray
+    xy: np.ndarray
+    # the first x value of each series, to keep the sums small.
+    origin: np.ndarray
+    # the largest x value of the points of each series, at which points have a
+    # weight of 1.
+    last_x: np.ndarray
+
+
+def empty_trend_state(num_series: int) -> TrendState:
+    """
+    Get the state of series without any points.
+    """
+    return TrendState(
+        count=np.zeros(num_series, dtype=int),
+        weight=np.zeros(num_series),
+        x=np.zeros(num_series),
+        y=np.zeros(num_series),
+        xx=np.zeros(num_series),
+        xy=np.zeros(num_series),
+        origin=np.full(num_series, np.nan),
+        last_x=np.full(num_series, np.nan),
+    )
+
+
+def update_trend_state(
+    state: TrendState,
+    series: np.ndarray,
+    x: np.ndarray,
+    y: np.ndarray,
+    forgetting: float = 1.0,
+    remove: bool = False,
+) -> TrendState:
+    """
+    Add points to, or remove previously added points from, the state of their series.
+    Each point takes constant time, however many points its series already has.
+
+    Removing the latest point of a series leaves its last x where it was, so the
+    remaining points must then be weighed from their own latest x with
+    `move_trend_state`.
+
+    Args:
+        state (TrendState): The state of every series.
+        series (np.ndarray): The series of each point, as indices into the state.
+        x (np.ndarray): The x value of each point, in any order.
+        y (np.ndarray): The y value of each point, without NaNs.
+        forgetting (float, optional): The factor the weight of a point is multiplied
+            by per unit of x that later points are past it, between 0 and 1. Must be
+            the same for every update of a state. Defaults to 1.0, weighing every
+            point the same.
+        remove (bool, optional): Whether to remove the points rather than add them.
+            Defaults to False.
+
+    Returns:
+        TrendState: The updated state.
+    """
+    num_series = len(state.count)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    def per_series_sum(values: np.ndarray) -> np.ndarray:
+        return np.bincount(series, weights=values, minlength=num_series)
+
+    origin = state.origin.copy()
+    last_x = state.last_x.copy()
+    if not remove:
+        # the first point of a series sets its origin, and later ones its last x.
+        first_x = np.full(num_series, np.inf)
+        np.minimum.at(first_x, series, x)
+        origin = np.where(np.isnan(origin) & (first_x < np.inf), first_x, origin)
+        max_x = np.full(num_series, -np.inf)
+        np.maximum.at(max_x, series, x)
+        last_x = np.fmax(last_x, max_x)
+        last_x[np.isinf(last_x)] = np.nan
+
+    # move the sums to weigh the new last x, then weigh the points relative to it.
+    decay = forgetting ** np.nan_to_num(last_x - state.last_x)
+    weight = forgetting ** (last_x[series] - x) * (-1.0 if remove else 1.0)
+    dx = x - origin[series]
+
+    count = state.count + np.bincount(series, minlength=num_series) * (
+        -1 if remove else 1
+    )
+    return TrendState(
+        count=count,
+        weight=state.weight * decay + per_series_sum(weight),
+        x=state.x * decay + per_series_sum(weight * dx),
+        y=state.y * decay + per_series_sum(weight * y),
+        xx=state.xx * decay + per_series_sum(weight * dx * dx),
+        xy=state.xy * decay + per_series_sum(weight * dx * y),
+        origin=origin,
+        last_x=last_x,
+    )
+
+
+def move_trend_state(
+    state: TrendState, last_x: np.ndarray, forgetting: float = 1.0
+) -> TrendState:
+    """
+    Weigh the points of every series relative to a new last x, e.g. the x of its
+    latest remaining point after its latest point was removed, which
+    `update_trend_state` can't know.
+
+    Args:
+        state (TrendState): The state of every series.
+        last_x (np.ndarray): The new last x of every series, NaN for series without
+            points.
+        forgetting (float, optional): The factor the state was updated with.
+            Defaults to 1.0.
+
+    Returns:
+        TrendState: The state, with the same trends if every point is kept.
+    """
+    # moving the last x back weighs every point up, as they are now more recent.
+    decay = forgetting ** np.nan_to_num(last_x - state.last_x)
+    return state._replace(
+        weight=state.weight * decay,
+        x=state.x * decay,
+        y=state.y * decay,
+        xx=state.xx * decay,
+        xy=state.xy * decay,
+        last_x=np.asarray(last_x, dtype=float),
+    )
+
+
+def get_state_trends(
+    state: TrendState, horizons: Optional[Sequence[float]] = None
+) -> Trends:
+    """
+    Fit a trend line `y = intercept + slope * x` to each series from its state.
+
+    Args:
+        state (TrendState): The state of every series.
+        horizons (Optional[Sequence[float]], optional): Offsets past the last x
+            value of each series to predict y at. Defaults to None.
+
+    Returns:
+        Trends: The fit of each series, without standard errors.
+    """
+    # series whose every point was removed have no trend.
+    weight = np.where(state.count > 0, state.weight, 0.0)
+    x_mean = _divide(state.x, weight)
+    y_mean = _divide(state.y, weight)
+    sxx = state.xx - weight * x_mean * x_mean
+    sxy = state.xy - weight * x_mean * y_mean
+    # a single x value has no trend, however it was rounded.
+    slope = _divide(sxy, np.where(sxx > 1e-9 * state.xx, sxx, 0.0))
+    intercept = y_mean - slope * (x_mean + state.origin)
+
+    predictions = None
+    if horizons is not None:
+        future_x = state.last_x[:, None] + np.asarray(horizons, dtype=float)[None, :]
+        predictions = intercept[:, None] + slope[:, None] * future_x
+
+    return Trends(
+        slope=slope,
+        intercept=intercept,
+        slope_se=None,
+        intercept_se=None,
+        predictions=predictions,
+    )
+
+
+def fit_trends(
+    xs: Sequence[np.ndarray],
+    ys: Sequence[np.ndarray],
+    horizons: Optional[Sequence[float]] = None,
+    standard_errors: bool = False,
+) -> Trends:
+    """
+    Fit a trend line `y = intercept + slope * x` to each series.
+
+    Args:
+        xs (Sequence[np.ndarray]): The x values of each series.
+        ys (Sequence[np.ndarray]): The y values of each series, without NaNs.
+        horizons (Optional[Sequence[float]], optional): Offsets past the last x
+            value of each series to predict y at. Defaults to None.
+        standard_errors (bool, optional): Whether to also compute the standard
+            errors of the slope and intercept. Defaults to False.
+
+    Returns:
+        Trends: The fit of each series, in the order given.
+    """
+    num_series = len(xs)
+    lengths = np.array([len(x) for x in xs], dtype=int)
+    series = np.repeat(np.arange(num_series), lengths)
+    x = np.concatenate(xs).astype(float) if num_series > 0 else np.array([])
+    y = np.concatenate(ys).astype(float) if num_series > 0 else np.array([])
+
+    def per_series_sum(values: np.ndarray) -> np.ndarray:
+        return np.bincount(series, weights=values, minlength=num_series)
+
+    # center each series for numerical stability.
+    x_mean = _divide(per_series_sum(x), lengths)
+    y_mean = _divide(per_series_sum(y), lengths)
+    dx = x - x_mean[series]
+    dy = y - y_mean[series]
+    sxx = per_series_sum(dx * dx)
+    sxy = per_series_sum(dx * dy)
+
+    slope = _divide(sxy, sxx)
+    intercept = y_mean - slope * x_mean
+
+    slope_se = None
+    intercept_se = None
+    if standard_errors:
+        residuals = dy - slope[series] * dx
+        variance = _divide(per_series_sum(residuals * residuals), lengths - 2.0)
+        slope_se = np.sqrt(_divide(variance, sxx))
+        intercept_se = np.sqrt(
+            variance
+            * (_divide(np.ones(num_series), lengths) + _divide(x_mean**2, sxx))
+        )
+
+    predictions = None
+    if horizons is not None:
+        last_x = np.array([x[-1] if len(x) > 0 else np.nan for x in xs], dtype=float)
+        future_x = last_x[:, None] + np.asarray(horizons, dtype=float)[None, :]
+        predictions = intercept[:, None] + slope[:, None] * future_x
+
+    return Trends(
+        slope=slope,
+        intercept=intercept,
+        slope_se=slope_se,
+        intercept_se=intercept_se,
+        predictions=predictions,
+    )
+
+
+def fit_rolling_trends(
+    xs: Sequence[np.ndarray], ys: Sequence[np.ndarray], windows: Sequence[float]
+) -> List[np.ndarray]:
+    """
+    Fit the slope of the trend line over every window of each series that ends at
+    one of its points, covering the points with x values within the window's width
+    of it.
+
+    Every window is fit in constant time from prefix sums of x, y, x * x and x * y,
+    so this is linear in the number of points, apart from finding where windows
+    start.
+
+    Args:
+        xs (Sequence[np.ndarray]): The x values of each series, in increasing order.
+        ys (Sequence[np.ndarray]): The y values of each series, without NaNs.
+        windows (Sequence[float]): The widths of the windows to fit, in units of x.
+
+    Returns:
+        List[np.ndarray]: For each series, the slopes of its windows, with a row per
+            width and a column per point, e.g. `[:, -1]` for its latest windows.
+            Windows with less than two distinct x values have no slope.
+    """
+    num_series = len(xs)
+    if num_series == 0:
+        return []
+    lengths = np.array([len(x) for x in xs], dtype=int)
+    series = np.repeat(np.arange(num_series), lengths)
+    x = np.concatenate(xs).astype(float)
+    y = np.concatenate(ys).astype(float)
+    if len(x) == 0:
+        return [np.empty((len(windows), 0)) for _ in xs]
+
+    # relative to the first x of their series, to keep the sums small.
+    starts = np.cumsum(lengths) - lengths
+    x = x - np.repeat(x[np.minimum(starts, len(x) - 1)], lengths)
+
+    def prefix_sum(values: np.ndarray) -> np.ndarray:
+        return np.concatenate([[0.0], np.cumsum(values)])
+
+    sums = [prefix_sum(values) for values in [np.ones_like(x), x, y, x * x, x * y]]
+
+    # lay the series out one after the other, so one search finds every window start.
+    stride = x.max() + max(windows) + 1
+    offset_x = x + series * stride
+    ends = np.arange(len(x)) + 1
+
+    slopes = np.empty((len(windows), len(x)))
+    for window_idx, window in enumerate(windows):
+        window_starts = np.searchsorted(offset_x, offset_x - window, side="right")
+        n, sx, sy, sxx, sxy = [total[ends] - total[window_starts] for total in sums]
+        sxx_centered = n * sxx - sx * sx
+        # a single x value has no trend, however it was rounded.
+        slopes[window_idx] = _divide(
+            n * sxy - sx * sy,
+            np.where(sxx_centered > 1e-9 * n * sxx, sxx_centered, 0.0),
+        )
+    return np.split(slopes, np.cumsum(lengths)[:-1], axis=1)
@@ -1,5 +1,10 @@
+import re
 from itertools import product
-from typing import List
+from types import MappingProxyType
+from typing import List, Mapping, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
 
 SECONDS_UNITS = ["s", "sec", "secs", "second", "seconds"]
 MINUTES_UNITS = ["minute", "minutes", "min", "mins", "m", "ms"]
@@ -8,7 +13,87 @@ POUNDS_UNITS = ["lb", "lbs"]
 LEFT_UNITS = ["l", "left"]
 RIGHT_UNITS = ["r", "right"]
 PERCENTAGE_UNITS = ["%"]
+COMPLETION_UNITS = ["[x]", "[ ]"]
+DISTANCE_UNITS = ["planks"]
+
+# Metric of a measurement whose unit is not known.
+DEFAULT_METRIC = "Variation"
+
+# Everything in a measurement that is part of its number, rather than its unit.
+_NUMBER_PATTERN = re.compile(r"[0-9.]+")
 
 
 def combine_units(units_1: List[str], units_2: List[str]) -> List[str]:
     return [" ".join(units) for units in product(units_1, units_2)]
+
+
+def _build_unit_to_metric() -> Mapping[str, str]:
+    # ordered by precedence, for units that could belong to several metrics.
+    metric_units = [
+        ("Weight", POUNDS_UNITS),
+        ("Weight Right", combine_units(POUNDS_UNITS, RIGHT_UNITS)),
+        ("Weight Left", combine_units(POUNDS_UNITS, LEFT_UNITS)),
+        ("Seconds Right", combine_units(SECONDS_UNITS, RIGHT_UNITS)),
+        ("Seconds Left", combine_units(SECONDS_UNITS, LEFT_UNITS)),
+        ("Reps Right", RIGHT_UNITS),
+        ("Reps Left", LEFT_UNITS),
+        ("Hours", HOURS_UNITS),
+        ("Minutes", MINUTES_UNITS),
+        ("Seconds", SECONDS_UNITS),
+        ("Percentage", PERCENTAGE_UNITS),
+        ("Completion", COMPLETION_UNITS),
+        ("Distance", DISTANCE_UNITS),
+        ("Reps", [""]),
+    ]
+    unit_to_metric = {}
+    for metric, units in metric_units:
+        for unit in units:
+            unit_to_metric.setdefault(unit, metric)
+    return MappingProxyType(unit_to_metric)
+
+
+UNIT_TO_METRIC = _build_unit_to_metric()
+
+
+def measurement_to_metric(measurement: str) -> str:
+    unit = _NUMBER_PATTERN.sub("", measurement.lower()).strip()
+    return UNIT_TO_METRIC.get(unit, DEFAULT_METRIC)
+
+
+def measurement_to_value(measurement: str, metric: str) -> float:
+    if metric == "Completion":
+        return 1.0 if "x" in measurement.lower() else 0.0
+    try:
+        return float("".join(_NUMBER_PATTERN.findall(measurement)))
+    except ValueError:
+        return np.nan
+
+
+def parse_measurement(measurement: str) -> Tuple[str, float]:
+    """
+    Classify a single measurement of a set, e.g. "50 lbs", into its metric and value.
+    """
+    metric = measurement_to_metric(measurement)
+    return metric, measurement_to_value(measurement, metric)
+
+
+def parse_measurements(measurements: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Classify many measurements at once, as in `parse_measurement`.
+
+    Logged measurements repeat heavily (e.g. "5", "50 lbs"), so each distinct
+    measurement is classified once and the results are broadcast back.
+
+    Args:
+        measurements (Sequence[str]): The raw measurements, e.g. "50 lbs".
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The metric and the numeric value of each
+            measurement, with NaN values for measurements without a number.
+    """
+    codes, unique_measurements = pd.factorize(np.asarray(measurements, dtype=object))
+    unique_metrics = np.empty(len(unique_measurements), dtype=object)
+    unique_values = np.empty(len(unique_measurements), dtype=float)
+    for idx, measurement in enumerate(unique_measurements):
+        unique_metrics[idx], unique_values[idx] = parse_measurement(measurement)
+    return unique_metrics[codes], unique_values[codes]
@@ -0,0 +1,128 @@
+"""
+The activity vault that every path is resolved in.
+
+Functions in `dir_utils` resolve paths in the current vault. By default, this is the
+vault in `config.yml`, which is only loaded once per process. To work in another vault,
+e.g. when using this package as a library, use a `Vault` as a context manager:
+
+    with Vault("/path/to/vault"):
+        data = get_exercise(activity="Fitness", exercise="Pullups")
+"""
+import os
+from functools import lru_cache
+from typing import Dict, List, Optional, Set, Tuple
+
+from config import load_config
+
+# the exercise that bodyweight is logged as, unless configured otherwise.
+DEFAULT_BODYWEIGHT_ACTIVITY = "Fitness"
+DEFAULT_BODYWEIGHT_EXERCISE = "Weight"
+
+
+class Vault:
+    """
+    An activity vault, which caches the paths resolved in it.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        bodyweight_activity: str = DEFAULT_BODYWEIGHT_ACTIVITY,
+        bodyweight_exercise: str = DEFAULT_BODYWEIGHT_EXERCISE,
+    ):
+        self.path = os.path.abspath(path)
+        # the exercise whose "Weight" is used as bodyweight in reports.
+        self.bodyweight_activity = bodyweight_activity
+        self.bodyweight_exercise = bodyweight_exercise
+        # dates of plans, by activity and plan.
+        self._plan_dates: Dict[Tuple[str, str], str] = {}
+        # report directories known to exist.
+        self._reports_dirs: Set[str] = set()
+
+    @classmethod
+    def from_config(cls) -> "Vault":
+        """
+        Create the vault in `config.yml`.
+        """
+        config = load_config()
+        return cls(
+            config["activity_vault"],
+            bodyweight_activity=config.get(
+                "bodyweight_activity", DEFAULT_BODYWEIGHT_ACTIVITY
+            ),
+            bodyweight_exercise=config.get(
+                "bodyweight_exercise", DEFAULT_BODYWEIGHT_EXERCISE
+            ),
+        )
+
+    def get_activity_dir(self, activity: str) -> str:
+        return os.path.join(self.path, activity)
+
+    def get_reports_dir(self, activity: str) -> str:
+        reports_dir = os.path.join(self.get_activity_dir(activity), "Report")
+        if reports_dir not in self._reports_dirs:
+            if not os.path.isdir(reports_dir):
+                os.mkdir(reports_dir)
+            self._reports_dirs.add(reports_dir)
+
+        return reports_dir
+
+    def get_plan_dir(self, plan: str, activity: str, date: Optional[str] = None) -> str:
+        plans_dir = os.path.join(self.get_activity_dir(activity), "Plan")
+        if date is None:
+            if (activity, plan) not in self._plan_dates:
+                # find date corresponding to this plan
+                matches = [
+                    path
+                    for path in os.listdir(plans_dir)
+                    if os.path.isdir(os.path.join(plans_dir, path))
+                    and path.endswith(plan)
+                ]
+                if len(matches) > 1:
+                    raise ValueError(matches)
+                if len(matches) == 0:
+                    raise ValueError(plan)
+                self._plan_dates[(activity, plan)] = matches[0].split(" ")[0]
+            date = self._plan_dates[(activity, plan)]
+        plan = " ".join([date, plan])
+        plan_dir = os.path.join(plans_dir, plan)
+        return plan_dir
+
+    def clear_cache(self):
+        """
+        Forget every resolved path, e.g. after plans are renamed.
+        """
+        self._plan_dates.clear()
+        self._reports_dirs.clear()
+
+    def __enter__(self) -> "Vault":
+        _ACTIVE_VAULTS.append(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        _ACTIVE_VAULTS.pop()
+
+
+# vaults entered as context managers, innermost last.
+_ACTIVE_VAULTS: List[Vault] = []
+
+
+@lru_cache(maxsize=None)
+def _get_config_vault() -> Vault:
+    return Vault.from_config()
+
+
+def get_vault() -> Vault:
+    """
+    Get the current vault: the innermost one entered, or else the one in `config.yml`.
+    """
+    if len(_ACTIVE_VAULTS) > 0:
+        return _ACTIVE_VAULTS[-1]
+    return _get_config_vault()
+
+
+def set_vault(vault: Vault):
+    """
+    Use a vault for the rest of this process, e.g. one shared by another process.
+    """
+    _ACTIVE_VAULTS.append(vault)
@@ -0,0 +1,220 @@
+"""
+Watch an activity, regenerating its reports whenever their inputs change.
+
+The `Practice`, `Plan` and `Report` trees of the activity are watched with watchdog,
+which uses inotify (or the equivalent of other platforms), if it is installed, and
+otherwise by polling the modification times of their files. The index stays loaded
+between changes, and only the changed practices are re-parsed. Changes are debounced,
+so that a burst of saves only regenerates reports once.
+"""
+import os
+import threading
+import time
+from logging import debug, error
+from typing import Dict, List, Set, Tuple
+
+import pandas as pd
+
+from dir_utils import get_activity_dir, get_practices_dir, get_reports_dir
+from index import INDEX_COLUMNS, get_index, refresh_index
+from report import generate_report, get_reports, read_report_template
+from vault import get_vault
+
+WATCHED_DIRS = ["Practice", "Plan", "Report"]
+
+
+class _PollingWatcher:
+    """
+    Find changed files by comparing the modification times and sizes of every file.
+    """
+
+    def __init__(self, dirs: List[str]):
+        self.dirs = dirs
+        self._snapshot = self._scan()
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        snapshot = {}
+        for dir in self.dirs:
+            for dirpath, _, files in os.walk(dir):
+                for file in files:
+                    path = os.path.join(dirpath, file)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def get_changes(self, timeout: float) -> Set[str]:
+        time.sleep(timeout)
+        snapshot = self._scan()
+        changes = {
+            path
+            for path in snapshot.keys() | self._snapshot.keys()
+            if snapshot.get(path) != self._snapshot.get(path)
+        }
+        self._snapshot = snapshot
+        return changes
+
+    def stop(self):
+        pass
+
+
+class _WatchdogWatcher:
+    """
+    Collect changed files from filesystem events, e.g. from inotify on Linux.
+    """
+
+    def __init__(self, dirs: List[str]):
+        from watchdog.events import FileSystemEventHandler
+        from watchdog.observers import Observer
+
+        self._changes: Set[str] = set()
+        self._changed = threading.Condition()
+
+        watcher = self
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                if event.is_directory or event.event_type in {
+                    "opened",
+                    "closed_no_write",
+                }:
+                    return
+                with watcher._changed:
+                    watcher._changes.add(event.src_path)
+                    if getattr(event, "dest_path", ""):
+                        watcher._changes.add(event.dest_path)
+                    watcher._changed.notify()
+
+        self._observer = Observer()
+        for dir in dirs:
+            self._observer.schedule(Handler(), dir, recursive=True)
+        self._observer.start()
+
+    def get_changes(self, timeout: float) -> Set[str]:
+        with self._changed:
+            self._changed.wait_for(lambda: len(self._changes) > 0, timeout=timeout)
+            changes = self._changes
+            self._changes = set()
+        return changes
+
+    def stop(self):
+        self._observer.stop()
+        self._observer.join()
+
+
+def _get_watcher(dirs: List[str]):
+    try:
+        return _WatchdogWatcher(dirs)
+    except ImportError:
+        debug("install watchdog to watch for changes without polling")
+        return _PollingWatcher(dirs)
+
+
+def _get_changed_rows(
+    removed_rows: pd.DataFrame, added_rows: pd.DataFrame
+) -> pd.DataFrame:
+    """
+    Get the rows that differ between the removed and added rows of the index, e.g.
+    only the edited sets of a saved practice.
+    """
+    rows = pd.merge(
+        removed_rows.astype(str),
+        added_rows.astype(str),
+        how="outer",
+        on=INDEX_COLUMNS,
+        indicator=True,
+    )
+    changed_rows = rows[rows["_merge"] != "both"]
+    return changed_rows.assign(Date=pd.to_datetime(changed_rows["Date"]))
+
+
+def _get_changed_reports(activity: str, changes: Set[str]) -> List[str]:
+    """
+    Update the index with the changed practices, and find the reports whose template
+    or data changed.
+    """
+    practices_dir = get_practices_dir(activity=activity)
+    reports_dir = get_reports_dir(activity)
+
+    changed_rows = None
+    if any(path.startswith(practices_dir + os.sep) for path in changes):
+        changed_rows = _get_changed_rows(*refresh_index(activity=activity))
+    # reports write their own outputs, so only their templates are inputs.
+    changed_templates = {
+        os.path.relpath(path, reports_dir).split(os.sep)[0]
+        for path in changes
+        if path.startswith(reports_dir + os.sep) and path.endswith("Template.md")
+    }
+
+    changed_reports = []
+    for report_name in get_reports(activity):
+        if report_name in changed_templates:
+            changed_reports.append(report_name)
+            continue
+        if changed_rows is None or len(changed_rows) == 0:
+            continue
+        try:
+            template = read_report_template(report_name, activity)
+        except (FileNotFoundError, ValueError):
+            continue
+        exercises = set(template.exercises)
+        if activity == get_vault().bodyweight_activity:
+            exercises.add(get_vault().bodyweight_exercise)
+        rows = changed_rows[changed_rows["Exercise"].isin(exercises)]
+        if template.start is not None:
+            rows = rows[rows["Date"] >= pd.Timestamp(template.start)]
+        if len(rows) > 0:
+            changed_reports.append(report_name)
+    return changed_reports
+
+
+def watch(activity: str, interval: float = 1.0, debounce: float = 0.5):
+    """
+    Regenerate the reports of an activity whenever their inputs change, until
+    interrupted.
+
+    Args:
+        activity (str): The activity to watch.
+        interval (float, optional): Seconds between checks for changes, when polling.
+            Defaults to 1.0.
+        debounce (float, optional): Seconds without any changes to wait for before
+            regenerating reports. Defaults to 0.5.
+    """
+    activity_dir = get_activity_dir(activity)
+    dirs = [os.path.join(activity_dir, dir) for dir in WATCHED_DIRS]
+    for dir in dirs:
+        os.makedirs(dir, exist_ok=True)
+
+    # load the index up front, so the first change is handled as fast as any other.
+    get_index(activity=activity)
+
+    watcher = _get_watcher(dirs)
+    print(f"Watching {activity} for changes...")
+    pending_changes: Set[str] = set()
+    try:
+        while True:
+            changes = watcher.get_changes(
+                timeout=debounce if len(pending_changes) > 0 else interval
+            )
+            if len(changes) > 0:
+                pending_changes |= changes
+                continue
+            if len(pending_changes) == 0:
+                continue
+
+            debug(f"{len(pending_changes)} files changed")
+            if any(path.startswith(dirs[1] + os.sep) for path in pending_changes):
+                # plans may have been renamed.
+                get_vault().clear_cache()
+            for report_name in _get_changed_reports(activity, pending_changes):
+                print(f"Generating report {report_name}")
+                try:
+                    generate_report(report_name, activity)
+                except Exception as exception:
+                    # e.g. a template that is still being written.
+                    error(f"could not generate report {report_name}: {exception!r}")
+            pending_changes = set()
+    finally:
+        watcher.stop()